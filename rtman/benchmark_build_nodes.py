@@ -0,0 +1,82 @@
+"""
+Benchmark ODLClient._build_nodes on generated grid topologies of increasing size.
+
+For each size, the inventory and topology are fetched once from an in-process ODL emulator. Then
+  - connect (indexed): ODLClient._connect_nodes, which indexes the links by their source connector
+  - connect (before): the previous implementation, which searched all links for each connector
+  - build: a complete ODLClient._build_nodes, including both requests
+e.g.:
+    python benchmark_build_nodes.py --sizes 5 10 15 20
+"""
+import argparse
+import logging
+import time
+
+from odl_client.base_odlclient.odlclient import ODLClient
+from odl_emulator.network import EmulatedNetwork, grid_topology
+from odl_emulator.server import ODLEmulator
+
+
+def connect_before(client, topology):
+    """
+    connect phase of _build_nodes before links were indexed: O(connectors x links)
+    """
+    topology_change_detected = False
+    for node in client._nodes.values():
+        for connector in node.list_connectors():
+            found = False
+            for link in topology.get("link", []):
+                source_node = client._nodes[link["source"]["source-node"]]
+                source_connector = source_node.get_connector(link["source"]["source-tp"])
+                dest_node = client._nodes[link["destination"]["dest-node"]]
+                dest_connector = dest_node.get_connector(link["destination"]["dest-tp"])
+                if source_node == node and source_connector == connector:
+                    if connector.target != dest_connector:
+                        connector._connect_to(dest_connector)
+                        topology_change_detected = True
+                    found = True
+                    break
+            if not found:
+                if connector.target is not None:
+                    topology_change_detected = True
+                connector._connect_to(None, reverse=False)
+    return topology_change_detected
+
+
+def best_of(rounds, fn):
+    durations = []
+    for _ in range(rounds):
+        start = time.time()
+        fn()
+        durations.append(time.time() - start)
+    return min(durations)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5, 10, 15, 20],
+                        help="edge lengths of the switch grids (default: %(default)s)")
+    parser.add_argument("--rounds", type=int, default=3, help="rounds per measurement, the best is reported")
+    parser.add_argument("--skip-before", action="store_true", help="do not measure the previous implementation")
+    args = parser.parse_args()
+
+    print("%8s %8s %8s %16s %16s %10s" % ("switches", "hosts", "links", "connect (index)", "connect (before)",
+                                          "build"))
+    for size in args.sizes:
+        network = EmulatedNetwork(grid_topology(size, size, size * size))
+        emulator = ODLEmulator(network, port=0)
+        emulator.start()
+        client = ODLClient(emulator.hostname, port=emulator.port)
+        try:
+            client._build_nodes()
+            _, topology = client._fetch_topology()
+            indexed = best_of(args.rounds, lambda: client._connect_nodes(topology))
+            before = float("nan") if args.skip_before else \
+                best_of(args.rounds, lambda: connect_before(client, topology))
+            build = best_of(args.rounds, client._build_nodes)
+            print("%8d %8d %8d %15.4fs %15.4fs %9.4fs" % (len(client.switches), len(client.hosts),
+                                                          len(topology.get("link", [])), indexed, before, build))
+        finally:
+            client.stop()
+            emulator.stop()
@@ -0,0 +1,77 @@
+"""
+Benchmark the ODL client against the local ODL emulator.
+
+Measures
+  - build: time of ODLClient._build_nodes (inventory and topology requests, model update)
+  - deploy: time to deploy a new flowset of --flows flows per switch
+  - reschedule: time to deploy a flowset in which every flow has been changed (as after a reschedule)
+  - clean up: time to remove all flows
+e.g.:
+    python benchmark_odl_client.py --ring 50 --hosts 100 --flows 20 --latency 0.005
+"""
+import logging
+import time
+
+from odl_client.base_odlclient.odlclient import ODLClient
+from odl_client.base_odlclient.openflow import FlowTableEntry
+from odl_client.base_odlclient.openflow.action import OutputAction
+from odl_client.base_odlclient.openflow.instruction import Actions
+from odl_client.base_odlclient.openflow.match import BaseMatch
+from odl_emulator.server import ODLEmulator
+from start_odl_emulator import build_network, argument_parser
+
+BUILD_ROUNDS = 5
+
+
+def flowset(client, flows_per_switch, variant):
+    """
+    one flow per udp port and switch. The output connector depends on variant, so that two variants differ in
+    every flow.
+    """
+    flows = set()
+    for switch in client.switches.values():
+        connectors = sorted(switch.list_connectors(), key=lambda c: c.connector_id)
+        for i in range(flows_per_switch):
+            flows.add(FlowTableEntry(
+                switch=switch,
+                match=BaseMatch(udp_destination_port=6000 + i),
+                instructions=[Actions([OutputAction(connectors[(i + variant) % len(connectors)])])],
+                priority=1000,
+                entry_name="%s-benchmark-%d" % (client.flow_namespace, i)
+            ))
+    return flows
+
+
+def measure(name, fn, count=None):
+    start = time.time()
+    fn()
+    duration = time.time() - start
+    if count:
+        print("%-12s %8.3fs  %10.1f flows/s" % (name, duration, count / duration if duration else float("inf")))
+    else:
+        print("%-12s %8.3fs" % (name, duration))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    parser = argument_parser(__doc__)
+    parser.add_argument("--flows", type=int, default=10, help="number of flows per switch (default: %(default)s)")
+    args = parser.parse_args()
+
+    emulator = ODLEmulator(build_network(args), port=0, latency=args.latency, jitter=args.jitter, fields=args.fields)
+    emulator.start()
+    client = ODLClient(emulator.hostname, port=emulator.port)
+    try:
+        measure("build (x%d)" % BUILD_ROUNDS, lambda: [client._build_nodes() for _ in range(BUILD_ROUNDS)])
+        print("%d switches, %d hosts" % (len(client.switches), len(client.hosts)))
+
+        first = flowset(client, args.flows, 0)
+        second = flowset(client, args.flows, 1)
+        measure("deploy", lambda: client.deploy_new_flowset(first), len(first))
+        measure("reschedule", lambda: client.deploy_new_flowset(second), len(second))
+        measure("clean up", client.clean_up_flows, len(second))
+        print(client.session_statistics)
+        print("requests: %s" % emulator.request_counts)
+    finally:
+        client.stop()
+        emulator.stop()
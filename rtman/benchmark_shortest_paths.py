@@ -0,0 +1,147 @@
+"""
+Benchmark the path search of the Dijkstra based schedulers on generated grid topologies of increasing size.
+
+For each size, the topology is fetched once from an in-process ODL emulator and wrapped in a DijkstraTopology, whose
+links are loaded with random multistreams. Then, for random senders and receivers,
+  - heap: shortest_paths.shortest_switch_paths, a binary heap on the topology's GraphCore
+  - before: the previous implementation, which selected the closest switch by scanning all unvisited switches
+are timed, and both are checked to find paths of the same cost. With --processes, all searches of a size are also
+run as one wave in a process pool (shortest_paths.PathCandidates), as the schedulers do for large batches of new
+multistreams.
+e.g.:
+    python benchmark_shortest_paths.py --sizes 10 20 30 --processes 4
+"""
+import argparse
+import logging
+import random
+import sys
+import time
+
+from odl_client.base_odlclient.odlclient import ODLClient
+from odl_client.dijkstra_based_iterative_reserving.schedule.node_wrapper import DijkstraTopology
+from odl_client.irt_odlclient.node import CapacityBasedHost, CapacityBasedSwitch
+from odl_client.irt_odlclient.schedule.shortest_paths import shortest_switch_paths, PathCandidates
+from odl_emulator.network import EmulatedNetwork, grid_topology
+from odl_emulator.server import ODLEmulator
+
+
+class CapacityBasedODLClient(ODLClient):
+    """
+    builds the node model of IRTOdlClient, without its scheduler
+    """
+    __slots__ = ()
+    _host_type = CapacityBasedHost
+    _switch_type = CapacityBasedSwitch
+
+
+class LoadPartialStream(object):
+    """
+    stands in for a reserved partialstream; only its parent is used to compute the cost of a link
+    """
+    __slots__ = ("parent",)
+
+    def __init__(self, parent):
+        self.parent = parent
+
+
+def switch_paths_before(topology, source_switch, destination_switches):
+    """
+    path search of _calculate_pathset before the binary heap: O(switches^2)
+    """
+    missing_destination_switches = set(destination_switches)
+    distance = {switch.node_id: sys.maxsize for switch in topology.switches}
+    prev_node = {switch.node_id: None for switch in topology.switches}
+    distance[source_switch.node_id] = 0
+    Q = set(topology.switches)
+    while Q:
+        u = min(Q, key=lambda node: distance[node.node_id])
+        Q.remove(u)
+        for connector in u.connectors:
+            if connector.target:
+                v = connector.target.parent
+                if v in Q:
+                    distance_v = distance[u.node_id] + len(connector.multistreams) + 1
+                    if distance_v < distance[v.node_id]:
+                        distance[v.node_id] = distance_v
+                        prev_node[v.node_id] = u
+        if u in missing_destination_switches:
+            missing_destination_switches.remove(u)
+            if not missing_destination_switches:
+                break
+
+    paths = {}
+    for destination_switch in destination_switches:
+        u = destination_switch
+        raw_path = [u]
+        while prev_node[u.node_id] is not None:
+            u = prev_node[u.node_id]
+            raw_path.append(u)
+        paths[destination_switch] = raw_path[::-1]
+    return paths
+
+
+def path_cost(path):
+    return sum(len(a.get_neighbor_connector(b).multistreams) + 1 for a, b in zip(path, path[1:]))
+
+
+def timed(searches, fn):
+    start = time.time()
+    results = [fn(source, destinations) for source, destinations in searches]
+    return time.time() - start, results
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 15, 20, 25],
+                        help="edge lengths of the switch grids (default: %(default)s)")
+    parser.add_argument("--searches", type=int, default=20, help="path searches per size")
+    parser.add_argument("--receivers", type=int, default=4, help="receivers per search")
+    parser.add_argument("--load", type=int, default=3, help="maximum number of multistreams on a link")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip-before", action="store_true", help="do not measure the previous implementation")
+    parser.add_argument("--processes", type=int, default=0, help="worker processes of the parallel search; 0 skips it")
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    print("%8s %8s %14s %14s %14s %8s" % ("switches", "links", "heap", "before", "parallel", "costs"))
+    for size in args.sizes:
+        network = EmulatedNetwork(grid_topology(size, size, size * size))
+        emulator = ODLEmulator(network, port=0)
+        emulator.start()
+        client = CapacityBasedODLClient(emulator.hostname, port=emulator.port)
+        try:
+            client._build_nodes()
+            topology = DijkstraTopology(client)
+            for connector in topology.node_connectors:
+                if hasattr(connector, "add_partialstreams"):
+                    connector.add_partialstreams(LoadPartialStream(object()) for _ in range(rng.randint(0, args.load)))
+
+            switches = sorted(topology.switches, key=lambda switch: switch.node_id)
+            searches = [(rng.choice(switches), rng.sample(switches, args.receivers)) for _ in range(args.searches)]
+
+            topology.graph  # built once per topology version, not per search
+            heap, heap_paths = timed(searches, lambda source, destinations: shortest_switch_paths(
+                topology, source, destinations))
+            if args.skip_before:
+                before, costs = float("nan"), "-"
+            else:
+                before, before_paths = timed(searches, lambda source, destinations: switch_paths_before(
+                    topology, source, destinations))
+                costs = "equal" if all(path_cost(paths[d]) == path_cost(other[d])
+                                       for paths, other in zip(heap_paths, before_paths) for d in paths) else "DIFFER"
+            parallel = float("nan")
+            if args.processes:
+                start = time.time()
+                candidates = PathCandidates(topology, args.processes)
+                try:
+                    candidates.search([(source, destinations, ()) for source, destinations in searches])
+                finally:
+                    candidates.close()
+                parallel = time.time() - start
+            print("%8d %8d %13.4fs %13.4fs %13.4fs %8s" % (len(switches), topology.graph.edge_count // 2,
+                                                           heap / args.searches, before / args.searches,
+                                                           parallel / args.searches, costs))
+        finally:
+            client.stop()
+            emulator.stop()
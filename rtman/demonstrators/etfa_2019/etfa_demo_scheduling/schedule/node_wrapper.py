@@ -24,16 +24,24 @@ class ETFA2019SwitchConnectorWrapper(SwitchConnectorWrapper):
 
 
     def add_partialstream(self, partialstream):
+        old_load = self.multistream_count
         self._partialstreams.add(partialstream)
+        self._load_changed(old_load)
 
     def add_partialstreams(self, partialstreams):
+        old_load = self.multistream_count
         self._partialstreams.update(partialstreams)
+        self._load_changed(old_load)
 
     def remove_partialstream(self, partialstream):
+        old_load = self.multistream_count
         self._partialstreams.remove(partialstream)
+        self._load_changed(old_load)
 
     def remove_partialstreams(self, partialstreams):
+        old_load = self.multistream_count
         self._partialstreams.difference_update(partialstreams)
+        self._load_changed(old_load)
 
 
 class ETFA2019SwitchWrapper(SwitchWrapper):
@@ -1,5 +1,3 @@
-import sys
-
 from ieee802dot1qcc.status import FailureCode
 from odl_client.base_odlclient.openflow import FlowTableEntry
 from odl_client.base_odlclient.openflow.action import SetQueueAction, OutputAction
@@ -107,88 +105,20 @@ class EarliestTransmissionUdpRoutingDijkstraScheduler(Scheduler):
         source_switch = source_host.connector.target.parent
         destination_switches = {host.node_id: host.connector.target.parent for host in destination_hosts}
 
-        # we will store all unvisited destination switches here. We can stop the algorithm once
-        #  every destination switch has been visited.
-        missing_destination_switches = set(destination_switches.values())
-
-
-        ### Phase 2: dijkstra initialization
-
-        # all nodes have maximum distance and no predecessor
-        distance = {switch.node_id: sys.maxsize for switch in self._topology.switches}  # type: dict(str, int)
-        prev_node = {switch.node_id: None for switch in self._topology.switches}  # type: dict(str, SlottedTransmissionSwitchWrapper)
-
-        # start node has no cost to self
-        distance[source_switch.node_id] = 0
-
-        # note that prev_node[source_switch.node_id] will stay None during iteration.
-        # this marks the beginning of the path when following prev_node from destination to source later.
-
-        # set of all non-visited nodes
-        Q = self._topology.switches  # type: list(SlottedTransmissionSwitchWrapper)
-
-        ### Phase 2.1 re-use existing paths
-
-        # in arguments, we should have only received paths about the given partialstreams.
-        for path in existing_paths:
-            # we don't need the hosts (start and end of path), so strip them.
-            switch_path = path[1:-1]
-            # for the remaining, we can say:
-            #  * if nodes a, b are successors in path, we want to set
-            #    * distance[b] = 0    as there is no cost for re-using this
-            #    * prev_node[b] = a   as this is the way that our table works.
-            # note: the first element in the path is start switch.
-            for i in range(len(switch_path))[1:]:  # convert to indexes, remove first. index i points to b, i-1 to a
-                distance[switch_path[i].node_id] = 1
-                prev_node[switch_path[i].node_id] = switch_path[i-1]
-
-
-        ### Phase 3: dijkstra iteration
-        while Q:
-            # find the node with minimum cost that is still in Q.
-            # note that in first iteration, this will yield source_switch since this has cost 0, all others maxint.
-            # u is the currently visited node.
-            # remove u from the set.
-            u = min(Q, key=lambda node: distance[node.node_id])
-            Q.remove(u)
-
-            # now find costs to all neighbors (i.e., all connectors)
-            for connector in u.connectors:
-                if connector.target:  # local loopback interface doesn't have a target
-                    # v is currently checked neighbor
-                    v = connector.target.parent
-                    if v in Q:  # we only need to check unvisited nodes
-
-                        cost = len(connector.multistreams) + 1
-                        distance_v = distance[u.node_id] + cost
-                        if distance_v < distance[v.node_id]:
-                            distance[v.node_id] = distance_v
-                            prev_node[v.node_id] = u
-
-            # break the loop when we have reached the last destination.
-            # the latter part in this loop examines u's neighbors. This is not important since u is the destination
-            if u in missing_destination_switches:
-                missing_destination_switches.remove(u)
-                if not missing_destination_switches:
-                    break
-
-        ### Phase 4: Pathset creation
-        # after the dijkstra iteration, we have a tree with paths to all destination switches.
+        ### Phase 2: dijkstra
+        # least used paths from the source switch to all destination switches. Links of existing paths are re-used.
+        switch_paths = self._shortest_switch_paths(source_switch, destination_switches.values(), existing_paths)
+
+        ### Phase 3: Pathset creation
+        # after the dijkstra, we have paths to all destination switches.
         # we need to create a Pathset from this.
         # a pathset is defined as  partialstream -> path from host to destination
         pathset = PathSet()
         for partialstream in partialstreams:
             destination_host = self._topology.get_host(partialstream.receiver.node_id)
 
-            # now, traverse the preve_node relationship for this partialstream's destination
-            u = destination_switches[destination_host.node_id]
-            raw_path = [u]
-            while prev_node[u.node_id] is not None:
-                u = prev_node[u.node_id]
-                raw_path.append(u)
-
-            # this resulted in a reverse path, without hosts. let's fix this:
-            raw_path = [source_host] + raw_path[::-1] + [destination_host]
+            # the path of switches to this partialstream's destination, without hosts. let's add them:
+            raw_path = [source_host] + switch_paths[destination_switches[destination_host.node_id]] + [destination_host]
             pathset.add_path(partialstream, raw_path)
         next(iter(partialstreams)).parent.set_status(FailureCode.NoFailure)
 
@@ -206,21 +136,22 @@ class EarliestTransmissionUdpRoutingDijkstraScheduler(Scheduler):
         for partialstream in unchanged_partialstreams:
             new_schedule.add_transmission_points(old_schedule.transmission_points_by_partialstream(partialstream))
 
-        new_partialstreams = set.difference(self.partialstreams, old_schedule_partialstreams)
-        new_multistreams = {partialstream.parent for partialstream in new_partialstreams}
+        new_partialstreams = self.partialstreams.difference(old_schedule_partialstreams)
+        # in order of their names, so that the same streams always result in the same schedule
+        new_multistreams = sorted({partialstream.parent for partialstream in new_partialstreams},
+                                  key=lambda multistream: multistream.name)
 
         old_partialstreams = set.difference(old_schedule_partialstreams, self.partialstreams)
 
-        for multistream in new_multistreams:
-
-            # get already known paths for the current multistream, as they are cost-free to reuse.
-            old_paths = old_schedule.get_pathset().get_paths_for_multistream(multistream)
+        searches = [(multistream,
+                     # only need to calculate paths that are not in old paths
+                     self.partialstreams_of_multistream(multistream).difference(old_schedule.partialstreams),
+                     # get already known paths for the current multistream, as they are cost-free to reuse.
+                     old_schedule.get_pathset().get_paths_for_multistream(multistream))
+                    for multistream in new_multistreams]
+        for multistream, partialstreams, old_paths in self._in_path_search_order(searches):
 
-            pathset = self._calculate_pathset(
-                # only need to calculate paths that are not in old paths
-                set.difference(self.partialstreams_of_multistream(multistream), old_schedule.partialstreams),
-                old_paths
-            )
+            pathset = self._calculate_pathset(partialstreams, old_paths)
 
             new_schedule.set_pathset(pathset)
 
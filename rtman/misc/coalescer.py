@@ -0,0 +1,155 @@
+"""
+Coalescing of bursts of events.
+
+An EventCoalescer collects events and hands them to its callback in batches. A batch is delivered once no new event
+has arrived for the quiet window, but no later than the maximum delay after its first event. Events that arrive
+while the callback is running are collected for the next batch.
+"""
+import logging
+import time
+from threading import Condition, Lock, Thread
+
+
+class CoalescerStatistics(object):
+    """
+    Counters of an EventCoalescer.
+    """
+    __slots__ = ("events", "batches", "max_batch_size")
+
+    def __init__(self, events=0, batches=0, max_batch_size=0):
+        self.events = events
+        self.batches = batches
+        self.max_batch_size = max_batch_size
+
+    def __repr__(self):
+        return "CoalescerStatistics[%d events in %d batches, %d merged]" % (self.events, self.batches, self.merged)
+
+    @property
+    def merged(self):
+        """
+        :return: number of events that did not cause a callback of their own
+        :rtype: int
+        """
+        return self.events - self.batches
+
+    @property
+    def json(self):
+        return {
+            "events": self.events,
+            "batches": self.batches,
+            "merged": self.merged,
+            "max_batch_size": self.max_batch_size
+        }
+
+
+class EventCoalescer(object):
+    """
+    Delivers events to a callback in batches, in a background thread.
+    """
+    __slots__ = ("_callback", "_quiet_window", "_max_delay", "_name", "_pending", "_first_event", "_last_event",
+                 "_condition", "_thread", "_stopped", "_statistics", "_statistics_lock")
+
+    def __init__(self, callback, quiet_window=0.2, max_delay=2.0, name="EventCoalescer"):
+        """
+
+        :param callback: callback(events) is called with the list of events of each batch, in order of arrival
+        :param float quiet_window: seconds without a new event after which a batch is delivered
+        :param float max_delay: maximum seconds between the first event of a batch and its delivery
+        :param str name: name of the background thread
+        """
+        if quiet_window < 0 or max_delay < quiet_window:
+            raise ValueError("requires 0 <= quiet_window <= max_delay")
+        self._callback = callback
+        self._quiet_window = quiet_window
+        self._max_delay = max_delay
+        self._name = name
+        self._pending = []
+        self._first_event = None
+        self._last_event = None
+        self._condition = Condition(Lock())
+        self._thread = None
+        self._stopped = False
+        self._statistics = CoalescerStatistics()
+        self._statistics_lock = Lock()
+
+    @property
+    def quiet_window(self):
+        return self._quiet_window
+
+    @property
+    def max_delay(self):
+        return self._max_delay
+
+    def add(self, event):
+        """
+        queue an event for the next batch
+        :param event:
+        :return:
+        """
+        now = time.time()
+        with self._condition:
+            if self._stopped:
+                return
+            if not self._pending:
+                self._first_event = now
+            self._pending.append(event)
+            self._last_event = now
+            if self._thread is None:
+                self._thread = Thread(target=self._run, name=self._name)
+                self._thread.daemon = True
+                self._thread.start()
+            self._condition.notify()
+
+    def _next_batch(self):
+        """
+        wait until a batch is due and take it from the pending events.
+        :return: the batch, or None if stopped
+        :rtype: list|None
+        """
+        with self._condition:
+            while not self._pending and not self._stopped:
+                self._condition.wait()
+            while not self._stopped:
+                now = time.time()
+                due = min(self._last_event + self._quiet_window, self._first_event + self._max_delay)
+                if now >= due:
+                    break
+                self._condition.wait(due - now)
+            if self._stopped:
+                return None
+            batch, self._pending = self._pending, []
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            with self._statistics_lock:
+                self._statistics.events += len(batch)
+                self._statistics.batches += 1
+                self._statistics.max_batch_size = max(self._statistics.max_batch_size, len(batch))
+            try:
+                self._callback(batch)
+            except Exception:
+                logging.exception("exception while handling %d coalesced events" % len(batch))
+
+    @property
+    def statistics(self):
+        """
+        :return: copy of the current counters
+        :rtype: CoalescerStatistics
+        """
+        with self._statistics_lock:
+            s = self._statistics
+            return CoalescerStatistics(events=s.events, batches=s.batches, max_batch_size=s.max_batch_size)
+
+    def stop(self):
+        """
+        stop delivering events. Pending events are discarded.
+        :return:
+        """
+        with self._condition:
+            self._stopped = True
+            self._pending = []
+            self._condition.notify()
@@ -0,0 +1,209 @@
+"""
+A bounded pool of worker threads.
+
+Tasks are queued and executed by a fixed number of threads. Submitting a task returns a Future that holds the
+task's result once it has been executed.
+"""
+import logging
+import sys
+from threading import Event, Lock, Thread
+
+try:  # python 2/3 compatibility
+    from queue import Queue
+except ImportError:
+    from Queue import Queue
+
+
+class Future(object):
+    """
+    Result of a task that is executed in the background.
+    """
+    __slots__ = ("_done", "_result", "_exc_info", "_callbacks", "_lock")
+
+    def __init__(self):
+        self._done = Event()
+        self._result = None
+        self._exc_info = None
+        self._callbacks = []
+        self._lock = Lock()
+
+    def set_result(self, result):
+        self._result = result
+        self._finish()
+
+    def set_exception(self, exc_info):
+        """
+        :param tuple exc_info: exception info as returned by sys.exc_info()
+        """
+        self._exc_info = exc_info
+        self._finish()
+
+    def _finish(self):
+        with self._lock:
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            self._run_callback(callback)
+
+    def _run_callback(self, callback):
+        try:
+            callback(self)
+        except Exception:
+            logging.exception("exception in future callback")
+
+    def add_done_callback(self, callback):
+        """
+        call callback(future) once this future is done. If it already is, callback is called immediately.
+        :param callback:
+        :return:
+        """
+        with self._lock:
+            if not self._done.is_set():
+                self._callbacks.append(callback)
+                return
+        self._run_callback(callback)
+
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """
+        wait until the task has been executed.
+        :param float timeout: timeout in seconds
+        :return: whether the task has been executed
+        :rtype: bool
+        """
+        return self._done.wait(timeout)
+
+    def exception(self, timeout=None):
+        """
+        :return: the exception raised by the task, or None
+        """
+        if not self._done.wait(timeout):
+            raise RuntimeError("future is not done yet")
+        return self._exc_info[1] if self._exc_info else None
+
+    def result(self, timeout=None):
+        """
+        wait for the task and return its result. Raises the task's exception, if it raised one.
+        :param float timeout: timeout in seconds
+        :return: result of the task
+        """
+        if not self._done.wait(timeout):
+            raise RuntimeError("future is not done yet")
+        if self._exc_info:
+            exc = self._exc_info[1]
+            if sys.version_info[0] > 2:
+                raise exc.with_traceback(self._exc_info[2])
+            raise exc
+        return self._result
+
+
+def gather(futures):
+    """
+    combine several futures into one, without blocking.
+    :param iterable[Future] futures:
+    :return: future for the list of results, in order of futures. Holds the first exception (in order of futures)
+             if any of them raised one.
+    :rtype: Future
+    """
+    futures = list(futures)
+    combined = Future()
+    if not futures:
+        combined.set_result([])
+        return combined
+    remaining = [len(futures)]
+    lock = Lock()
+
+    def on_done(_future):
+        with lock:
+            remaining[0] -= 1
+            if remaining[0]:
+                return
+        for future in futures:
+            if future._exc_info:
+                combined.set_exception(future._exc_info)
+                return
+        combined.set_result([future._result for future in futures])
+
+    for future in futures:
+        future.add_done_callback(on_done)
+    return combined
+
+
+class WorkerPool(object):
+    """
+    Executes submitted tasks in a bounded number of daemon threads.
+    Threads are started on first use.
+    """
+    __slots__ = ("_size", "_name", "_tasks", "_threads", "_lock")
+
+    def __init__(self, size, name="WorkerPool"):
+        """
+
+        :param int size: number of worker threads
+        :param str name: name prefix of the worker threads
+        """
+        if size < 1:
+            raise ValueError("size must be at least 1")
+        self._size = size
+        self._name = name
+        self._tasks = Queue()
+        self._threads = []
+        self._lock = Lock()
+
+    @property
+    def size(self):
+        return self._size
+
+    def _ensure_started(self):
+        with self._lock:
+            while len(self._threads) < self._size:
+                t = Thread(target=self._work, name="%s-%d" % (self._name, len(self._threads)))
+                t.daemon = True
+                t.start()
+                self._threads.append(t)
+
+    def _work(self):
+        while True:
+            task = self._tasks.get()
+            if task is None:
+                return
+            future, fn, args, kwargs = task
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException:
+                future.set_exception(sys.exc_info())
+            else:
+                future.set_result(result)
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        queue fn(*args, **kwargs) for execution.
+        :return: future for the result of the call
+        :rtype: Future
+        """
+        self._ensure_started()
+        future = Future()
+        self._tasks.put((future, fn, args, kwargs))
+        return future
+
+    def map(self, fn, iterable):
+        """
+        like map(fn, iterable), but executed by the worker threads.
+        Blocks until all calls are done. If a call raised an exception, the first one (in order of iterable) is raised.
+        :return: list of results, in order of iterable
+        :rtype: list
+        """
+        futures = [self.submit(fn, item) for item in iterable]
+        return [future.result() for future in futures]
+
+    def stop(self):
+        """
+        stop all worker threads after the already queued tasks have been executed.
+        :return:
+        """
+        with self._lock:
+            for _ in self._threads:
+                self._tasks.put(None)
+            self._threads = []
@@ -0,0 +1,151 @@
+"""
+Non-blocking interface to an ODL client.
+
+AsyncODLClient wraps an ODLClient (or any subclass, e.g. ReservingODLClient or IRTOdlClient) and returns a Future
+for every call instead of blocking the caller. This allows issuing many RESTconf operations at once, e.g. to hide
+the latency of a controller on a slow management network.
+
+Requests are executed by a bounded pool of worker threads, one per keep-alive connection of the client's session;
+requests beyond that are queued, not executed by additional threads.
+Operations that change the client's state (building the topology, deploying flows) are executed one after another,
+in order of submission, so they see each other's results. Within each operation, the wrapped client sends its
+requests concurrently (inventory and topology are fetched at once, flows are deployed to switches in parallel).
+
+The wrapped client stays fully usable; schedulers and RTman keep using its synchronous methods.
+"""
+from misc.worker_pool import WorkerPool, gather
+
+
+class AsyncODLClient(object):
+    """
+    Future-based facade of an ODLClient.
+    """
+    __slots__ = ("_client", "_operation_worker")
+
+    def __init__(self, client):
+        """
+
+        :param ODLClient client: client that executes the operations
+        """
+        self._client = client
+        self._operation_worker = WorkerPool(1, name="ODLOperation")
+
+    @property
+    def client(self):
+        """
+        :return: the wrapped (synchronous) client
+        :rtype: ODLClient
+        """
+        return self._client
+
+    def request(self, path, method="GET", data=None, timeout=None):
+        """
+        send a request to the restconf interface, see ODLClient._request
+        :return: future for the response text
+        :rtype: Future
+        """
+        return self._client._request_async(path, method=method, data=data, timeout=timeout)
+
+    def request_json(self, path, method="GET", json=None, timeout=None, headers=None):
+        """
+        send a request to the restconf interface, see ODLClient._request_json
+        :return: future for the response dict
+        :rtype: Future
+        """
+        return self._client._request_json_async(path, method=method, json=json, timeout=timeout, headers=headers)
+
+    def request_json_all(self, requests):
+        """
+        send several requests at once.
+        :param iterable[dict] requests: keyword arguments of request_json for each request, e.g. {"path": ...}
+        :return: future for the list of response dicts, in order of requests
+        :rtype: Future
+        """
+        return gather(self.request_json(**kwargs) for kwargs in requests)
+
+    def _submit_operation(self, fn, *args):
+        return self._operation_worker.submit(fn, *args)
+
+    def build_nodes(self):
+        """
+        update the topology model of the client, see ODLClient._build_nodes
+        :return: future for whether a new switch or connection has been found
+        :rtype: Future
+        """
+        return self._submit_operation(self._client._build_nodes)
+
+    def refresh(self):
+        """
+        fetch the complete topology, see ODLClient.refresh
+        :return: future for the snapshot of the updated topology
+        :rtype: Future
+        """
+        return self._submit_operation(self._client.refresh)
+
+    def refresh_flows(self, node_ids=None):
+        """
+        fetch the flow tables of switches, see ODLClient.refresh_flows
+        :param iterable[str] node_ids: switches to fetch the flows of; all switches if None
+        :rtype: Future
+        """
+        if node_ids is not None:
+            node_ids = tuple(node_ids)
+        return self._submit_operation(self._client.refresh_flows, node_ids)
+
+    def nodes(self):
+        """
+        :return: future for the nodes of the current topology snapshot, identified by their node_ids
+        :rtype: Future
+        """
+        return self._submit_operation(lambda: self._client.nodes)
+
+    def deploy_new_flowset(self, flows):
+        """
+        deploy a new set of flows, and remove the old set, see ODLClient.deploy_new_flowset
+        :param iterable[FlowTableEntry] flows: new set of flows
+        :return: future that is done once the flowset is deployed
+        :rtype: Future
+        """
+        flows = tuple(flows)  # the caller may change its collection in the meantime
+        return self._submit_operation(self._client.deploy_new_flowset, flows)
+
+    def clean_up_flows(self):
+        """
+        remove all flows that have been added by the client, see ODLClient.clean_up_flows
+        :return: future that is done once the flows are removed
+        :rtype: Future
+        """
+        return self._submit_operation(self._client.clean_up_flows)
+
+    def start_topology_changes_listener(self):
+        """
+        subscribe to topology changes, see ODLClient.start_topology_changes_listener
+        :return: future that is done once the subscription is active
+        :rtype: Future
+        """
+        return self._submit_operation(self._client.start_topology_changes_listener)
+
+    def bootstrap(self, start_listener=True):
+        """
+        bring up the wrapped client, see ODLClient.bootstrap
+        :return: future for the report of the bootstrap steps
+        :rtype: Future
+        """
+        return self._submit_operation(self._client.bootstrap, start_listener)
+
+    def start(self):
+        """
+        see ODLClient.start
+        :rtype: Future
+        """
+        return self._submit_operation(self._client.start)
+
+    def stop(self):
+        """
+        stop the wrapped client after all submitted operations have been executed.
+        :return: future that is done once the client is stopped
+        :rtype: Future
+        """
+        future = self._submit_operation(self._client.stop)
+        self._operation_worker.stop()
+        return future
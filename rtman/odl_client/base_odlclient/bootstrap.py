@@ -0,0 +1,124 @@
+"""
+Timing of the startup of an ODL client.
+
+ODLClient.bootstrap executes the startup in a single pass: the topology is fetched once, and the topology model, all
+data derived from it and the topology changes listener are built from that fetch. A BootstrapReport records how long
+each step took. Subclasses add their own steps, e.g. the scheduler topology and the TAS mounts of IRTOdlClient.
+Only the steps of the thread that runs the bootstrap are recorded; the same code runs on topology updates of other
+threads, e.g. of the topology changes listener, while the bootstrap is in progress.
+"""
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from threading import RLock, current_thread
+
+
+class BootstrapReport(object):
+    """
+    Durations of the bootstrap steps, in order of execution.
+    Steps may be nested; the duration of a step includes its substeps.
+    """
+    __slots__ = ("_durations", "_depths", "_depth",
+                 "_recording_thread",  # type: Thread  # thread whose steps are recorded, see recording
+                 "_lock")
+
+    def __init__(self):
+        self._durations = OrderedDict()  # step name -> seconds
+        self._depths = {}  # step name -> nesting depth
+        self._depth = 0
+        self._recording_thread = None
+        self._lock = RLock()
+
+    def __repr__(self):
+        with self._lock:
+            return "BootstrapReport[%s]" % ", ".join("%s%s: %.3fs" % ("  " * self._depths[name], name, duration)
+                                                     for name, duration in self._durations.items())
+
+    @contextmanager
+    def recording(self):
+        """
+        record the steps that the current thread executes within the context.
+        :return: context manager
+        :raises: RuntimeError if another thread is recording already
+        """
+        with self._lock:
+            if self._recording_thread is not None and self._recording_thread is not current_thread():
+                raise RuntimeError("%s is already recording" % self._recording_thread.name)
+            outer = self._recording_thread is not None
+            self._recording_thread = current_thread()
+        try:
+            yield self
+        finally:
+            if not outer:
+                with self._lock:
+                    self._recording_thread = None
+
+    @contextmanager
+    def step(self, name):
+        """
+        time a step. Outside of recording (see recording), and in other threads than the recording one, nothing is
+        recorded, so code that runs on every topology update can report its steps unconditionally.
+        :param str name:
+        :return: context manager
+        """
+        with self._lock:
+            recording = self._recording_thread is current_thread()
+            if recording:
+                new = name not in self._durations
+                if new:  # listed in order of start, so that substeps follow their step
+                    self._durations[name] = 0.0
+                    self._depths[name] = self._depth
+                self._depth += 1
+        if not recording:
+            yield
+            return
+        start = time.time()
+        try:
+            yield
+        except BaseException:
+            with self._lock:
+                if new:  # a failed step is executed again by the next bootstrap
+                    del self._durations[name]
+                    del self._depths[name]
+            raise
+        finally:
+            with self._lock:
+                self._depth -= 1
+                if name in self._durations:
+                    self._durations[name] += time.time() - start
+
+    def done(self, name):
+        """
+        :param str name:
+        :return: whether the step has been executed successfully
+        :rtype: bool
+        """
+        with self._lock:
+            return name in self._durations
+
+    @property
+    def durations(self):
+        """
+        :return: seconds by step name, in order of execution
+        :rtype: OrderedDict[str, float]
+        """
+        with self._lock:
+            return self._durations.copy()
+
+    @property
+    def total(self):
+        """
+        :return: seconds spent in all top-level steps
+        :rtype: float
+        """
+        with self._lock:
+            return sum(duration for name, duration in self._durations.items() if self._depths[name] == 0)
+
+    @property
+    def json(self):
+        with self._lock:
+            return {
+                "steps": [{"name": name, "depth": self._depths[name], "seconds": duration}
+                          for name, duration in self._durations.items()],
+                "total": self.total
+            }
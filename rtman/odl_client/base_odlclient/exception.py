@@ -0,0 +1,18 @@
+class APIException(Exception):
+    """
+    Exception to be thrown when an API call fails
+    """
+
+    def __init__(self, message="", status_code=None):
+        """
+
+        :param str message: error message, usually the response body
+        :param int status_code: HTTP status code of the failed request, if any
+        """
+        super(APIException, self).__init__(message)
+        self.status_code = status_code
+
+class AlreadyExistsException(APIException):
+    """
+    Exception to be thrown when an API call fails because the to-be-added data already exists.
+    """
@@ -0,0 +1,79 @@
+"""
+Fetch profiles select the parts of the operational inventory that are requested from the controller.
+
+The complete inventory contains statistics of every port, table and flow, and an entry for every one of the 254
+flow tables of each switch. Most consumers need a small fraction of it. A profile is sent as RESTCONF "fields"
+query parameter, e.g. ?fields=node(id;node-connector(id)), so that the controller only serializes these subtrees.
+Controllers that do not support the parameter answer with an error; ODLClient then falls back to the complete
+inventory.
+"""
+try:  # python 2/3 compatibility
+    from urllib import quote
+except ImportError:
+    from urllib.parse import quote
+
+
+class FetchProfile(object):
+    """
+    Subtrees of an inventory node that are requested from the controller.
+    """
+    __slots__ = ("_name", "_node_fields")
+
+    def __init__(self, name, node_fields=None):
+        """
+
+        :param str name: name for log messages
+        :param str node_fields: RESTCONF fields expression relative to a node, e.g. "id;node-connector(id)".
+            None requests the complete node.
+        """
+        self._name = name
+        self._node_fields = node_fields
+
+    def __repr__(self):
+        return "FetchProfile[%s]" % self._name
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def node_fields(self):
+        """
+        :rtype: str|None
+        """
+        return self._node_fields
+
+    def inventory_path(self, node_id=None):
+        """
+        :param str node_id: request a single node; all nodes if None
+        :return: restconf path of the operational inventory, including the fields query parameter
+        :rtype: str
+        """
+        if node_id is None:
+            path = "operational/opendaylight-inventory:nodes/"
+            fields = None if self._node_fields is None else "node(%s)" % self._node_fields
+        else:
+            path = "operational/opendaylight-inventory:nodes/node/%s/" % quote(node_id, safe=":")
+            fields = self._node_fields
+        if fields is None:
+            return path
+        return "%s?fields=%s" % (path, quote(fields, safe="():/-_"))
+
+
+# complete nodes, including all statistics
+FULL = FetchProfile("full")
+
+# what Switch._update requires to build the topology model: connectors, their names, and the switch's address
+TOPOLOGY = FetchProfile(
+    "topology",
+    "id;flow-node-inventory:ip-address;node-connector(id;flow-node-inventory:name)"
+)
+
+# flows as read by FlowTableEntry.from_odl_inventory, without statistics, e.g. to reconcile deployed flows
+FLOW_TABLES = FetchProfile(
+    "flow-tables",
+    "id;flow-node-inventory:table(id;flow(id;table_id;priority;match;instructions;idle-timeout;hard-timeout))"
+)
+
+# management addresses only, e.g. to mount switches via NETCONF
+ADDRESSES = FetchProfile("addresses", "id;flow-node-inventory:ip-address")
@@ -0,0 +1,443 @@
+"""
+Deployment of flow table entries.
+
+ODLClient.deploy_new_flowset separates a new flowset into flows to add, to update, and to remove (diff_flowsets).
+Flows are matched by their key, i.e., by switch, table, and id. Flows whose content is unchanged are not deployed
+again.
+The FlowDeploymentEngine executes these operations: operations are grouped by switch, and switches are processed in
+parallel by a bounded pool of workers. Within a switch, operations are executed one after another in a fixed order:
+
+ 1. removals of entries whose ID collides with an entry that is to be added
+ 2. additions
+ 3. updates
+ 4. all other removals
+
+Each update is done with a FlowUpdateStrategy that is selected per flow, see openflow.update_strategy.
+
+In bulk mode, all operations on a flow table of a switch are sent as a single FlowTablePatch, so that a deployment
+needs one request per switch and table instead of one request per flow. Make-before-break updates are executed
+separately, after a patch with the operations of stages 1-3 and before a patch with the removals of stage 4. If the controller rejects a patch, the
+operations of that patch are executed one by one instead. If the controller does not support patches at all, bulk
+mode is disabled for all further deployments.
+
+The result of every operation is collected in a FlowDeploymentReport.
+"""
+import logging
+import time
+
+from odl_client.base_odlclient.exception import APIException, AlreadyExistsException
+from odl_client.base_odlclient.openflow import FlowTablePatch
+from odl_client.base_odlclient.openflow.update_strategy import select_update_strategy, MAKE_BEFORE_BREAK
+
+# HTTP status codes that indicate that the controller does not support FlowTablePatches at all.
+BULK_UNSUPPORTED_STATUS_CODES = (405, 406, 415, 501)
+
+
+class FlowsetDiff(object):
+    """
+    Difference between the deployed flows and a new flowset.
+    """
+    __slots__ = ("_to_add", "_to_update", "_to_remove", "_unchanged")
+
+    def __init__(self, to_add, to_update, to_remove, unchanged):
+        """
+
+        :param list[FlowTableEntry] to_add: new flows without a deployed counterpart
+        :param list[tuple[FlowTableEntry, FlowTableEntry]] to_update: (new, deployed) flows with same key but different
+                                                                      content
+        :param list[FlowTableEntry] to_remove: deployed flows without a new counterpart
+        :param list[FlowTableEntry] unchanged: deployed flows with a new counterpart of the same content
+        """
+        self._to_add = to_add
+        self._to_update = to_update
+        self._to_remove = to_remove
+        self._unchanged = unchanged
+
+    def __repr__(self):
+        return "FlowsetDiff[%d to add, %d to update, %d to remove, %d unchanged]" % (
+            len(self._to_add), len(self._to_update), len(self._to_remove), len(self._unchanged))
+
+    @property
+    def to_add(self):
+        return self._to_add
+
+    @property
+    def to_update(self):
+        return self._to_update
+
+    @property
+    def to_remove(self):
+        return self._to_remove
+
+    @property
+    def unchanged(self):
+        return self._unchanged
+
+
+def diff_flowsets(deployed_flows, new_flows):
+    """
+    separate a new flowset into flows to add, update, and remove, in linear time.
+
+    :param iterable[FlowTableEntry] deployed_flows: currently deployed flows
+    :param iterable[FlowTableEntry] new_flows: flows that should be deployed afterwards
+    :rtype: FlowsetDiff
+    """
+    new_by_key = {}
+    for flow in new_flows:
+        if flow.key in new_by_key and new_by_key[flow.key].fingerprint != flow.fingerprint:
+            logging.warning("flowset contains different flows with the same id, using only one: %s" % flow)
+        new_by_key[flow.key] = flow
+
+    deployed_by_key = {flow.key: flow for flow in deployed_flows}
+
+    to_add = []
+    to_update = []
+    unchanged = []
+    for key, flow in new_by_key.items():
+        deployed = deployed_by_key.pop(key, None)
+        if deployed is None:
+            to_add.append(flow)
+        elif deployed.fingerprint == flow.fingerprint:
+            unchanged.append(deployed)
+        else:
+            to_update.append((flow, deployed))
+    return FlowsetDiff(to_add, to_update, list(deployed_by_key.values()), unchanged)
+
+
+class FlowOperation(object):
+    """
+    A single operation on a flow table entry.
+    """
+    __slots__ = ("_kind", "_flow", "_old_flow", "_strategy")
+
+    ADD = "add"
+    UPDATE = "update"
+    REMOVE = "remove"
+
+    def __init__(self, kind, flow, old_flow=None, strategy=None):
+        """
+
+        :param str kind: one of FlowOperation.ADD, FlowOperation.UPDATE, FlowOperation.REMOVE
+        :param FlowTableEntry flow: flow to add, update to, or remove
+        :param FlowTableEntry old_flow: for updates: the flow that is replaced by flow
+        :param FlowUpdateStrategy strategy: for updates: how old_flow is replaced by flow
+        """
+        self._kind = kind
+        self._flow = flow
+        self._old_flow = old_flow
+        self._strategy = strategy
+
+    def __repr__(self):
+        return "FlowOperation[%s %s]" % (self._kind, self._flow.__repr__())
+
+    @property
+    def kind(self):
+        return self._kind
+
+    @property
+    def flow(self):
+        """
+        :rtype: FlowTableEntry
+        """
+        return self._flow
+
+    @property
+    def old_flow(self):
+        """
+        :rtype: FlowTableEntry
+        """
+        return self._old_flow
+
+    @property
+    def strategy(self):
+        """
+        :rtype: FlowUpdateStrategy
+        """
+        return self._strategy
+
+    @property
+    def switch(self):
+        return self._flow.switch
+
+
+class FlowOperationResult(object):
+    """
+    Result of a FlowOperation.
+
+    success means that the switch is in the state that the operation intended, i.e., the flow is deployed (add,
+    update) or removed (remove). An add operation of an already existing flow is only successful if the following
+    update succeeds. exception holds the error of a failed operation, which is not necessarily an APIException (e.g.
+    a timeout of the request).
+    """
+    __slots__ = ("_operation", "_success", "_exception", "_duration")
+
+    def __init__(self, operation, success, exception=None, duration=0.0):
+        self._operation = operation
+        self._success = success
+        self._exception = exception
+        self._duration = duration
+
+    def __repr__(self):
+        return "FlowOperationResult[%s %s]" % (self._operation.__repr__(), "ok" if self._success else "failed")
+
+    @property
+    def operation(self):
+        """
+        :rtype: FlowOperation
+        """
+        return self._operation
+
+    @property
+    def success(self):
+        return self._success
+
+    @property
+    def exception(self):
+        return self._exception
+
+    @property
+    def duration(self):
+        """
+        :return: time needed for the operation, in seconds
+        :rtype: float
+        """
+        return self._duration
+
+
+class FlowDeploymentReport(object):
+    """
+    aggregated results of a deployment.
+    """
+    __slots__ = ("_results", "_duration")
+
+    def __init__(self, results, duration):
+        """
+
+        :param list[FlowOperationResult] results:
+        :param float duration: wall clock time of the deployment, in seconds
+        """
+        self._results = results
+        self._duration = duration
+
+    def __repr__(self):
+        return "FlowDeploymentReport[%d operations (%d failed) on %d switches in %.3fs]" % (
+            len(self._results), len(self.failed), len(self.switches), self._duration)
+
+    @property
+    def results(self):
+        return list(self._results)
+
+    @property
+    def duration(self):
+        return self._duration
+
+    @property
+    def succeeded(self):
+        return [r for r in self._results if r.success]
+
+    @property
+    def failed(self):
+        return [r for r in self._results if not r.success]
+
+    @property
+    def switches(self):
+        return set(r.operation.switch.node_id for r in self._results)
+
+    def count(self, kind, success=True):
+        """
+        :param str kind: operation kind, see FlowOperation
+        :param bool success: count successful (True) or failed (False) operations
+        :return: number of operations of the given kind
+        :rtype: int
+        """
+        return sum(1 for r in self._results if r.operation.kind == kind and r.success == success)
+
+
+class FlowDeploymentEngine(object):
+    """
+    Executes flow operations, switch by switch in parallel.
+    """
+    __slots__ = ("_worker_pool", "_bulk", "_select_update_strategy")
+
+    def __init__(self, worker_pool, bulk=False, update_strategy_selector=select_update_strategy):
+        """
+
+        :param WorkerPool worker_pool: pool that limits the number of switches that are processed in parallel
+        :param bool bulk: send all operations on a flow table in a single request
+        :param update_strategy_selector: function (new_flow, old_flow) -> FlowUpdateStrategy that chooses how each
+                                         update is done
+        """
+        self._worker_pool = worker_pool
+        self._bulk = bulk
+        self._select_update_strategy = update_strategy_selector
+
+    @property
+    def bulk(self):
+        """
+        :return: whether bulk mode is (still) enabled
+        :rtype: bool
+        """
+        return self._bulk
+
+    def plan(self, to_add, to_update, to_remove):
+        """
+        group operations by switch and bring them into their execution order.
+
+        :param iterable[FlowTableEntry] to_add: flows to add
+        :param iterable[tuple[FlowTableEntry, FlowTableEntry]] to_update: (new, old) flow pairs
+        :param iterable[FlowTableEntry] to_remove: flows to remove
+        :return: switch node_id -> ordered list of operations
+        :rtype: dict[str, list[FlowOperation]]
+        """
+        by_switch = {}
+
+        def operations_of(flow):
+            try:
+                return by_switch[flow.switch.node_id]
+            except KeyError:
+                operations = by_switch[flow.switch.node_id] = ([], [], [], [])
+                return operations
+
+        added_ids = set((flow.switch.node_id, flow.entry_name) for flow in to_add)
+        for flow in to_remove:
+            if (flow.switch.node_id, flow.entry_name) in added_ids:
+                operations_of(flow)[0].append(FlowOperation(FlowOperation.REMOVE, flow))
+            else:
+                operations_of(flow)[3].append(FlowOperation(FlowOperation.REMOVE, flow))
+        for flow in to_add:
+            operations_of(flow)[1].append(FlowOperation(FlowOperation.ADD, flow))
+        for new, old in to_update:
+            operations_of(new)[2].append(
+                FlowOperation(FlowOperation.UPDATE, new, old, self._select_update_strategy(new, old)))
+        for stages in by_switch.values():
+            # make-before-break updates last, so that bulk mode can send all other updates with the stages before
+            stages[2].sort(key=lambda operation: operation.strategy is MAKE_BEFORE_BREAK)
+
+        return {node_id: [o for stage in stages for o in stage] for node_id, stages in by_switch.items()}
+
+    def execute(self, to_add=(), to_update=(), to_remove=()):
+        """
+        execute all operations. Blocks until all operations are done.
+
+        :param iterable[FlowTableEntry] to_add: flows to add
+        :param iterable[tuple[FlowTableEntry, FlowTableEntry]] to_update: (new, old) flow pairs
+        :param iterable[FlowTableEntry] to_remove: flows to remove
+        :rtype: FlowDeploymentReport
+        """
+        start = time.time()
+        plan = self.plan(to_add, to_update, to_remove)
+        results = []
+        for switch_results in self._worker_pool.map(self._execute_switch, plan.values()):
+            results.extend(switch_results)
+        report = FlowDeploymentReport(results, time.time() - start)
+        logging.debug(report)
+        return report
+
+    def _execute_switch(self, operations):
+        """
+        execute the operations of one switch in the given order.
+        :param list[FlowOperation] operations:
+        :rtype: list[FlowOperationResult]
+        """
+        if self._bulk:
+            return self._execute_switch_bulk(operations)
+        return [self._execute_operation(operation) for operation in operations]
+
+    def _execute_switch_bulk(self, operations):
+        """
+        execute the operations of one switch with one FlowTablePatch per flow table.
+        Make-before-break updates need several steps and can't be part of a patch. They are executed one by one at
+        their place in the order of the operations, between a patch with the operations before them and a patch with
+        the operations after them, so that e.g. the old paths are only removed once their replacements exist.
+        :param list[FlowOperation] operations:
+        :rtype: list[FlowOperationResult]
+        """
+        results = []
+        patch_operations = []
+        for operation in operations:
+            if operation.strategy is MAKE_BEFORE_BREAK:
+                if patch_operations:
+                    results.extend(self._execute_patches(patch_operations))
+                    patch_operations = []
+                results.append(self._execute_operation(operation))
+            else:
+                patch_operations.append(operation)
+        if patch_operations:
+            results.extend(self._execute_patches(patch_operations))
+        return results
+
+    def _execute_patches(self, operations):
+        """
+        execute operations with one FlowTablePatch per flow table; falls back to single writes if a patch is rejected.
+        :param list[FlowOperation] operations: operations of one switch, none of them a make-before-break update
+        :rtype: list[FlowOperationResult]
+        """
+        if not self._bulk:  # disabled meanwhile, by a patch to another switch
+            return [self._execute_operation(operation) for operation in operations]
+
+        patches = {}  # table_id -> (patch, operations)
+        for operation in operations:
+            table_id = operation.flow.table_id
+            if table_id not in patches:
+                patches[table_id] = (FlowTablePatch(operation.switch, table_id), [])
+            patch, patch_operations = patches[table_id]
+            if operation.kind == FlowOperation.REMOVE:
+                patch.remove_flow(operation.flow)
+            else:
+                patch.add_flow(operation.flow)
+            patch_operations.append(operation)
+
+        results = []
+        for table_id in sorted(patches.keys()):
+            patch, patch_operations = patches[table_id]
+            start = time.time()
+            try:
+                patch.deploy()
+            except APIException as e:
+                if e.status_code in BULK_UNSUPPORTED_STATUS_CODES:
+                    logging.info("controller does not support bulk flow writes (HTTP %s), using single writes" %
+                                 e.status_code)
+                    self._bulk = False
+                else:
+                    logging.debug("bulk write to %s table %d failed, using single writes: %s" %
+                                  (patch_operations[0].switch.node_id, table_id, e))
+                results.extend(self._execute_operation(operation) for operation in patch_operations)
+            except Exception as e:
+                # e.g. a timeout: the controller has not rejected the patch, so don't send its operations again
+                logging.debug("bulk write to %s table %d failed: %s" %
+                              (patch_operations[0].switch.node_id, table_id, e))
+                duration = (time.time() - start) / len(patch_operations)
+                results.extend(FlowOperationResult(operation, False, e, duration) for operation in patch_operations)
+            else:
+                duration = (time.time() - start) / len(patch_operations)
+                results.extend(FlowOperationResult(operation, True, duration=duration)
+                               for operation in patch_operations)
+        return results
+
+    @staticmethod
+    def _execute_operation(operation):
+        """
+        :param FlowOperation operation:
+        :rtype: FlowOperationResult
+        """
+        start = time.time()
+        flow = operation.flow
+        success = True
+        exception = None
+        try:
+            if operation.kind == FlowOperation.ADD:
+                try:
+                    flow.deploy()
+                except AlreadyExistsException:
+                    flow.modify()
+            elif operation.kind == FlowOperation.UPDATE:
+                operation.strategy.update(flow, operation.old_flow)
+            else:
+                flow.remove()
+        except Exception as e:
+            # not only APIExceptions: request timeouts and connection errors, or updates that are not possible
+            # (see MakeBeforeBreakUpdate) must not abort the deployment of the other operations and switches.
+            success = False
+            exception = e
+            logging.debug("%s failed: %s" % (operation, e))
+        return FlowOperationResult(operation, success, exception, time.time() - start)
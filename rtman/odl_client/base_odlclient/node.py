@@ -1,3 +1,6 @@
+import hashlib
+import json
+
 from odl_client.base_odlclient.openflow import FlowTableEntry
 
 
@@ -12,6 +15,19 @@ class NotOwnConnectorException(Exception):
     """
 
 
+def connector_order(connector_id):
+    """
+    sort key of connector ids: by port number, so that e.g. openflow:1:2 comes before openflow:1:10.
+    Ports without a number (e.g. openflow:1:LOCAL) come after the numbered ports of their node.
+    :param str connector_id:
+    :rtype: tuple
+    """
+    prefix, _, port = connector_id.rpartition(":")
+    if port.isdigit():
+        return prefix, 0, int(port), ""
+    return prefix, 1, 0, port
+
+
 class ODLNodeConnector(object):
     """
     A Connector of an ODLNode
@@ -67,7 +83,11 @@ class ODLNodeConnector(object):
         :return: None
         :rtype: NoneType
         """
+        if self._target is not None:
+            self._parent._remove_neighbor_connector(self._target.parent, self)
         self._target = other_connector
+        if other_connector is not None:
+            self._parent._add_neighbor_connector(other_connector.parent, self)
         if reverse:
             other_connector._connect_to(self, reverse=False)
 
@@ -80,7 +100,7 @@ class ODLNode(object):
     A node has multiple connectors, which are the interfaces that connect the node to an interface of another node.
     A link is thus:     node <-> connector <-> connector <-> node
     """
-    __slots__ = ("_node_id", "_odlclient")
+    __slots__ = ("_node_id", "_odlclient", "_neighbor_connectors")
     _connector_cls = ODLNodeConnector
 
     def __repr__(self):
@@ -94,6 +114,7 @@ class ODLNode(object):
         """
         self._node_id = node_id
         self._odlclient = odlclient
+        self._neighbor_connectors = {}  # neighbor node_id -> (neighbor, connectors sorted by connector_order)
 
     def __eq__(self, o):
         return isinstance(o, self.__class__) and self.node_id == o.node_id
@@ -144,13 +165,11 @@ class ODLNode(object):
         :rtype: ODLNodeConnector
         :raises: NotANeighborException
         """
-        if type(neighbor) == str:
-            neighbor = self.odlclient.get_node(neighbor)
-        for conn in self.list_connectors():
-            if conn.target:
-                if conn.target.parent == neighbor:
-                    return conn
-        raise NotANeighborException
+        node_id = neighbor.node_id if isinstance(neighbor, ODLNode) else neighbor
+        try:
+            return self._neighbor_connectors[node_id][1][0]  # parallel links: the lowest port number
+        except KeyError:
+            raise NotANeighborException
 
     def get_neighbors(self):
         """
@@ -158,7 +177,34 @@ class ODLNode(object):
         :return: list of all neighbors (i.e. ODLNodes that have a connector connected to one of this node's connectors)
         :rtype: set[ODLNode]
         """
-        return set(conn.target.parent for conn in self.list_connectors() if conn.target)
+        return set(neighbor for neighbor, _ in self._neighbor_connectors.values())
+
+    def _add_neighbor_connector(self, neighbor, connector):
+        """
+        called by ODLNodeConnector._connect_to when one of this node's connectors has been connected to neighbor.
+        :param ODLNode neighbor:
+        :param ODLNodeConnector connector:
+        :return:
+        """
+        _, connectors = self._neighbor_connectors.get(neighbor.node_id, (None, ()))
+        connectors = sorted(set(connectors) | {connector}, key=lambda c: connector_order(c.connector_id))
+        self._neighbor_connectors[neighbor.node_id] = (neighbor, connectors)
+
+    def _remove_neighbor_connector(self, neighbor, connector):
+        """
+        called by ODLNodeConnector._connect_to when one of this node's connectors has been disconnected from neighbor.
+        :param ODLNode neighbor:
+        :param ODLNodeConnector connector:
+        :return:
+        """
+        entry = self._neighbor_connectors.get(neighbor.node_id)
+        if entry is None:
+            return
+        connectors = [c for c in entry[1] if c is not connector]
+        if connectors:
+            self._neighbor_connectors[neighbor.node_id] = (entry[0], connectors)
+        else:
+            del self._neighbor_connectors[neighbor.node_id]
 
 
 
@@ -196,7 +242,7 @@ class Host(ODLNode):
     """
     Node that is a host
     """
-    __slots__ = ("_known_addresses", "_connector")
+    __slots__ = ("_known_addresses", "_mac_addresses", "_ip_addresses", "_connector")
 
     _connector_cls = HostConnector
 
@@ -209,6 +255,8 @@ class Host(ODLNode):
         self._connector = None
         super(Host, self).__init__(odlclient, topology_dict["node-id"])
         self._known_addresses = {}
+        self._mac_addresses = frozenset()
+        self._ip_addresses = frozenset()
         self._update(topology_dict)
 
     @property
@@ -216,18 +264,18 @@ class Host(ODLNode):
         """
 
         :return: list of all known mac addresses of this host
-        :rtype: list[str]
+        :rtype: set[str]
         """
-        return set(entry["mac"] for entry in self._known_addresses.values())
+        return set(self._mac_addresses)
 
     @property
     def ip_addresses(self):
         """
 
-        :return: list of all known mac addresses of this host
-        :rtype: list[str]
+        :return: list of all known ip addresses of this host
+        :rtype: set[str]
         """
-        return set(entry["ip"] for entry in self._known_addresses.values())
+        return set(self._ip_addresses)
 
 
     def _update(self, topology_dict):
@@ -244,10 +292,16 @@ class Host(ODLNode):
             self._known_addresses[adr["ip"]] = adr
             iplist.append(adr["ip"])
         # remove entries that are no longer known to the controller
-        for ip in self._known_addresses.keys():
+        for ip in list(self._known_addresses.keys()):
             if ip not in iplist:
                 del self._known_addresses[ip]
 
+        # keep the address indexes of the client in sync
+        old_mac_addresses, old_ip_addresses = self._mac_addresses, self._ip_addresses
+        self._mac_addresses = frozenset(entry["mac"] for entry in self._known_addresses.values())
+        self._ip_addresses = frozenset(self._known_addresses.keys())
+        self._odlclient._index_host_addresses(self, old_mac_addresses, old_ip_addresses)
+
         if self._connector:
             topology_change_detected |= self._connector._update(
                 topology_dict["host-tracker-service:attachment-points"]
@@ -261,6 +315,20 @@ class Host(ODLNode):
             topology_change_detected = True
         return topology_change_detected
 
+    def _topology_dict(self):
+        """
+        inverse of _update, e.g. to persist the host for a warm start.
+        :return: data structure in ODL topology that describes this host, as far as it is read by _update
+        :rtype: dict
+        """
+        target = self._connector.target
+        return {
+            "node-id": self.node_id,
+            "host-tracker-service:addresses": list(self._known_addresses.values()),
+            "host-tracker-service:attachment-points": [{"tp-id": target.connector_id}] if target else [],
+            "termination-point": [{"tp-id": self._connector.connector_id}]
+        }
+
     def get_connector(self, connector_id=None):
         """
 
@@ -337,9 +405,13 @@ class Switch(ODLNode):
     """
     ODLNode representing an OpenFlow switch
     """
-    __slots__ = ("_connectors", "_flows", "_ip_address")
+    __slots__ = ("_connectors", "_flow_table_digests", "_unparsed_flow_tables", "_flows_by_table", "_ip_address")
     _connector_cls = SwitchConnector
 
+    # flow fields read by FlowTableEntry.from_odl_inventory. Statistics change all the time and are not part of
+    # the digest, so that a flow table with the same entries is not parsed again.
+    _flow_digest_fields = ("id", "table_id", "priority", "match", "instructions", "idle-timeout", "hard-timeout")
+
     def __init__(self, odlclient, inventory_dict):
         """
 
@@ -348,6 +420,9 @@ class Switch(ODLNode):
         """
         super(Switch, self).__init__(odlclient, inventory_dict["id"])
         self._connectors = {}
+        self._flow_table_digests = {}
+        self._unparsed_flow_tables = {}
+        self._flows_by_table = {}
         self._update(inventory_dict)
 
     def _update(self, inventory_dict):
@@ -367,24 +442,103 @@ class Switch(ODLNode):
                 self._connectors[connector["id"]] = self._connector_cls(self, connector)
                 topology_change_detected = True
         # clean up old ones
-        for connector_id in self._connectors.keys():
+        for connector_id in list(self._connectors.keys()):
             if connector_id not in validconnectorids:
                 self._connectors[connector_id].invalidate()
+                self._connectors[connector_id]._connect_to(None, reverse=False)
                 del self._connectors[connector_id]
                 topology_change_detected = True
 
-        self._flows = set()
-        for table in inventory_dict["flow-node-inventory:table"]:
-            if "flow" in table:
-                self._flows.update((FlowTableEntry.from_odl_inventory(self, inv) for inv in table["flow"]))  # fixme: use a loss-free flow table entry class here
+        if "flow-node-inventory:table" in inventory_dict:  # not requested by every fetch profile
+            self._update_flow_tables(inventory_dict["flow-node-inventory:table"])
 
         self._ip_address = inventory_dict["flow-node-inventory:ip-address"]
 
         return topology_change_detected
 
+    def _inventory_dict(self):
+        """
+        inverse of _update, e.g. to persist the switch for a warm start. Flow tables are not included.
+        :return: ODL inventory data representing this node, as far as it is read by _update
+        :rtype: dict
+        """
+        return {
+            "id": self.node_id,
+            "flow-node-inventory:ip-address": self._ip_address,
+            "node-connector": [{"id": connector.connector_id, "flow-node-inventory:name": connector.interface_name}
+                               for connector in self._connectors.values()]
+        }
+
+    def _update_flow_tables(self, tables):
+        """
+        read the flow tables of the inventory.
+        flow tables are parsed on first access of the flows, and only if their content has changed.
+        :param list[dict] tables: flow-node-inventory:table of the inventory node
+        :return: None
+        """
+        flow_table_digests = {}
+        unparsed_flow_tables = {}
+        for table in tables:
+            if not table.get("flow"):
+                continue
+            digest = self._flow_table_digest(table["flow"])
+            flow_table_digests[table["id"]] = digest
+            parsed = self._flows_by_table.get(table["id"])
+            if parsed is None or parsed[0] != digest:
+                unparsed_flow_tables[table["id"]] = (digest, table["flow"])
+        self._flow_table_digests = flow_table_digests
+        self._unparsed_flow_tables = unparsed_flow_tables
+
+    @classmethod
+    def _flow_table_digest(cls, flows):
+        """
+        :param list[dict] flows: flows of a table in the ODL inventory
+        :return: digest of the flows' content
+        :rtype: str
+        """
+        # no sort_keys: it disables the C encoder. A different key order only causes the table to be parsed again.
+        content = json.dumps([[flow.get(field) for field in cls._flow_digest_fields] for flow in flows])
+        return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+    def _parse_flows(self):
+        """
+        parse the flow tables that have changed since they were last parsed.
+        :return: parsed flows by table id and flow id
+        :rtype: dict[int, dict[str, FlowTableEntry]]
+        """
+        digests, unparsed = self._flow_table_digests, self._unparsed_flow_tables
+        if unparsed or len(self._flows_by_table) != len(digests):
+            flows_by_table = {table_id: parsed for table_id, parsed in self._flows_by_table.items()
+                              if table_id in digests}
+            for table_id, (digest, flows) in unparsed.items():
+                entries = {}
+                for inv in flows:
+                    entry = FlowTableEntry.from_odl_inventory(self, inv)  # fixme: use a loss-free flow table entry class here
+                    entries[entry.entry_name] = entry
+                flows_by_table[table_id] = (digest, entries)
+            self._flows_by_table = flows_by_table
+            if self._unparsed_flow_tables is unparsed:
+                self._unparsed_flow_tables = {}
+        return {table_id: entries for table_id, (_, entries) in self._flows_by_table.items()}
+
     @property
     def flows(self):
-        return set(self._flows)
+        """
+        :return: flows in the switch's operational inventory, as of the last fetch that included the flow tables
+            (see ODLClient.refresh_flows)
+        :rtype: set[FlowTableEntry]
+        """
+        return set(entry for entries in self._parse_flows().values() for entry in entries.values())
+
+    def get_flow(self, table_id, flow_id):
+        """
+        :param int table_id:
+        :param str flow_id:
+        :return: the flow with the given id in the switch's operational inventory
+        :rtype: FlowTableEntry
+        :raises: KeyError if there is no such flow
+        """
+        return self._parse_flows()[table_id][flow_id]
 
     @property
     def path_on_odl(self):
@@ -1,25 +1,30 @@
 import logging
 import time
-import requests
 import json as json_module
-import traceback
+from collections import OrderedDict
 from threading import Lock, Thread
 
+try:  # python 2/3 compatibility
+    from urllib import quote
+except ImportError:
+    from urllib.parse import quote
+
 import websocket
 from requests import auth
 
 from odl_client.base_odlclient.requestlog import JSONLogger, NoLogger
-from odl_client.base_odlclient.node import Host, Switch, ODLNode
-
-class APIException(Exception):
-    """
-    Exception to be thrown when an API call fails
-    """
-
-class AlreadyExistsException(APIException):
-    """
-    Exception to be thrown when an API call fails because the to-be-added data already exists.
-    """
+from odl_client.base_odlclient.session import RESTconfSession, DEFAULT_POOL_SIZE, DEFAULT_TIMEOUT
+from odl_client.base_odlclient.node import Host, Switch, ODLNode, NotOwnConnectorException
+from odl_client.base_odlclient.exception import APIException, AlreadyExistsException
+from odl_client.base_odlclient.flow_deployment import FlowDeploymentEngine, FlowOperation, diff_flowsets
+from odl_client.base_odlclient.openflow.update_strategy import select_update_strategy
+from odl_client.base_odlclient.topology_notification import parse_topology_notification, TopologyChange
+from odl_client.base_odlclient.topology_snapshot import TopologySnapshot
+from odl_client.base_odlclient import fetch_profile
+from odl_client.base_odlclient.bootstrap import BootstrapReport
+from odl_client.base_odlclient.openflow import FlowTableEntry
+from misc.worker_pool import WorkerPool
+from misc.coalescer import EventCoalescer
 
 
 class ODLClient(object):
@@ -44,20 +49,53 @@ class ODLClient(object):
                  "baseurl",
 
                  "_hosts",  # type: dict(str, Host)
+                 "_hosts_by_mac",  # type: dict(str, Host)
+                 "_hosts_by_ip",  # type: dict(str, Host)
 
                  "_switches",  # type: dict(str, Switch)
 
                  "_nodes",  # type: dict(str, ODLNode)
 
-                 "_flows", "_flow_namespace", "_flow_lock",
+                 "_links",  # type: dict(str, (ODLNodeConnector, ODLNodeConnector))
+
+                 "_inventory_profile",  # type: fetch_profile.FetchProfile
+                 "_fetch_profiles_supported",
+
+                 "_topology_snapshot",  # type: TopologySnapshot
+                 "_changed_node_ids",  # type: set(str)
+                 "_max_topology_age",
+
+                 "_topology_lock",  # serializes writers of the topology model
+
+                 "_flows",  # type: frozenset(FlowTableEntry)
+                 "_flow_namespace",
+                 "_flow_lock",  # serializes writers of the deployed flows
+
+                 "_request_logger",
+
+                 "_session",  # type: RESTconfSession
+                 "_request_workers",  # type: WorkerPool
 
-                 "_request_logger"
+                 "_deploy_workers",  # type: WorkerPool
+                 "_flow_deployment",  # type: FlowDeploymentEngine
+
+                 "_topology_events",  # type: EventCoalescer
+
+                 "_bootstrap_report",  # type: BootstrapReport
+                 "_bootstrap_lock",
+
+                 "_warm_start_store",  # type: WarmStartStore
+                 "_warm_start_events",  # type: EventCoalescer
+                 "_warm_start_reconciler"  # type: Thread
                  )
 
     _host_type = Host
     _switch_type = Switch
 
-    def __init__(self, hostname, port=8181, username="admin", password="admin", flow_namespace="rtman", request_logger=None):
+    def __init__(self, hostname, port=8181, username="admin", password="admin", flow_namespace="rtman", request_logger=None,
+                 pool_size=DEFAULT_POOL_SIZE, request_timeout=DEFAULT_TIMEOUT, deploy_workers=DEFAULT_POOL_SIZE,
+                 bulk_flow_writes=True, topology_quiet_window=0.2, topology_max_delay=2.0, max_topology_age=None,
+                 inventory_profile=fetch_profile.TOPOLOGY, warm_start_store=None, warm_start_interval=5.0):
         """
         Default constructor.
         :param str hostname: controller hostname
@@ -65,6 +103,24 @@ class ODLClient(object):
         :param str username: username to log in on controller
         :param str password: password to log in on controller
         :param str flow_namespace: suggested namespace for OpenFlow flows.
+        :param int pool_size: number of keep-alive connections to the restconf interface
+        :param float|tuple[float, float] request_timeout: default timeout of restconf requests, in seconds
+        :param int deploy_workers: maximum number of switches that flows are deployed to in parallel
+        :param bool bulk_flow_writes: write all flow changes of a flow table in a single request (yang-patch).
+                                      Falls back to one request per flow if the controller rejects this.
+        :param float topology_quiet_window: topology change notifications are handled together once no further
+                                            notification has arrived for this many seconds
+        :param float topology_max_delay: maximum seconds a topology change notification waits to be handled
+        :param float max_topology_age: if set, reading the topology fetches it again from the controller when the
+                                       last complete fetch is older than this many seconds. Otherwise, the topology
+                                       is only updated by notifications and explicit refresh() calls.
+        :param FetchProfile inventory_profile: parts of the inventory that are fetched to build the topology model.
+                                               Flow tables are fetched separately by refresh_flows, unless the
+                                               profile includes them.
+        :param WarmStartStore warm_start_store: if set, the topology model and the deployed flows are persisted to
+                                                this store, and bootstrap restores them from it instead of fetching
+                                                the topology from the controller; see _restore_warm_start.
+        :param float warm_start_interval: changes are persisted at most this many seconds after they were made
         """
         self.hostname = hostname
         self.port = port
@@ -73,10 +129,33 @@ class ODLClient(object):
         self.baseurl = "http://%s:%d/restconf/" % (hostname, port)
         self._switches = {}
         self._hosts = {}
-        self._flows = set()
+        self._hosts_by_mac = {}
+        self._hosts_by_ip = {}
+        self._nodes = {}
+        self._links = {}
+        self._inventory_profile = inventory_profile
+        self._fetch_profiles_supported = True
+        self._topology_snapshot = TopologySnapshot(0, {}, {}, timestamp=0)
+        self._changed_node_ids = set()
+        self._max_topology_age = max_topology_age
+        self._topology_lock = Lock()
+        self._flows = frozenset()
         self._flow_namespace = flow_namespace
         self._flow_lock = Lock()
         self._request_logger = request_logger if request_logger else NoLogger()
+        self._session = RESTconfSession(self.baseurl, username, password, pool_size=pool_size, timeout=request_timeout)
+        self._request_workers = WorkerPool(pool_size, name="RESTconfRequest")
+        self._deploy_workers = WorkerPool(deploy_workers, name="FlowDeployment")
+        self._flow_deployment = FlowDeploymentEngine(self._deploy_workers, bulk=bulk_flow_writes,
+                                                     update_strategy_selector=self._select_update_strategy)
+        self._topology_events = EventCoalescer(self._on_topology_notifications, quiet_window=topology_quiet_window,
+                                               max_delay=topology_max_delay, name="TopoChangeHandler")
+        self._bootstrap_report = BootstrapReport()
+        self._bootstrap_lock = Lock()
+        self._warm_start_store = warm_start_store
+        self._warm_start_events = EventCoalescer(self._persist_warm_start, quiet_window=warm_start_interval,
+                                                 max_delay=warm_start_interval, name="WarmStartPersistence")
+        self._warm_start_reconciler = None
 
     def convert_mac_address(self, address):
         """
@@ -88,52 +167,77 @@ class ODLClient(object):
         """
         return address
 
-    def _request(self, path, method="GET", data=None):
+    def _request(self, path, method="GET", data=None, timeout=None):
         """
         Send a request to the restconf interface
         :param str path: request path. http://server:port/restconf/ is added before it.
+        :param timeout: request timeout in seconds; use the session's default if None
         :return: response linereader
         """
         if path.startswith("/"):
             path = path[1:]
 
         request_ts = time.time()
-        r = requests.request(method=method, url=self.baseurl+path, auth=(self.username, self.password), data=data)
+        r = self._session.request(method, path, data=data, timeout=timeout)
         self._request_logger.log_request(r, request_ts)
         if r.status_code not in range(200,300):
             print(r.status_code)
             print(data)
             print(r.text)
-            raise APIException(r.text)
+            raise APIException(r.text, r.status_code)
         return r.text
 
-    def _request_json(self, path, method="GET", json=None):
+    def _request_json(self, path, method="GET", json=None, timeout=None, headers=None):
         """
         Send a request to the restconf interface (see self._request for more details)
         parse response as json
         :param str path: request path. http://server:port/restconf/ is added before it.
+        :param timeout: request timeout in seconds; use the session's default if None
+        :param dict headers: additional HTTP headers, e.g. a different Content-Type for the json body
         :return: response dict
         """
         if path.startswith("/"):
             path = path[1:]
 
         request_ts = time.time()
-        r = requests.request(method=method, url=self.baseurl+path, auth=(self.username, self.password), json=json)
+        r = self._session.request(method, path, json=json, timeout=timeout, headers=headers)
         self._request_logger.log_request(r, request_ts, json)
         if r.status_code not in range(200, 300):
             logging.debug("data: " + str(json))
-            exc = json_module.loads(r.text)
+            try:
+                exc = json_module.loads(r.text)
+            except ValueError:
+                exc = {}  # e.g., an html error page
             if r.status_code == 409 and exc.get("errors", {"error": [{"error-tag": ""}]})["error"][0].get("error-tag", "") == "data-exists":
                 logging.debug("Already exists")
-                raise AlreadyExistsException(r.text)
+                raise AlreadyExistsException(r.text, r.status_code)
             else:
                 logging.debug("response: " + str(r.text))
-                raise APIException(r.text)
+                raise APIException(r.text, r.status_code)
         if r.text:
             return r.json()
         else:
             return None
 
+    def _request_async(self, path, method="GET", data=None, timeout=None):
+        """
+        like self._request, but does not block.
+        The request is sent as soon as a connection of the session is available.
+        :return: future for the response text
+        :rtype: Future
+        """
+        return self._request_workers.submit(self._request, path, method=method, data=data, timeout=timeout)
+
+    def _request_json_async(self, path, method="GET", json=None, timeout=None, headers=None):
+        """
+        like self._request_json, but does not block.
+        The request is sent as soon as a connection of the session is available.
+        :return: future for the response dict
+        :rtype: Future
+        """
+        return self._request_workers.submit(self._request_json, path, method=method, json=json, timeout=timeout,
+                                            headers=headers)
+
     def get_node(self, node_id):
         """
         get the node with the given id.
@@ -142,15 +246,258 @@ class ODLClient(object):
         :return: Given node
         :rtype: ODLNode
         """
+        return self.topology.get_node(node_id)
+
+    @property
+    def topology(self):
+        """
+        current snapshot of the topology model. The topology is fetched from the controller only if it has never
+        been fetched, or if the last complete fetch is older than max_topology_age.
+        :rtype: TopologySnapshot
+        """
+        snapshot = self._topology_snapshot
+        if snapshot.version == 0 or \
+                (self._max_topology_age is not None and snapshot.age > self._max_topology_age):
+            return self.refresh()
+        return snapshot
+
+    def refresh(self):
+        """
+        fetch the complete topology from the controller.
+        :return: snapshot of the updated topology model
+        :rtype: TopologySnapshot
+        """
         self._build_nodes()
-        return self._nodes[node_id]
+        return self._topology_snapshot
+
+    def _publish_topology(self, topology_change_detected, complete_fetch, timestamp=None):
+        """
+        publish a snapshot of the topology model. Must be called with self._topology_lock held.
+        :param bool topology_change_detected: increase the version
+        :param bool complete_fetch: the complete topology has just been fetched from the controller
+        :param float timestamp: time of the complete fetch, if it was not just now (e.g. for a warm start)
+        :return:
+        """
+        old = self._topology_snapshot
+        if not complete_fetch:
+            timestamp = old.timestamp
+        self._topology_snapshot = TopologySnapshot(
+            version=old.version + 1 if topology_change_detected or old.version == 0 else old.version,
+            switches=self._switches,
+            hosts=self._hosts,
+            timestamp=timestamp,
+            changed_node_ids=None if complete_fetch else frozenset(self._changed_node_ids),
+            previous=old
+        )
+        self._warm_start_changed()
 
     def start(self):
-        self._build_nodes()
-        self.start_topology_changes_listener()
+        """
+        see bootstrap
+        :rtype: BootstrapReport
+        """
+        return self.bootstrap()
+
+    def bootstrap(self, start_listener=True):
+        """
+        bring up the client in a single pass: fetch the topology once, build the topology model and all data derived
+        from it (see _after_topology_update), and start the topology changes listener.
+        If the client has a warm start store with a snapshot, the topology is restored from the snapshot instead of
+        being fetched, and reconciled with the controller in the background (see _warm_start).
+        Steps that have already been executed are skipped, so this may be called repeatedly, e.g. first without
+        starting the listener, and later with it.
+        :param bool start_listener: also start the topology changes listener
+        :return: durations of all executed steps
+        :rtype: BootstrapReport
+        """
+        with self._bootstrap_lock:
+            report = self._bootstrap_report
+            with report.recording():
+                if not report.done("topology") and not report.done("warm start") and not self._warm_start():
+                    with report.step("topology"):
+                        with self._topology_lock:
+                            with report.step("fetch topology"):
+                                inventory_dict, topology = self._fetch_topology()
+                            with report.step("topology model"):
+                                topology_change_detected = self._build_topology_model(inventory_dict, topology)
+                            snapshot = self._topology_snapshot
+                        self._after_topology_update(topology_change_detected, snapshot)
+                if start_listener and not report.done("topology listener"):
+                    with report.step("topology listener"):
+                        self.start_topology_changes_listener()
+        logging.info("bootstrap: %s" % report)
+        return report
+
+    def _warm_start(self):
+        """
+        restore the state persisted in the warm start store, and start reconciling it with the controller in the
+        background. Called by bootstrap.
+        :return: whether the state has been restored; if not, the topology has to be fetched
+        :rtype: bool
+        """
+        if self._warm_start_store is None:
+            return False
+        state = self._warm_start_store.load()
+        if state is None:
+            return False
+        try:
+            with self._bootstrap_report.step("warm start"):
+                self._restore_warm_start(state)
+        except (KeyError, IndexError, TypeError, ValueError, NotOwnConnectorException) as e:
+            logging.warning("could not restore warm start snapshot (%s: %s), fetching complete topology" %
+                            (e.__class__.__name__, e))
+            with self._topology_lock:  # start from scratch, the complete fetch rebuilds everything
+                self._switches, self._hosts, self._nodes, self._links = {}, {}, {}, {}
+                self._hosts_by_mac, self._hosts_by_ip = {}, {}
+                self._topology_snapshot = TopologySnapshot(0, {}, {}, timestamp=0)
+            with self._flow_lock:
+                self._flows = frozenset()
+            return False
+        self._warm_start_reconciler = Thread(target=self._reconcile_warm_start, name="WarmStartReconciler")
+        self._warm_start_reconciler.daemon = True
+        self._warm_start_reconciler.start()
+        return True
+
+    def _warm_start_state(self):
+        """
+        state that is persisted for a warm start: the topology model, in the form it is fetched from the controller
+        (see _fetch_topology), and the deployed flows. Subclasses may add their own state, see _restore_warm_start.
+        :return: json serializable state
+        :rtype: dict
+        """
+        flows = self._flows
+        with self._topology_lock:
+            return {
+                "timestamp": self._topology_snapshot.timestamp,
+                "inventory": {node_id: switch._inventory_dict() for node_id, switch in self._switches.items()},
+                "topology": {
+                    "node": [{"node-id": node_id} for node_id in self._switches] +
+                            [host._topology_dict() for host in self._hosts.values()],
+                    "link": [{"link-id": link_id,
+                              "source": {"source-node": source.parent.node_id, "source-tp": source.connector_id},
+                              "destination": {"dest-node": dest.parent.node_id, "dest-tp": dest.connector_id}}
+                             for link_id, (source, dest) in self._links.items()]
+                },
+                "flows": [{"node": flow.switch.node_id, "flow": flow._odl_inventory()} for flow in flows]
+            }
+
+    def _restore_warm_start(self, state):
+        """
+        restore the topology model, all data derived from it, and the deployed flows from a warm start snapshot,
+        without contacting the controller.
+        Subclasses may override this to restore the state they have added in _warm_start_state.
+        :param dict state: as returned by _warm_start_state
+        :return:
+        """
+        with self._topology_lock:
+            self._build_topology_model(state["inventory"], state["topology"], timestamp=state["timestamp"])
+            flows = frozenset(FlowTableEntry.from_odl_inventory(self._switches[flow["node"]], flow["flow"])
+                              for flow in state["flows"])
+            snapshot = self._topology_snapshot
+        with self._flow_lock:
+            self._flows = flows
+        self._after_topology_update(True, snapshot)
+
+    def _reconcile_warm_start(self):
+        """
+        bring the state restored by a warm start up to date: fetch the complete topology and the flow tables, and
+        reconcile the restored flows with them (see _reconcile_flows). Executed in the background after a warm
+        start; until then, the client works on the restored state.
+        :return: whether the state has been reconciled
+        :rtype: bool
+        """
+        try:
+            self.refresh()
+            self.refresh_flows()
+            with self._topology_lock:
+                with self._flow_lock:
+                    self._reconcile_flows()
+        except Exception:  # keep running on the restored state; notifications and refreshes update it later
+            logging.exception("could not reconcile the warm start state with the controller")
+            return False
+        logging.info("warm start state reconciled with the controller")
+        return True
+
+    def _reconcile_flows(self):
+        """
+        compare the known deployed flows with the flows on the switches, as of the last refresh_flows. Flows that are
+        missing on their switch are forgotten, so that the next deployment adds them again; flows whose fingerprint
+        differs are replaced by the switch's version, so that the next deployment updates them. Flows in this
+        client's namespace that are not known are added, so that the next deployment removes them.
+        must be called with self._topology_lock and self._flow_lock held.
+        :return:
+        """
+        flows = set(self._flows)
+        for flow in self._flows:
+            switch = self._switches.get(flow.switch.node_id)
+            try:
+                deployed = switch.get_flow(flow.table_id, flow.entry_name) if switch is not None else None
+            except KeyError:
+                deployed = None
+            if deployed is None or deployed.fingerprint != flow.fingerprint:
+                flows.discard(flow)
+                if deployed is not None:
+                    flows.add(deployed)
+        known_keys = set(flow.key for flow in flows)
+        for switch in self._switches.values():
+            flows.update(flow for flow in switch.flows
+                         if flow.entry_name.startswith(self._flow_namespace) and flow.key not in known_keys)
+        self._flows = frozenset(flows)
+        self._warm_start_changed()
+
+    def _warm_start_changed(self):
+        """
+        persist the warm start state soon, if the client has a warm start store.
+        Changes are coalesced, so this is cheap and may be called on every change.
+        :return:
+        """
+        if self._warm_start_store is not None:
+            self._warm_start_events.add(None)
+
+    def _persist_warm_start(self, _changes):
+        """
+        write the warm start state to the warm start store.
+        :param list _changes: coalesced change events
+        :return:
+        """
+        try:
+            self._warm_start_store.save(self._warm_start_state())
+        except (IOError, OSError) as e:
+            logging.error("could not persist warm start state to %s: %s" % (self._warm_start_store.path, e))
+
+    @property
+    def bootstrap_report(self):
+        """
+        durations of the bootstrap steps executed so far
+        :rtype: BootstrapReport
+        """
+        return self._bootstrap_report
 
     def stop(self):
+        self._warm_start_events.stop()
+        if self._warm_start_store is not None:
+            self._persist_warm_start(None)
+        self._topology_events.stop()
         self._request_logger.stop()
+        self._request_workers.stop()
+        self._deploy_workers.stop()
+        self._session.close()
+
+    @property
+    def session_statistics(self):
+        """
+        connection reuse and wait time counters of the restconf session
+        :rtype: SessionStatistics
+        """
+        return self._session.statistics
+
+    @property
+    def topology_event_statistics(self):
+        """
+        how many topology change notifications have been received, and how many of them were merged
+        :rtype: CoalescerStatistics
+        """
+        return self._topology_events.statistics
 
     def get_host_by_mac(self, mac_address):
         """
@@ -158,10 +505,91 @@ class ODLClient(object):
         :param str mac_address: target mac address
         :return:
         """
-        mac_address = self.convert_mac_address(mac_address)
-        for node in self._hosts.values():  # type: Host
-            if mac_address in node.mac_addresses:
-                return node
+        return self._hosts_by_mac.get(self.convert_mac_address(mac_address))
+
+    def get_host_by_ip(self, ip_address):
+        """
+        get the host that has the given ip address
+        :param str ip_address: target ip address
+        :return: the host, or None if no host with this address is known
+        :rtype: Host
+        """
+        return self._hosts_by_ip.get(ip_address)
+
+    def _index_host_addresses(self, host, old_mac_addresses=frozenset(), old_ip_addresses=frozenset()):
+        """
+        update the mac and ip address indexes after the addresses of a host have changed.
+        called by Host._update.
+        :param Host host:
+        :param frozenset[str] old_mac_addresses: mac addresses of the host before the change
+        :param frozenset[str] old_ip_addresses: ip addresses of the host before the change
+        :return:
+        """
+        for index, old_addresses, new_addresses in ((self._hosts_by_mac, old_mac_addresses, host._mac_addresses),
+                                                    (self._hosts_by_ip, old_ip_addresses, host._ip_addresses)):
+            for address in old_addresses - new_addresses:
+                if index.get(address) is host:
+                    del index[address]
+            for address in new_addresses:
+                index[address] = host
+
+    def _fetch_topology(self):
+        """
+        Request inventory and topology from the controller. Both requests are sent concurrently.
+        :return: inventory nodes by their id, flow:1 topology
+        :rtype: (dict[str, dict], dict)
+        """
+        inventory_request = self._request_workers.submit(self._fetch_inventory, self._inventory_profile)
+        result = self._request_json("operational/network-topology:network-topology/topology/flow:1")
+        topology = result["topology"][0]
+        return inventory_request.result(), topology
+
+    def _fetch_inventory(self, profile, node_id=None):
+        """
+        Request the inventory, or a single node of it, as selected by a fetch profile.
+        If the controller does not support selecting fields, the complete inventory is requested instead, now and
+        for all further requests.
+        :param FetchProfile profile:
+        :param str node_id: node to fetch; all nodes if None
+        :return: inventory nodes by their id
+        :rtype: dict[str, dict]
+        """
+        if not self._fetch_profiles_supported:
+            profile = fetch_profile.FULL
+        try:
+            result = self._request_json(profile.inventory_path(node_id))
+        except APIException as e:
+            if profile.node_fields is None or e.status_code != 400:
+                raise
+            logging.warning("controller does not support fetch profiles, requesting the complete inventory")
+            self._fetch_profiles_supported = False
+            result = self._request_json(fetch_profile.FULL.inventory_path(node_id))
+        nodes = result["node"] if node_id is not None else result["nodes"].get("node", [])
+        return {n["id"]: n for n in nodes}
+
+    def refresh_flows(self, node_ids=None):
+        """
+        fetch the flow tables of switches from the operational inventory; see Switch.flows.
+        :param iterable[str] node_ids: switches to fetch the flows of; all switches if None
+        :return:
+        """
+        if node_ids is None:
+            inventory_dict = self._fetch_inventory(fetch_profile.FLOW_TABLES)
+        else:
+            requests = [(node_id, self._request_workers.submit(self._fetch_inventory, fetch_profile.FLOW_TABLES,
+                                                               node_id))
+                        for node_id in node_ids]
+            inventory_dict = {}
+            for node_id, request in requests:
+                try:
+                    inventory_dict.update(request.result())
+                except APIException as e:
+                    if e.status_code != 404:
+                        raise
+        with self._topology_lock:
+            for node_id, node in inventory_dict.items():
+                if node_id in self._switches:
+                    self._switches[node_id]._update_flow_tables(node.get("flow-node-inventory:table", []))
 
     def _build_nodes(self):
         """
@@ -169,57 +597,296 @@ class ODLClient(object):
         :return: whether a new switch or connection has been found
         :rtype: bool
         """
+        with self._topology_lock:
+            inventory_dict, topology = self._fetch_topology()
+            topology_change_detected = self._build_topology_model(inventory_dict, topology)
+            snapshot = self._topology_snapshot
+
+        self._after_topology_update(topology_change_detected, snapshot)
+        return topology_change_detected
+
+    def _build_topology_model(self, inventory_dict, topology, timestamp=None):
+        """
+        update the topology model from a complete fetch, and publish it.
+        must be called with self._topology_lock held.
+        :param dict[str, dict] inventory_dict: inventory nodes by their id, see _fetch_topology
+        :param dict topology: flow:1 topology
+        :param float timestamp: time of the fetch; now if None
+        :return: whether a new switch or connection has been found
+        :rtype: bool
+        """
         topology_change_detected = False  # fixme: override _update methods of all node classes
-        with self._flow_lock:  # fixme: also add a lock for this function
-            result = self._request_json("operational/opendaylight-inventory:nodes/")
-            if "node" in result["nodes"]:
-                inventory_dict = {n["id"]:n for n in result["nodes"]["node"]}
-            else:
-                inventory_dict = {}
-
-            result = self._request_json("operational/network-topology:network-topology/topology/flow:1")
-            topology = result["topology"][0]
-            for node in topology.get("node", []):
-                node_id = node["node-id"]
-                if node_id.startswith("host:"):
-                    if node_id in self._hosts:
-                        topology_change_detected |= self._hosts[node_id]._update(node)
-                    else:
-                        self._hosts[node_id] = self._host_type(self, node)
-                        topology_change_detected = True
-                elif node_id.startswith("openflow:"):
-                    if node_id in self._switches:
-                        topology_change_detected |= self._switches[node_id]._update(inventory_dict[node_id])
-                    else:
-                        self._switches[node_id] = self._switch_type(self, inventory_dict[node_id])
-                        topology_change_detected = True
+        for node in topology.get("node", []):
+            node_id = node["node-id"]
+            if node_id.startswith("host:"):
+                if node_id in self._hosts:
+                    topology_change_detected |= self._hosts[node_id]._update(node)
                 else:
-                    raise Exception("unknown node type: %s" % node_id)
+                    self._hosts[node_id] = self._host_type(self, node)
+                    topology_change_detected = True
+            elif node_id.startswith("openflow:"):
+                if node_id in self._switches:
+                    topology_change_detected |= self._switches[node_id]._update(inventory_dict[node_id])
+                else:
+                    self._switches[node_id] = self._switch_type(self, inventory_dict[node_id])
+                    topology_change_detected = True
+            else:
+                raise Exception("unknown node type: %s" % node_id)
+
+        self._nodes = {}
+        self._nodes.update(self._switches)
+        self._nodes.update(self._hosts)
 
-            self._nodes = {}
-            self._nodes.update(self._switches)
-            self._nodes.update(self._hosts)
+        topology_change_detected |= self._connect_nodes(topology)
+        self._publish_topology(topology_change_detected, complete_fetch=True, timestamp=timestamp)
+        return topology_change_detected
+
+    def _connect_nodes(self, topology):
+        """
+        connect the connectors of all nodes according to the links of the topology.
+        Each link is resolved once and indexed by its source connector, so this is linear in the number of
+        connectors and links.
+        :param dict topology: flow:1 topology
+        :return: whether a connection has been added, changed or removed
+        :rtype: bool
+        """
+        links_by_source = {}
+        for link in topology.get("link", []):
+            source_connector = self._nodes[link["source"]["source-node"]].get_connector(link["source"]["source-tp"])
+            dest_connector = self._nodes[link["destination"]["dest-node"]].get_connector(link["destination"]["dest-tp"])
+            links_by_source.setdefault(source_connector, (link["link-id"], dest_connector))
 
-        #connect
+        topology_change_detected = False
+        links = {}
         for node in self._nodes.values():
             for connector in node.list_connectors():
-                found = False
-                for link in topology.get("link", []):
-                    source_node = self._nodes[link["source"]["source-node"]]
-                    source_connector = source_node.get_connector(link["source"]["source-tp"])
-                    dest_node = self._nodes[link["destination"]["dest-node"]]
-                    dest_connector = dest_node.get_connector(link["destination"]["dest-tp"])
-                    if source_node == node and source_connector == connector:
-                        if connector.target != dest_connector:
-                            connector._connect_to(dest_connector)
-                            topology_change_detected = True
-                        found = True
-                        break
-                if not found:
+                link = links_by_source.get(connector)
+                if link is None:
                     if connector.target is not None:
                         topology_change_detected = True
                     connector._connect_to(None, reverse=False)
+                    continue
+                link_id, dest_connector = link
+                links[link_id] = (connector, dest_connector)
+                if connector.target != dest_connector:
+                    connector._connect_to(dest_connector)
+                    topology_change_detected = True
+        self._links = links
+        return topology_change_detected
+
+    def _after_topology_update(self, topology_change_detected, snapshot):
+        """
+        called after the topology model has been updated, by a full fetch (_build_nodes) as well as by a
+        notification (_update_topology). Subclasses may override this to update data derived from the topology.
+        This is called without the topology lock, so another update may already have published a newer snapshot;
+        use snapshot, not self._topology_snapshot, to find out what this update has changed.
+        :param bool topology_change_detected: whether a new switch or connection has been found
+        :param TopologySnapshot snapshot: the snapshot published by this update
+        :return:
+        """
+        pass
+
+    def _update_topology(self, notifications):
+        """
+        update the topology model from data change notifications.
+        Only the nodes and links named in the notifications are fetched. If a notification can not be interpreted,
+        or the changes can not be applied, the complete topology is fetched (_build_nodes).
+        :param list[str] notifications: notifications as received from the topology changes listener
+        :return: whether a new switch or connection has been found
+        :rtype: bool
+        """
+        # only the last change of each element matters, as the element's current state is fetched anyway
+        latest = OrderedDict()
+        for notification in notifications:
+            notification_changes = parse_topology_notification(notification)
+            if notification_changes is None:
+                logging.debug("could not interpret topology notification, fetching complete topology")
+                return self._build_nodes()
+            for change in notification_changes:
+                element = (change.element, change.node_id, change.key)
+                latest.pop(element, None)
+                latest[element] = change
+        changes = list(latest.values())
+        try:
+            with self._topology_lock:
+                self._changed_node_ids = set()
+                topology_change_detected = self._apply_topology_changes(changes)
+                self._publish_topology(topology_change_detected, complete_fetch=False)
+                snapshot = self._topology_snapshot
+        except (APIException, KeyError, IndexError, ValueError, NotOwnConnectorException) as e:
+            logging.warning("could not apply topology changes (%s: %s), fetching complete topology" %
+                            (e.__class__.__name__, e))
+            return self._build_nodes()
+        self._after_topology_update(topology_change_detected, snapshot)
+        return topology_change_detected
+
+    def _apply_topology_changes(self, changes):
+        """
+        fetch the changed nodes and links and update the topology model.
+        must be called with self._topology_lock held.
+        :param list[TopologyChange] changes:
+        :return: whether a new switch or connection has been found
+        :rtype: bool
+        """
+        topology_change_detected = False
+        # nodes first, so that changed links can be connected to new nodes and connectors
+        for change in changes:
+            if change.element == TopologyChange.LINK:
+                continue
+            if change.element == TopologyChange.NODE and change.operation == TopologyChange.DELETED:
+                topology_change_detected |= self._remove_node(change.node_id)
+            else:
+                topology_change_detected |= self._refresh_node(change.node_id)
+        for change in changes:
+            if change.element != TopologyChange.LINK:
+                continue
+            if change.operation == TopologyChange.DELETED:
+                topology_change_detected |= self._remove_link(change.key)
+            else:
+                topology_change_detected |= self._refresh_link(change.key)
+        return topology_change_detected
+
+    @staticmethod
+    def _first_entry(result, name):
+        """
+        :return: the first entry of the list called name in a restconf result, regardless of the module prefix
+        :rtype: dict
+        """
+        for key, value in result.items():
+            if key.split(":")[-1] == name:
+                return value[0]
+        raise KeyError(name)
+
+    def _fetch_element(self, path, name):
+        """
+        :return: the element at path, or None if it does not exist
+        :rtype: dict|None
+        """
+        try:
+            return self._first_entry(self._request_json(path), name)
+        except APIException as e:
+            if e.status_code == 404:
+                return None
+            raise
+
+    def _fetch_topology_element(self, name, key):
+        """
+        :param str name: "node" or "link"
+        :param str key: node-id or link-id
+        :return: the node or link of the flow:1 topology, or None if it does not exist
+        :rtype: dict|None
+        """
+        return self._fetch_element("operational/network-topology:network-topology/topology/flow:1/%s/%s/" %
+                                   (name, quote(key, safe=":")), name)
 
+    def _refresh_node(self, node_id):
+        """
+        fetch a single node and update the topology model.
+        must be called with self._topology_lock held.
+        :param str node_id:
+        :return: whether a new switch or connection has been found
+        :rtype: bool
+        """
+        if node_id.startswith("host:"):
+            nodes, node_type = self._hosts, self._host_type
+            data = self._fetch_topology_element("node", node_id)
+        elif node_id.startswith("openflow:"):
+            nodes, node_type = self._switches, self._switch_type
+            try:
+                data = self._fetch_inventory(self._inventory_profile, node_id).get(node_id)
+            except APIException as e:
+                if e.status_code != 404:
+                    raise
+                data = None
+        else:
+            raise ValueError("unknown node type: %s" % node_id)
+
+        if data is None:
+            return self._remove_node(node_id)
+        self._changed_node_ids.add(node_id)
+        if node_id in nodes:
+            node = nodes[node_id]
+            topology_change_detected = node._update(data)
+            # forget links of connectors that disappeared
+            connectors = node.list_connectors()
+            for link_id, (source, dest) in list(self._links.items()):
+                if (source.parent is node and source not in connectors) or \
+                        (dest.parent is node and dest not in connectors):
+                    topology_change_detected |= self._remove_link(link_id)
+        else:
+            nodes[node_id] = node_type(self, data)
+            self._nodes[node_id] = nodes[node_id]
+            topology_change_detected = True
+        return topology_change_detected
+
+    def _remove_node(self, node_id):
+        """
+        remove a node and its links from the topology model.
+        must be called with self._topology_lock held.
+        :param str node_id:
+        :return: whether the node was known
+        :rtype: bool
+        """
+        node = self._switches.pop(node_id, None) or self._hosts.pop(node_id, None)
+        if node is None:
+            return False
+        self._changed_node_ids.add(node_id)
+        self._nodes.pop(node_id, None)
+        for link_id, (source, dest) in list(self._links.items()):
+            if source.parent is node or dest.parent is node:
+                self._remove_link(link_id)
+        if isinstance(node, Switch):
+            for connector in node.list_connectors():
+                connector.invalidate()
+        else:
+            for index, addresses in ((self._hosts_by_mac, node._mac_addresses),
+                                     (self._hosts_by_ip, node._ip_addresses)):
+                for address in addresses:
+                    if index.get(address) is node:
+                        del index[address]
+        return True
+
+    def _remove_link(self, link_id):
+        """
+        disconnect the source connector of a link.
+        must be called with self._topology_lock held.
+        :param str link_id:
+        :return: whether a connection has been removed
+        :rtype: bool
+        """
+        source, dest = self._links.pop(link_id, (None, None))
+        if source is None or source.target is not dest:
+            return False
+        source._connect_to(None, reverse=False)
+        self._changed_node_ids.update((source.parent.node_id, dest.parent.node_id))
+        return True
+
+    def _refresh_link(self, link_id):
+        """
+        fetch a single link and connect its connectors.
+        must be called with self._topology_lock held.
+        :param str link_id:
+        :return: whether a new connection has been found
+        :rtype: bool
+        """
+        link = self._fetch_topology_element("link", link_id)
+        if link is None:
+            return self._remove_link(link_id)
+        topology_change_detected = False
+        for node_id in (link["source"]["source-node"], link["destination"]["dest-node"]):
+            if node_id not in self._nodes:
+                topology_change_detected |= self._refresh_node(node_id)
+        source_connector = self._nodes[link["source"]["source-node"]].get_connector(link["source"]["source-tp"])
+        dest_connector = self._nodes[link["destination"]["dest-node"]].get_connector(link["destination"]["dest-tp"])
+
+        old_source, _ = self._links.get(link_id, (None, None))
+        if old_source is not None and old_source is not source_connector:
+            topology_change_detected |= self._remove_link(link_id)
+        self._links[link_id] = (source_connector, dest_connector)
+        if source_connector.target is not dest_connector:
+            source_connector._connect_to(dest_connector)
+            self._changed_node_ids.update((source_connector.parent.node_id, dest_connector.parent.node_id))
+            topology_change_detected = True
         return topology_change_detected
 
     def info(self):
@@ -235,26 +902,25 @@ class ODLClient(object):
         return a dict of nodes, identified by their node_ids
         :return:
         """
-        self._build_nodes()
-        return self._nodes.copy()
+        return self.topology.nodes
 
     @property
     def switches(self):
         """
 
-        :return: all known switches in the topology
+        :return: all known switches in the topology, see topology
         :rtype: dict[str, self._switch_type]
         """
-        return self._switches.copy()
+        return self.topology.switches
 
     @property
     def hosts(self):
         """
 
-        :return: all known hosts in the topology
+        :return: all known hosts in the topology, see topology
         :rtype: dict[str, self._host_type]
         """
-        return self._hosts.copy()
+        return self.topology.hosts
 
     def deploy_new_flowset(self, flows):
         """
@@ -262,57 +928,62 @@ class ODLClient(object):
         :param iterable[FlowTableEntry] flows: new set of flows
         :return:
         """
-        # three cases:
-        # - to add
-        # - to update
-        # - to remove
-        #
-        # first, separate the cases
         with self._flow_lock:
-            old_flows = self._flows.difference(
-                flows)  # this can contain flows that need to be updated instead of added/removed
-
-            to_update = set()
-            for new in flows:
-                for old in old_flows:
-                    if new.is_same_entry(old):
-                        to_update.add((new, old))
-            for new, old in to_update:  # need separate iteration due to iterating over sets
-                flows.remove(new)
-                old_flows.remove(old)
-
-            # now, iterate over sets for all cases, and execute
-            # to add
-            for flow in flows:
-                try:
-                    flow.deploy()
-                    self._flows.add(flow)
-                except AlreadyExistsException:
-                    try:
-                        flow.update()
-                    except APIException:
-                        pass
-                    self._flows.add(flow)
-                except APIException:
-                    pass
-
-            # to update
-            for flow, old_flow in to_update:
-                try:
-                    flow.update()
-                    self._flows.add(flow)
-                    self._flows.remove(old_flow)
-                except APIException:
-                    pass
-
-            # to remove
-            for flow in old_flows:
-                try:
-                    flow.remove()
-                    self._flows.remove(flow)
-                except APIException:
-                    pass
-        self._build_nodes()
+            # separate the cases: to add, to update, to remove. Unchanged flows are skipped.
+            diff = diff_flowsets(self._flows, flows)
+            logging.debug(diff)
+
+            # now, execute all cases. The deployment engine takes care of the order within each switch.
+            report = self._flow_deployment.execute(to_add=diff.to_add, to_update=diff.to_update,
+                                                   to_remove=diff.to_remove)
+            self._apply_deployment_report(report)
+        self._refresh_deployed_flows(report)
+
+    def _refresh_deployed_flows(self, report):
+        """
+        fetch the flow tables of the switches a deployment has written to, see refresh_flows.
+        The topology hasn't changed, so it isn't fetched again.
+        :param FlowDeploymentReport report:
+        :return:
+        """
+        try:
+            self.refresh_flows(report.switches)
+        except Exception as e:
+            # the deployment itself is done; the flow tables are fetched again with the next topology update
+            logging.warning("could not fetch the flow tables of %d switches after a deployment: %s" %
+                            (len(report.switches), e))
+
+    def _select_update_strategy(self, new_flow, old_flow):
+        """
+        choose how a deployed flow is replaced by its new version.
+        The default keeps streams running while their flows are modified; may be overridden.
+
+        :param FlowTableEntry new_flow: new version of the flow
+        :param FlowTableEntry old_flow: currently deployed version of the flow
+        :rtype: FlowUpdateStrategy
+        """
+        return select_update_strategy(new_flow, old_flow)
+
+    def _apply_deployment_report(self, report):
+        """
+        update the set of deployed flows with the results of a deployment.
+        The set is replaced, not changed, so that readers of self._flows never need the lock.
+        must be called with self._flow_lock held.
+        :param FlowDeploymentReport report:
+        :return:
+        """
+        flows = set(self._flows)
+        for result in report.succeeded:
+            operation = result.operation
+            if operation.kind == FlowOperation.ADD:
+                flows.add(operation.flow)
+            elif operation.kind == FlowOperation.UPDATE:
+                flows.discard(operation.old_flow)
+                flows.add(operation.flow)
+            else:
+                flows.discard(operation.flow)
+        self._flows = frozenset(flows)
+        self._warm_start_changed()
 
     def clean_up_flows(self):
         """
@@ -320,23 +991,24 @@ class ODLClient(object):
         :return:
         """
         with self._flow_lock:
-            for flow in tuple(self._flows):
-                try:
-                    flow.remove()
-                except:
-                    traceback.print_exc()
-                self._flows.remove(flow)
-        self._build_nodes()
+            report = self._flow_deployment.execute(to_remove=tuple(self._flows))
+            for result in report.failed:
+                logging.error("could not remove %s: %s" % (result.operation.flow, result.exception))
+            # forget about all flows, even if their removal failed.
+            self._flows = frozenset()
+            self._warm_start_changed()
+        self._refresh_deployed_flows(report)
 
     def import_flows_from_switches(self):
         """
-        requires _build_nodes to be run right before this.
-        add all flows in this namespace to this instances flows.
+        fetch the flow tables of all switches (see refresh_flows), and add all flows in this namespace to this
+        instances flows.
         This imports all possible leftovers from earlier application instances.
         :return:
         """
+        self.refresh_flows()  # _build_nodes only fetches the flow tables if inventory_profile includes them
         with self._flow_lock:
-            self._flows.update(self._get_flows_in_namespace_conflict())
+            self._flows = self._flows | self._get_flows_in_namespace_conflict()
 
     def _get_flows_in_namespace_conflict(self):
         """
@@ -348,7 +1020,7 @@ class ODLClient(object):
         # get all flow table entries on all switches. filter by
         # - self._flow_namespace
         # - is not in self._flows
-        return set.union(
+        return set().union(
             *(
                 set(f for f in s.flows if
                     f.entry_name.startswith(self._flow_namespace) and
@@ -361,9 +1033,10 @@ class ODLClient(object):
         return self._flow_namespace
 
     def start_topology_changes_listener(self):
+        # SUBTREE: notifications name the changed node, termination point or link (see _update_topology)
         payload = {"input": {"path": "/network-topology:network-topology",
                              "sal-remote-augment:datastore": "OPERATIONAL",
-                             "sal-remote-augment:scope": "BASE"}}
+                             "sal-remote-augment:scope": "SUBTREE"}}
         sub_result = self._request_json("operations/sal-remote:create-data-change-event-subscription", method="POST",
                                         json=payload)
         stream_name = sub_result["output"]["stream-name"]
@@ -371,8 +1044,7 @@ class ODLClient(object):
         ws_location = ws_result["location"]
 
         def on_message(_ws, _message):
-            if self._build_nodes():
-                self._on_topology_change()
+            self._topology_events.add(_message)
 
         def on_close(_ws):
             logging.debug("Lost WebSocket connection for topology changes")
@@ -390,5 +1062,17 @@ class ODLClient(object):
         t.daemon = True
         t.start()
 
+    def _on_topology_notifications(self, notifications):
+        """
+        handle a batch of topology change notifications: update the topology once, and call
+        self._on_topology_change once if anything changed.
+        :param list[str] notifications:
+        :return:
+        """
+        if len(notifications) > 1:
+            logging.debug("handling %d topology change notifications at once" % len(notifications))
+        if self._update_topology(notifications):
+            self._on_topology_change()
+
     def _on_topology_change(self):
         logging.info("Received topology change notification, updating nodes")
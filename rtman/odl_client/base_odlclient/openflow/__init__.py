@@ -1,7 +1,16 @@
+import hashlib
+import json
+
+from odl_client.base_odlclient.exception import APIException
 from odl_client.base_odlclient.openflow.action import Action
 from odl_client.base_odlclient.openflow.instruction import Instruction
 from odl_client.base_odlclient.openflow.match import Match
 
+# content types for yang-patch requests and responses (RFC 8072)
+YANG_PATCH_CONTENT_TYPE = "application/yang.patch+json"
+YANG_PATCH_STATUS_CONTENT_TYPE = "application/yang.patch-status+json"
+
+
 class FlowTableEntry(object):
     """
     An OpenFlow FlowTable rule.
@@ -11,7 +20,9 @@ class FlowTableEntry(object):
                  "_match", "_instructions",
 
 
-                 "_priority", "_table_id", "_idle_timeout", "_hard_timeout", "_id")
+                 "_priority", "_table_id", "_idle_timeout", "_hard_timeout", "_id",
+
+                 "_key", "_fingerprint")
 
     def __repr__(self):
         return "%s::::%s" % (self._switch.node_id, self._id)
@@ -36,7 +47,7 @@ class FlowTableEntry(object):
         return not self.__eq__(o)
 
     def __hash__(self):
-        return hash(self.__repr__())
+        return hash(self._key)
 
     def __init__(self, switch, match, instructions, priority, entry_name, table_id=0, idle_timeout=0, hard_timeout=0):
         """
@@ -58,6 +69,30 @@ class FlowTableEntry(object):
         self._id = entry_name
         self._idle_timeout = idle_timeout
         self._hard_timeout = hard_timeout
+        self._key = (switch.node_id, table_id, entry_name)
+        self._fingerprint = None
+
+    @property
+    def key(self):
+        """
+        identifies the entry on the controller, regardless of its content.
+        :return: (switch node_id, table_id, entry id)
+        :rtype: tuple[str, int, str]
+        """
+        return self._key
+
+    @property
+    def fingerprint(self):
+        """
+        digest of the entry's content as it is sent to the controller.
+        Two entries with the same key and fingerprint result in the same rule on the switch.
+        Computed on first access; entries must not be modified afterwards.
+        :rtype: str
+        """
+        if self._fingerprint is None:
+            content = json.dumps(self._odl_inventory(), sort_keys=True)
+            self._fingerprint = hashlib.sha1(content.encode("utf-8")).hexdigest()
+        return self._fingerprint
 
     def _odl_inventory(self):
         """
@@ -109,14 +144,40 @@ class FlowTableEntry(object):
     def update(self):
         """
         update this rule on the given switch. This overrides other flow table entries with this.is_same_entry(other)
+        The entry is removed and deployed again; see modify() for an update without removal.
         :return:
         """
-        #self._switch.odlclient._request_json(self._path, method="put", json={
-        #    "flow": self._odl_inventory()
-        #})
         self.remove()  # actually, remove only uses self.switch and self.id, so this removes the other entry as well.
         self.deploy()
 
+    def modify(self):
+        """
+        replace the entry with this entry's id in place, i.e., without removing it first.
+        If match, priority and table are unchanged, the switch modifies the existing rule atomically.
+        :return:
+        """
+        self._switch.odlclient._request_json(self._path, method="put", json={
+            "flow-node-inventory:flow": [self._odl_inventory()]
+        })
+
+    def copy(self, entry_name=None, priority=None):
+        """
+        :param str entry_name: id of the copy; defaults to this entry's id
+        :param int priority: priority of the copy; defaults to this entry's priority
+        :return: a copy of this entry with the same match and instructions
+        :rtype: FlowTableEntry
+        """
+        return self.__class__(
+            switch=self._switch,
+            match=self._match,
+            instructions=self._instructions,
+            priority=self._priority if priority is None else priority,
+            entry_name=self._id if entry_name is None else entry_name,
+            table_id=self._table_id,
+            idle_timeout=self._idle_timeout,
+            hard_timeout=self._hard_timeout
+        )
+
     def remove(self):
         """
         delete the flow table rule from its switch.
@@ -147,3 +208,105 @@ class FlowTableEntry(object):
     @property
     def entry_name(self):
         return self._id
+
+    @property
+    def switch(self):
+        """
+        :return: switch this flow table entry is deployed to
+        :rtype: Switch
+        """
+        return self._switch
+
+    @property
+    def table_id(self):
+        return self._table_id
+
+    @property
+    def priority(self):
+        return self._priority
+
+    @property
+    def match(self):
+        """
+        :rtype: Match
+        """
+        return self._match
+
+
+
+class FlowTablePatch(object):
+    """
+    A set of changes to a single flow table of a switch that is deployed in a single RESTconf request.
+
+    The changes are sent as a yang-patch document. Controllers apply a yang-patch atomically: either all edits
+    succeed, or none of them does.
+    Adding a flow replaces an existing flow with the same id, so that additions and updates are the same edit.
+    """
+    __slots__ = ("_switch", "_table_id", "_edits")
+
+    def __init__(self, switch, table_id):
+        """
+
+        :param Switch switch: switch this patch is deployed to
+        :param int table_id: ID of the flow table this patch modifies
+        """
+        self._switch = switch
+        self._table_id = table_id
+        self._edits = []
+
+    def __len__(self):
+        return len(self._edits)
+
+    @property
+    def _table_path(self):
+        """
+        :return: Path of the patched flow table in ODL RESTconf
+        :rtype: str
+        """
+        return self._switch.path_on_odl + "flow-node-inventory:table/%d/" % self._table_id
+
+    def add_flow(self, flow):
+        """
+        add or replace the given flow
+        :param FlowTableEntry flow:
+        :return:
+        """
+        self._edits.append({
+            "edit-id": str(len(self._edits)),
+            "operation": "replace",
+            "target": "/flow/%s" % flow.entry_name,
+            "value": {"flow-node-inventory:flow": [flow._odl_inventory()]}
+        })
+
+    def remove_flow(self, flow):
+        """
+        delete the given flow
+        :param FlowTableEntry flow:
+        :return:
+        """
+        self._edits.append({
+            "edit-id": str(len(self._edits)),
+            "operation": "delete",
+            "target": "/flow/%s" % flow.entry_name
+        })
+
+    def deploy(self):
+        """
+        send all edits to the controller.
+        :return:
+        :raises: APIException if the controller rejects the patch
+        """
+        result = self._switch.odlclient._request_json(
+            self._table_path, method="patch",
+            json={
+                "ietf-restconf:yang-patch": {
+                    "patch-id": "%s-table-%d" % (self._switch.node_id, self._table_id),
+                    "edit": self._edits
+                }
+            },
+            headers={"Content-Type": YANG_PATCH_CONTENT_TYPE, "Accept": YANG_PATCH_STATUS_CONTENT_TYPE}
+        )
+        # some controllers answer 200 and report errors in the patch status
+        status = (result or {}).get("ietf-yang-patch:yang-patch-status", {})
+        if "errors" in status or any("errors" in e for e in status.get("edit-status", {}).get("edit", [])):
+            raise APIException(str(result))
@@ -0,0 +1,111 @@
+"""
+Strategies for replacing a deployed flow table entry with a new version of itself.
+
+Both versions have the same id on the same switch. Strategies differ in the number of requests and in whether
+frames may miss the rule while it is being replaced:
+
+ * RemoveDeployUpdate removes the old entry and deploys the new one. Frames that arrive in between hit no rule.
+ * InPlaceUpdate replaces the entry with a single PUT. If match, priority and table are unchanged, the switch
+   modifies the rule atomically; otherwise, the controller removes and adds the rule, which has the same gap as
+   RemoveDeployUpdate.
+ * MakeBeforeBreakUpdate first installs the new version under a temporary id with a higher priority, so that it
+   takes over from the old rule. Then, the entry is replaced in place, and the temporary entry is removed.
+   There is always a rule that matches the stream's frames. This needs a free priority above both versions, so it
+   can't be used for entries with the maximum priority: rules of equal priority that overlap match undefined.
+
+select_update_strategy chooses the cheapest strategy that does not drop frames, if there is one.
+"""
+from odl_client.base_odlclient.exception import AlreadyExistsException
+
+# suffix of the temporary entry's id in make-before-break updates
+TEMPORARY_ENTRY_SUFFIX = "__mbb"
+
+# maximum OpenFlow priority
+MAXIMUM_PRIORITY = 65535
+
+
+class FlowUpdateStrategy(object):
+    """
+    Abstract update strategy.
+    """
+    __slots__ = ()
+
+    name = None
+
+    def __repr__(self):
+        return "%s <%s>" % (self.name, self.__class__.__name__)
+
+    def update(self, new_flow, old_flow):
+        """
+        replace old_flow by new_flow on the switch.
+
+        :param FlowTableEntry new_flow: new version of the entry
+        :param FlowTableEntry old_flow: currently deployed version of the entry
+        :return:
+        :raises: APIException
+        """
+        raise NotImplementedError()
+
+
+class RemoveDeployUpdate(FlowUpdateStrategy):
+    __slots__ = ()
+
+    name = "remove-deploy"
+
+    def update(self, new_flow, old_flow):
+        old_flow.remove()
+        new_flow.deploy()
+
+
+class InPlaceUpdate(FlowUpdateStrategy):
+    __slots__ = ()
+
+    name = "in-place"
+
+    def update(self, new_flow, old_flow):
+        new_flow.modify()
+
+
+class MakeBeforeBreakUpdate(FlowUpdateStrategy):
+    __slots__ = ()
+
+    name = "make-before-break"
+
+    def update(self, new_flow, old_flow):
+        priority = max(new_flow.priority, old_flow.priority) + 1
+        if priority > MAXIMUM_PRIORITY:
+            raise ValueError("no make-before-break update of %s: priority %d leaves no room for the temporary entry" %
+                             (new_flow.entry_name, priority - 1))
+        temporary_flow = new_flow.copy(entry_name=new_flow.entry_name + TEMPORARY_ENTRY_SUFFIX, priority=priority)
+        try:
+            temporary_flow.deploy()
+        except AlreadyExistsException:
+            temporary_flow.modify()  # leftover of an earlier, interrupted update
+        try:
+            new_flow.modify()
+        finally:
+            temporary_flow.remove()
+
+
+REMOVE_DEPLOY = RemoveDeployUpdate()
+IN_PLACE = InPlaceUpdate()
+MAKE_BEFORE_BREAK = MakeBeforeBreakUpdate()
+
+
+def select_update_strategy(new_flow, old_flow):
+    """
+    Switches modify a rule atomically if only its instructions change. Otherwise, the rule is replaced, and
+    make-before-break is needed to not drop any frames. Entries with the maximum priority can't be updated
+    make-before-break; they are removed and deployed again.
+
+    :param FlowTableEntry new_flow: new version of the entry
+    :param FlowTableEntry old_flow: currently deployed version of the entry
+    :return: strategy for replacing old_flow by new_flow
+    :rtype: FlowUpdateStrategy
+    """
+    if new_flow.priority == old_flow.priority and new_flow.table_id == old_flow.table_id and \
+            new_flow.match.odl_inventory() == old_flow.match.odl_inventory():
+        return IN_PLACE
+    if max(new_flow.priority, old_flow.priority) >= MAXIMUM_PRIORITY:
+        return REMOVE_DEPLOY
+    return MAKE_BEFORE_BREAK
@@ -0,0 +1,167 @@
+"""
+Pooled HTTP session for the ODL RESTconf interface.
+
+All RESTconf requests of an ODLClient share one RESTconfSession. The session keeps a pool of keep-alive connections
+to the controller, so that consecutive requests (e.g., hundreds of flow writes during a schedule change) re-use
+already established TCP connections instead of doing a new handshake and basic-auth setup for each request.
+
+The number of requests that may be in flight at the same time is bounded by the pool size. Requests beyond that
+wait for a free connection; the time spent waiting is recorded in the session statistics.
+"""
+import time
+from threading import BoundedSemaphore, Lock
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# default number of keep-alive connections to the controller
+DEFAULT_POOL_SIZE = 10
+
+# default timeouts in seconds: (connect timeout, read timeout)
+DEFAULT_TIMEOUT = (3.05, 30.0)
+
+
+class SessionStatistics(object):
+    """
+    Counters of a RESTconfSession.
+    All times are given in seconds.
+    """
+    __slots__ = ("requests", "failed_requests", "connections_opened", "connections_reused",
+                 "wait_time", "max_wait_time", "request_time")
+
+    def __init__(self, requests=0, failed_requests=0, connections_opened=0, connections_reused=0,
+                 wait_time=0.0, max_wait_time=0.0, request_time=0.0):
+        self.requests = requests
+        self.failed_requests = failed_requests
+        self.connections_opened = connections_opened
+        self.connections_reused = connections_reused
+        self.wait_time = wait_time
+        self.max_wait_time = max_wait_time
+        self.request_time = request_time
+
+    def __repr__(self):
+        return "SessionStatistics[%d requests, %d new connections, %d reused, %.3fs waiting]" % (
+            self.requests, self.connections_opened, self.connections_reused, self.wait_time)
+
+    @property
+    def json(self):
+        return {
+            "requests": self.requests,
+            "failed_requests": self.failed_requests,
+            "connections_opened": self.connections_opened,
+            "connections_reused": self.connections_reused,
+            "wait_time": self.wait_time,
+            "max_wait_time": self.max_wait_time,
+            "request_time": self.request_time
+        }
+
+
+class RESTconfSession(object):
+    """
+    A keep-alive session to a RESTconf server with a bounded connection pool.
+    Thread safe; may be used by many threads at once.
+    """
+    __slots__ = ("_baseurl", "_session", "_adapter", "_pool_size", "_timeout", "_pool_slots",
+                 "_statistics", "_statistics_lock")
+
+    def __init__(self, baseurl, username, password, pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT):
+        """
+
+        :param str baseurl: URL that is put in front of each request path, e.g. http://server:8181/restconf/
+        :param str username: username for basic authentication
+        :param str password: password for basic authentication
+        :param int pool_size: maximum number of keep-alive connections, i.e., maximum number of concurrent requests
+        :param float|tuple[float, float] timeout: default timeout for each request, see requests.request
+        """
+        if pool_size < 1:
+            raise ValueError("pool_size must be at least 1")
+        self._baseurl = baseurl
+        self._pool_size = pool_size
+        self._timeout = timeout
+        self._pool_slots = BoundedSemaphore(pool_size)
+        self._statistics = SessionStatistics()
+        self._statistics_lock = Lock()
+
+        self._adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+        self._session = requests.Session()
+        self._session.auth = (username, password)
+        self._session.mount("http://", self._adapter)
+        self._session.mount("https://", self._adapter)
+
+    @property
+    def pool_size(self):
+        return self._pool_size
+
+    @property
+    def timeout(self):
+        return self._timeout
+
+    def request(self, method, path, data=None, json=None, headers=None, timeout=None):
+        """
+        Send a request. Blocks until a connection of the pool is available.
+
+        :param str method: HTTP method
+        :param str path: request path, relative to the base url
+        :param data: request body
+        :param dict json: request body, sent as json
+        :param dict headers: additional HTTP headers
+        :param timeout: timeout for this request; the session's default timeout is used if None
+        :return: response
+        :rtype: requests.Response
+        """
+        wait_start = time.time()
+        self._pool_slots.acquire()
+        request_start = time.time()
+        failed = True
+        try:
+            r = self._session.request(method=method, url=self._baseurl + path, data=data, json=json,
+                                      headers=headers, timeout=self._timeout if timeout is None else timeout)
+            failed = r.status_code not in range(200, 300)
+            return r
+        finally:
+            self._pool_slots.release()
+            request_end = time.time()
+            with self._statistics_lock:
+                waited = request_start - wait_start
+                self._statistics.requests += 1
+                self._statistics.failed_requests += 1 if failed else 0
+                self._statistics.wait_time += waited
+                self._statistics.max_wait_time = max(self._statistics.max_wait_time, waited)
+                self._statistics.request_time += request_end - request_start
+
+    @property
+    def statistics(self):
+        """
+        counters of this session. Connection counters are read from the connection pools.
+
+        :return: copy of the current counters
+        :rtype: SessionStatistics
+        """
+        connections_opened = 0
+        requests_sent = 0
+        pools = self._adapter.poolmanager.pools
+        for key in pools.keys():
+            try:
+                pool = pools[key]
+            except KeyError:
+                continue  # pool has been evicted in the meantime
+            connections_opened += pool.num_connections
+            requests_sent += pool.num_requests
+        with self._statistics_lock:
+            s = self._statistics
+            return SessionStatistics(
+                requests=s.requests,
+                failed_requests=s.failed_requests,
+                connections_opened=connections_opened,
+                connections_reused=max(requests_sent - connections_opened, 0),
+                wait_time=s.wait_time,
+                max_wait_time=s.max_wait_time,
+                request_time=s.request_time
+            )
+
+    def close(self):
+        """
+        close all pooled connections.
+        :return:
+        """
+        self._session.close()
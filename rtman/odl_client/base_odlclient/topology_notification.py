@@ -0,0 +1,215 @@
+"""
+Interpretation of ODL data change notifications for the flow:1 topology.
+
+ODL sends a notification over the websocket stream of a data change event subscription whenever the topology
+changes. Each notification contains one or more data change events, each with the path of the changed element and
+the kind of change. Notifications are sent as XML (default) or JSON.
+
+parse_topology_notification turns a notification into TopologyChanges, i.e., which node, termination point or link
+has been created, updated or deleted. ODLClient fetches only these elements instead of the complete topology and
+inventory.
+"""
+import json
+import xml.etree.ElementTree as ElementTree
+
+TOPOLOGY_ID = "flow:1"
+
+
+class TopologyChange(object):
+    """
+    Change of a single element of the flow:1 topology.
+    """
+    __slots__ = ("_element", "_key", "_node_id", "_operation")
+
+    NODE = "node"
+    TERMINATION_POINT = "termination-point"
+    LINK = "link"
+
+    CREATED = "created"
+    UPDATED = "updated"
+    DELETED = "deleted"
+
+    def __init__(self, element, key, operation, node_id=None):
+        """
+
+        :param str element: NODE, TERMINATION_POINT or LINK
+        :param str key: node-id, tp-id or link-id of the element
+        :param str operation: CREATED, UPDATED or DELETED
+        :param str node_id: node-id of the node a termination point belongs to
+        """
+        self._element = element
+        self._key = key
+        self._operation = operation
+        self._node_id = node_id if node_id is not None else (key if element == self.NODE else None)
+
+    def __repr__(self):
+        return "TopologyChange[%s %s %s]" % (self._operation, self._element, self._key)
+
+    def __eq__(self, o):
+        return isinstance(o, TopologyChange) and (self._element, self._key, self._operation, self._node_id) == \
+            (o._element, o._key, o._operation, o._node_id)
+
+    def __ne__(self, o):
+        return not self.__eq__(o)
+
+    def __hash__(self):
+        return hash((self._element, self._key, self._operation))
+
+    @property
+    def element(self):
+        return self._element
+
+    @property
+    def key(self):
+        return self._key
+
+    @property
+    def operation(self):
+        return self._operation
+
+    @property
+    def node_id(self):
+        """
+        :return: node-id of the changed node, or of the node the changed termination point belongs to
+        :rtype: str
+        """
+        return self._node_id
+
+
+def _split_path(path):
+    """
+    split an instance identifier into its steps. Module prefixes are removed.
+
+    e.g. "/nt:network-topology/nt:topology[nt:topology-id='flow:1']" ->
+         [("network-topology", {}), ("topology", {"topology-id": "flow:1"})]
+    :param str path:
+    :rtype: list[(str, dict[str, str])]
+    :raises: ValueError if the path is malformed
+    """
+    steps = []
+    i = 0
+    length = len(path)
+    while i < length:
+        if path[i] != "/":
+            raise ValueError("malformed path %s" % path)
+        i += 1
+        start = i
+        while i < length and path[i] not in "/[":
+            i += 1
+        name = path[start:i].split(":")[-1]
+        keys = {}
+        while i < length and path[i] == "[":
+            end = path.index("=", i)
+            key = path[i + 1:end].strip().split(":")[-1]
+            quote = path[end + 1]
+            if quote not in "'\"":
+                raise ValueError("malformed path %s" % path)
+            value_end = path.index(quote, end + 2)
+            keys[key] = path[end + 2:value_end]
+            i = path.index("]", value_end) + 1
+        steps.append((name, keys))
+    return steps
+
+
+def _change_from_event(path, operation):
+    """
+    :return: the change described by a data change event; TOPOLOGY_ID if the whole topology changed; None if the
+             event is not about the flow:1 topology
+    :rtype: TopologyChange|str|None
+    :raises: ValueError if the event can not be interpreted
+    """
+    if operation not in (TopologyChange.CREATED, TopologyChange.UPDATED, TopologyChange.DELETED):
+        raise ValueError("unknown operation %s" % operation)
+    steps = _split_path(path)
+    if not steps or steps[0][0] != "network-topology":
+        raise ValueError("not a topology path: %s" % path)
+    if len(steps) < 2 or "topology-id" not in steps[1][1]:
+        return TOPOLOGY_ID  # the whole network-topology container
+    if steps[1][1]["topology-id"] != TOPOLOGY_ID:
+        return None
+    if len(steps) < 3:
+        return TOPOLOGY_ID
+    name, keys = steps[2]
+    if name == "node" and "node-id" in keys:
+        node_id = keys["node-id"]
+        if len(steps) > 3 and steps[3][0] == "termination-point" and "tp-id" in steps[3][1]:
+            # changes below a termination point only update it
+            tp_operation = operation if len(steps) == 4 else TopologyChange.UPDATED
+            return TopologyChange(TopologyChange.TERMINATION_POINT, steps[3][1]["tp-id"], tp_operation, node_id)
+        return TopologyChange(TopologyChange.NODE, node_id, operation if len(steps) == 3 else TopologyChange.UPDATED)
+    if name == "link" and "link-id" in keys:
+        return TopologyChange(TopologyChange.LINK, keys["link-id"],
+                              operation if len(steps) == 3 else TopologyChange.UPDATED)
+    raise ValueError("unknown topology element in %s" % path)
+
+
+def _events_from_xml(message):
+    root = ElementTree.fromstring(message)
+    events = []
+    for element in root.iter():
+        if element.tag.split("}")[-1] != "data-change-event":
+            continue
+        path = operation = None
+        for child in element:
+            tag = child.tag.split("}")[-1]
+            if tag == "path":
+                path = (child.text or "").strip()
+            elif tag == "operation":
+                operation = (child.text or "").strip()
+        events.append((path, operation))
+    return events
+
+
+def _events_from_json(message):
+    notification = json.loads(message)
+    notification = notification.get("notification", notification)
+    changed = notification.get("data-changed-notification",
+                               notification.get("sal-remote:data-changed-notification", {}))
+    events = changed.get("data-change-event", [])
+    if isinstance(events, dict):
+        events = [events]
+    return [(event.get("path"), event.get("operation")) for event in events]
+
+
+def parse_topology_notification(message):
+    """
+    interpret a data change notification of the network-topology subscription.
+
+    :param str message: notification as received from the websocket stream
+    :return: changes of nodes, termination points and links in order of the events;
+             None if the notification can not be interpreted, or if it reports a change of the whole topology.
+             In both cases, the complete topology has to be fetched again.
+    :rtype: list[TopologyChange]|None
+    """
+    try:
+        if message.lstrip().startswith("<"):
+            events = _events_from_xml(message)
+        else:
+            events = _events_from_json(message)
+    except (ValueError, SyntaxError, AttributeError):  # ElementTree.ParseError is a SyntaxError
+        return None
+    if not events:
+        return None
+
+    changes = []
+    seen = set()
+    topology_changed = False
+    for path, operation in events:
+        if not path or not operation:
+            return None
+        try:
+            change = _change_from_event(path, operation)
+        except (ValueError, IndexError):
+            return None
+        if change == TOPOLOGY_ID:
+            # ODL reports an update of each parent container along with the changed element itself.
+            # Only a deletion or creation of the whole topology requires a full fetch.
+            if operation != TopologyChange.UPDATED:
+                return None
+            topology_changed = True
+        elif change is not None and change not in seen:
+            seen.add(change)
+            changes.append(change)
+    if topology_changed and not changes:
+        return None
+    return changes
@@ -0,0 +1,145 @@
+"""
+Versioned snapshots of the topology model.
+
+An ODLClient publishes a new TopologySnapshot after each update of its topology model. Readers take the current
+snapshot in O(1) instead of fetching the topology from the controller on each read. A snapshot never changes: it
+always contains the nodes that were known when it was published, and their connections at that time
+(TopologySnapshot.connections). The node objects themselves are shared with the topology model, so reading their
+connectors directly reflects the latest update; readers that need the connectivity of the version they saw use
+connections instead. Connections of nodes that did not change are taken over from the previous snapshot.
+
+The version is increased whenever an update found a new or removed switch, host, or connection.
+"""
+import time
+
+from odl_client.base_odlclient.node import connector_order
+
+
+class TopologySnapshot(object):
+    """
+    Immutable set of nodes of a topology model, with a version number.
+    """
+    __slots__ = ("_version", "_timestamp", "_switches", "_hosts", "_nodes", "_changed_node_ids", "_connections")
+
+    def __init__(self, version, switches, hosts, timestamp=None, changed_node_ids=None, previous=None):
+        """
+
+        :param int version: version of the topology model
+        :param dict[str, Switch] switches: switches by node_id; copied
+        :param dict[str, Host] hosts: hosts by node_id; copied
+        :param float timestamp: time the topology was fetched from the controller; now if None
+        :param frozenset[str] changed_node_ids: nodes that changed since the previous snapshot; None if unknown
+        :param TopologySnapshot previous: previous snapshot, whose connections of unchanged nodes are re-used
+        """
+        self._version = version
+        self._timestamp = time.time() if timestamp is None else timestamp
+        self._switches = dict(switches)
+        self._hosts = dict(hosts)
+        self._nodes = dict(self._switches)
+        self._nodes.update(self._hosts)
+        self._changed_node_ids = changed_node_ids
+        reusable = previous._connections if previous is not None and changed_node_ids is not None else {}
+        self._connections = {}
+        for node_id, node in self._nodes.items():
+            connections = reusable.get(node_id)
+            if connections is None or node_id in changed_node_ids:
+                connections = self._freeze_connections(node)
+            self._connections[node_id] = connections
+
+    @staticmethod
+    def _freeze_connections(node):
+        """
+        :param ODLNode node:
+        :rtype: tuple[(str, str|None, str|None)]
+        """
+        connections = []
+        for connector in node.list_connectors():
+            target = connector.target
+            if target is None:
+                connections.append((connector.connector_id, None, None))
+            else:
+                connections.append((connector.connector_id, target.parent.node_id, target.connector_id))
+        return tuple(sorted(connections, key=lambda connection: connector_order(connection[0])))
+
+    def __repr__(self):
+        return "TopologySnapshot[version %d, %d switches, %d hosts]" % (
+            self._version, len(self._switches), len(self._hosts))
+
+    def __contains__(self, node_id):
+        return node_id in self._nodes
+
+    def __len__(self):
+        return len(self._nodes)
+
+    @property
+    def version(self):
+        """
+        :rtype: int
+        """
+        return self._version
+
+    @property
+    def timestamp(self):
+        """
+        :return: time the topology was fetched from the controller
+        :rtype: float
+        """
+        return self._timestamp
+
+    @property
+    def age(self):
+        """
+        :return: seconds since the topology was fetched from the controller
+        :rtype: float
+        """
+        return time.time() - self._timestamp
+
+    @property
+    def changed_node_ids(self):
+        """
+        :return: ids of the nodes that were added, removed or changed since the previous snapshot, including both
+                 ends of added or removed links; None if the complete topology has been fetched
+        :rtype: frozenset[str]|None
+        """
+        return self._changed_node_ids
+
+    def get_node(self, node_id):
+        """
+        :param str node_id:
+        :rtype: ODLNode
+        :raises: KeyError if the node is not part of this snapshot
+        """
+        return self._nodes[node_id]
+
+    def connections(self, node_id):
+        """
+        the connectivity of a node as of this snapshot, which does not change with later updates of the topology.
+        :param str node_id:
+        :return: (connector_id, neighbor node_id, neighbor connector_id) of each connector of the node, sorted by
+                 port number (node.connector_order); the neighbor ids are None for connectors that are not connected
+        :rtype: tuple[(str, str|None, str|None)]
+        :raises: KeyError if the node is not part of this snapshot
+        """
+        return self._connections[node_id]
+
+    @property
+    def nodes(self):
+        """
+        :return: all nodes, identified by their node_ids
+        :rtype: dict[str, ODLNode]
+        """
+        return self._nodes.copy()
+
+    @property
+    def switches(self):
+        """
+        :rtype: dict[str, Switch]
+        """
+        return self._switches.copy()
+
+    @property
+    def hosts(self):
+        """
+        :rtype: dict[str, Host]
+        """
+        return self._hosts.copy()
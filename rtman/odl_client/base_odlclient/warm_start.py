@@ -0,0 +1,74 @@
+"""
+Persisted state for a warm start of an ODL client.
+
+Building the topology model requires a complete fetch from the controller, and streams can only be admitted once
+it is built. A WarmStartStore keeps a compact snapshot of the client's state in a file: the topology model, in the
+same form as it is fetched from the controller, the deployed flows, and whatever state subclasses add (e.g. the
+scheduler's state of IRTOdlClient). After a restart, ODLClient.bootstrap restores this state without contacting the
+controller, and reconciles it with the controller in the background.
+
+The file is written by replacing it, so that a crash while writing never leaves a partial snapshot behind.
+"""
+import json
+import logging
+import os
+import time
+
+# increase when the layout of the state changes; snapshots of other versions are ignored
+FORMAT_VERSION = 1
+
+
+class WarmStartStore(object):
+    """
+    File that the warm start state of an ODL client is persisted to.
+    """
+    __slots__ = ("_path", "_max_age")
+
+    def __init__(self, path, max_age=None):
+        """
+
+        :param str path: path of the snapshot file
+        :param float max_age: snapshots older than this many seconds are not restored; no limit if None
+        """
+        self._path = path
+        self._max_age = max_age
+
+    def __repr__(self):
+        return "WarmStartStore[%s]" % self._path
+
+    @property
+    def path(self):
+        return self._path
+
+    def load(self):
+        """
+        :return: the persisted state, or None if there is no snapshot that can be restored
+        :rtype: dict|None
+        """
+        try:
+            with open(self._path) as f:
+                snapshot = json.load(f)
+        except IOError:
+            return None  # no snapshot yet
+        except ValueError as e:
+            logging.warning("ignoring unreadable warm start snapshot %s: %s" % (self._path, e))
+            return None
+        if snapshot.get("format") != FORMAT_VERSION:
+            logging.warning("ignoring warm start snapshot %s of format %s" % (self._path, snapshot.get("format")))
+            return None
+        age = time.time() - snapshot["saved"]
+        if self._max_age is not None and age > self._max_age:
+            logging.info("ignoring warm start snapshot %s, %.0fs old" % (self._path, age))
+            return None
+        return snapshot["state"]
+
+    def save(self, state):
+        """
+        replace the snapshot.
+        :param dict state: json serializable state
+        :return:
+        """
+        temporary_path = "%s.tmp" % self._path
+        with open(temporary_path, "w") as f:
+            json.dump({"format": FORMAT_VERSION, "saved": time.time(), "state": state}, f, separators=(",", ":"))
+        os.rename(temporary_path, self._path)  # atomic on POSIX
@@ -1,5 +1,4 @@
-import sys
-
+from odl_client.base_odlclient.node import NotANeighborException
 from odl_client.base_odlclient.openflow import FlowTableEntry
 from odl_client.base_odlclient.openflow.action import PushMPLSAction, SwapMPLSAction, ChangeDstIPAction, ChangeDstMacAction, \
     OutputAction, PopMPLSAction, SetQueueAction
@@ -15,7 +14,7 @@ from odl_client.reserving_odlclient.stream import MultiStream
 
 TRANSMISSION_SLOT_LENGTH = 1000
 
-mpls_counter = 32
+FIRST_MPLS_LABEL = 32
 
 
 class MPLSTransmissionPoint(TransmissionPoint):
@@ -90,14 +89,80 @@ class DijkstraBasedScheduler(Scheduler):
     TOPOLOGY_CLS = DijkstraTopology
     SCHEDULE_CLS = PathBasedSchedule
 
-    __slots__ = ("_multistream_mpls_labels",
+    __slots__ = ("_multistream_mpls_labels", "_next_mpls_label",
+
+                 "_flow_priority",
 
-                 "_flow_priority")
+                 "_paths",  # type: dict(str, list(str))
+                 "_restored_paths"  # type: dict(str, list(str))
+                 )
 
     def __init__(self, odl_client, flow_priority):
         super(DijkstraBasedScheduler, self).__init__(odl_client)
         self._multistream_mpls_labels = {}
+        self._next_mpls_label = FIRST_MPLS_LABEL
         self._flow_priority = flow_priority
+        self._paths = {}  # partialstream identifier -> node ids of its path
+        self._restored_paths = {}
+
+    def warm_start_state(self):
+        """
+        the MPLS labels of the multistreams and the paths of the partialstreams. When a stream joins again after a
+        warm start, it gets the same label and path, and thus the same flows as before.
+        """
+        identifiers = set(p.identifier for p in self.partialstreams)
+        paths = dict(self._restored_paths)
+        paths.update((identifier, path) for identifier, path in self._paths.items() if identifier in identifiers)
+        return {"mpls_labels": dict(self._multistream_mpls_labels), "paths": paths}
+
+    def restore_warm_start_state(self, state):
+        self._multistream_mpls_labels.update(state["mpls_labels"])
+        if state["mpls_labels"]:  # new labels must not collide with restored ones
+            self._next_mpls_label = max(self._next_mpls_label, max(state["mpls_labels"].values()) + 1)
+        self._restored_paths = dict(state["paths"])
+
+    def release_warm_start_state(self):
+        self._restored_paths = {}
+
+    def _restored_pathset(self, partialstreams):
+        """
+        :param Set[PartialStream] partialstreams: partialstreams of the same multistream
+        :return: the paths that the partialstreams had before a warm start, if all of them still exist
+        :rtype: PathSet|None
+        """
+        if not any(partialstream.identifier in self._restored_paths for partialstream in partialstreams):
+            return None
+        paths = [(partialstream, self._restored_path(partialstream)) for partialstream in partialstreams]
+        # used or not, the restored paths of these partialstreams are done with
+        for partialstream in partialstreams:
+            self._restored_paths.pop(partialstream.identifier, None)
+        if any(path is None for _, path in paths):
+            return None
+
+        pathset = PathSet()
+        for partialstream, path in paths:
+            pathset.add_path(partialstream, path)
+        next(iter(partialstreams)).parent.set_status(FailureCode.NoFailure)
+        return pathset
+
+    def _restored_path(self, partialstream):
+        """
+        :param PartialStream partialstream:
+        :return: the path that the partialstream had before a warm start, if it still leads from its sender through
+                 connected switches to its receiver in the current topology
+        :rtype: list[NodeWrapper]|None
+        """
+        try:
+            path = [self._topology.get_node(node_id) for node_id in self._restored_paths[partialstream.identifier]]
+            if len(path) < 3 or path[0].node_id != partialstream.sender.node_id or \
+                    path[-1].node_id != partialstream.receiver.node_id or \
+                    not all(node.is_switch for node in path[1:-1]):
+                return None
+            for node, next_node in zip(path, path[1:]):
+                node.get_neighbor_connector(next_node)  # only connectors that are linked to next_node
+        except (KeyError, NotANeighborException):
+            return None
+        return path
 
     def get_multistream_mpls_label(self, multistream):
         if isinstance(multistream, MultiStream):
@@ -105,9 +170,8 @@ class DijkstraBasedScheduler(Scheduler):
         try:
             return self._multistream_mpls_labels[multistream]
         except KeyError:
-            global mpls_counter
-            self._multistream_mpls_labels[multistream] = mpls_counter
-            mpls_counter += 1
+            self._multistream_mpls_labels[multistream] = self._next_mpls_label
+            self._next_mpls_label += 1
             return self._multistream_mpls_labels[multistream]
 
 
@@ -122,25 +186,30 @@ class DijkstraBasedScheduler(Scheduler):
         for partialstream in unchanged_partialstreams:
             new_schedule.add_transmission_points(old_schedule.transmission_points_by_partialstream(partialstream))
 
-        new_partialstreams = set.difference(self.partialstreams, old_schedule.partialstreams)
-        new_multistreams = {partialstream.parent for partialstream in new_partialstreams}
-
-        for multistream in new_multistreams:
+        new_partialstreams = self.partialstreams.difference(old_schedule.partialstreams)
+        # in order of their names, so that the same streams always result in the same schedule
+        new_multistreams = sorted({partialstream.parent for partialstream in new_partialstreams},
+                                  key=lambda multistream: multistream.name)
 
-            # get already known paths for the current multistream, as they are cost-free to reuse.
-            old_paths = old_schedule.get_pathset().get_paths_for_multistream(multistream)
+        searches = [(multistream,
+                     # only need to calculate paths that are not in old paths
+                     self.partialstreams_of_multistream(multistream).difference(old_schedule.partialstreams),
+                     # get already known paths for the current multistream, as they are cost-free to reuse.
+                     old_schedule.get_pathset().get_paths_for_multistream(multistream))
+                    for multistream in new_multistreams]
+        for multistream, partialstreams, old_paths in self._in_path_search_order(searches):
 
-            pathset = self._calculate_pathset(
-                # only need to calculate paths that are not in old paths
-                set.difference(self.partialstreams_of_multistream(multistream), old_schedule.partialstreams),
-                old_paths
-            )
+            pathset = self._restored_pathset(partialstreams)
+            if pathset is None:
+                pathset = self._calculate_pathset(partialstreams, old_paths)
 
             new_schedule.set_pathset(pathset)
 
             # the following will work more efficiently with a dict representation, as we can remove
             # short paths after we have traversed them completely.
             pathset = pathset.to_dict()
+            self._paths.update((partialstream.identifier, [node.node_id for node in path])
+                               for partialstream, path in pathset.items())
 
             # The calculated pathset has an important property:
             #  for each two paths, there is exactly one shared part and one disjunct part, where
@@ -301,88 +370,20 @@ class DijkstraBasedScheduler(Scheduler):
         source_switch = source_host.connector.target.parent
         destination_switches = {host.node_id: host.connector.target.parent for host in destination_hosts}
 
-        # we will store all unvisited destination switches here. We can stop the algorithm once
-        #  every destination switch has been visited.
-        missing_destination_switches = set(destination_switches.values())
-
-
-        ### Phase 2: dijkstra initialization
-
-        # all nodes have maximum distance and no predecessor
-        distance = {switch.node_id: sys.maxsize for switch in self._topology.switches}  # type: dict(str, int)
-        prev_node = {switch.node_id: None for switch in self._topology.switches}  # type: dict(str, DijkstraSwitchWrapper)
-
-        # start node has no cost to self
-        distance[source_switch.node_id] = 0
-
-        # note that prev_node[source_switch.node_id] will stay None during iteration.
-        # this marks the beginning of the path when following prev_node from destination to source later.
-
-        # set of all non-visited nodes
-        Q = self._topology.switches  # type: list(DijkstraSwitchWrapper)
-
-        ### Phase 2.1 re-use existing paths
-
-        # in arguments, we should have only received paths about the given partialstreams.
-        for path in existing_paths:
-            # we don't need the hosts (start and end of path), so strip them.
-            switch_path = path[1:-1]
-            # for the remaining, we can say:
-            #  * if nodes a, b are successors in path, we want to set
-            #    * distance[b] = 0    as there is no cost for re-using this
-            #    * prev_node[b] = a   as this is the way that our table works.
-            # note: the first element in the path is start switch.
-            for i in range(len(switch_path))[1:]:  # convert to indexes, remove first. index i points to b, i-1 to a
-                distance[switch_path[i].node_id] = 1
-                prev_node[switch_path[i].node_id] = switch_path[i-1]
-
-
-        ### Phase 3: dijkstra iteration
-        while Q:
-            # find the node with minimum cost that is still in Q.
-            # note that in first iteration, this will yield source_switch since this has cost 0, all others maxint.
-            # u is the currently visited node.
-            # remove u from the set.
-            u = min(Q, key=lambda node: distance[node.node_id])
-            Q.remove(u)
-
-            # now find costs to all neighbors (i.e., all connectors)
-            for connector in u.connectors:
-                if connector.target:  # local loopback interface doesn't have a target
-                    # v is currently checked neighbor
-                    v = connector.target.parent
-                    if v in Q:  # we only need to check unvisited nodes
-
-                        cost = len(connector.multistreams) + 1
-                        distance_v = distance[u.node_id] + cost
-                        if distance_v < distance[v.node_id]:
-                            distance[v.node_id] = distance_v
-                            prev_node[v.node_id] = u
-
-            # break the loop when we have reached the last destination.
-            # the latter part in this loop examines u's neighbors. This is not important since u is the destination
-            if u in missing_destination_switches:
-                missing_destination_switches.remove(u)
-                if not missing_destination_switches:
-                    break
-
-        ### Phase 4: Pathset creation
-        # after the dijkstra iteration, we have a tree with paths to all destination switches.
+        ### Phase 2: dijkstra
+        # least used paths from the source switch to all destination switches. Links of existing paths are re-used.
+        switch_paths = self._shortest_switch_paths(source_switch, destination_switches.values(), existing_paths)
+
+        ### Phase 3: Pathset creation
+        # after the dijkstra, we have paths to all destination switches.
         # we need to create a Pathset from this.
         # a pathset is defined as  partialstream -> path from host to destination
         pathset = PathSet()
         for partialstream in partialstreams:
             destination_host = self._topology.get_host(partialstream.receiver.node_id)
 
-            # now, traverse the preve_node relationship for this partialstream's destination
-            u = destination_switches[destination_host.node_id]
-            raw_path = [u]
-            while prev_node[u.node_id] is not None:
-                u = prev_node[u.node_id]
-                raw_path.append(u)
-
-            # this resulted in a reverse path, without hosts. let's fix this:
-            raw_path = [source_host] + raw_path[::-1] + [destination_host]
+            # the path of switches to this partialstream's destination, without hosts. let's add them:
+            raw_path = [source_host] + switch_paths[destination_switches[destination_host.node_id]] + [destination_host]
             pathset.add_path(partialstream, raw_path)
         next(iter(partialstreams)).parent.set_status(FailureCode.NoFailure)
 
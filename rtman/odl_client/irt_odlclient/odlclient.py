@@ -1,3 +1,6 @@
+import logging
+from threading import Timer
+
 from odl_client.base_odlclient.openflow import FlowTableEntry
 from odl_client.base_odlclient.openflow.action import DropFrameAction
 from odl_client.base_odlclient.openflow.base import IPPROTOCOL_UDP
@@ -19,14 +22,24 @@ class IRTOdlClient(ReservingODLClient):
 
         "_scheduler",
 
-        "_drop_nonirt_udp_traffic"
+        "_drop_nonirt_udp_traffic",
+
+        "_warm_start_grace",
+        "_tas_mounts_deferred"
     )
 
     _host_type = CapacityBasedHost
     _switch_type = CapacityBasedSwitch
 
     def __init__(self, scheduler_cls, tas_handler=None, drop_nonirt_udp_traffic=False, *args, **kwargs):
+        """
+        keyword argument warm_start_grace: after a warm start, the restored scheduler state of streams that have not
+        joined again is kept for this many seconds (default 60), see Scheduler.restore_warm_start_state.
+        All other arguments are passed to ODLClient.
+        """
         self._flows_dropnonregistered = set()
+        self._warm_start_grace = kwargs.pop("warm_start_grace", 60.0)
+        self._tas_mounts_deferred = False
         super(IRTOdlClient, self).__init__(*args, **kwargs)
         self._scheduler = scheduler_cls(self, IRT_FLOW_PRIORITY)  # type: Scheduler
         self._tas_handler = tas_handler if tas_handler else TASHandler()
@@ -53,8 +66,8 @@ class IRTOdlClient(ReservingODLClient):
         # hint: tas config is discarded as part of the configuration in self._generate_flowset
         return flows
 
-    def _build_nodes(self):
-        topology_change_detected = super(IRTOdlClient, self)._build_nodes()
+    def _after_topology_update(self, topology_change_detected, snapshot):
+        super(IRTOdlClient, self)._after_topology_update(topology_change_detected, snapshot)
 
         # for each switch, add a flow that drops all IRT frames
         if self._drop_nonirt_udp_traffic:
@@ -70,9 +83,43 @@ class IRTOdlClient(ReservingODLClient):
             )
 
         if topology_change_detected:
-            self._scheduler.init_nodestructure()
+            # the scheduler topology is updated in place; not while a schedule is calculated on it, nor by two
+            # topology updates at once
+            with self._bootstrap_report.step("scheduler topology"), self._reservation_lock:
+                self._scheduler.update_nodestructure(snapshot.changed_node_ids)
+            if not self._tas_mounts_deferred:
+                with self._bootstrap_report.step("TAS mounts"):
+                    self._tas_handler._on_build_nodes()
+
+    def _warm_start_state(self):
+        state = super(IRTOdlClient, self)._warm_start_state()
+        with self._reservation_lock:
+            state["scheduler"] = self._scheduler.warm_start_state()
+        return state
+
+    def _restore_warm_start(self, state):
+        # mounting requires the controller; it is done by the reconciliation in the background
+        self._tas_mounts_deferred = True
+        super(IRTOdlClient, self)._restore_warm_start(state)
+        if state.get("scheduler") is not None:
+            with self._reservation_lock:
+                self._scheduler.restore_warm_start_state(state["scheduler"])
+
+    def _reconcile_warm_start(self):
+        reconciled = super(IRTOdlClient, self)._reconcile_warm_start()
+        self._tas_mounts_deferred = False
+        try:
             self._tas_handler._on_build_nodes()
-        return topology_change_detected
+        except Exception:
+            logging.exception("could not mount the switches' TAS configuration after a warm start")
+        release = Timer(self._warm_start_grace, self._release_warm_start_state)
+        release.daemon = True
+        release.start()
+        return reconciled
+
+    def _release_warm_start_state(self):
+        with self._reservation_lock:
+            self._scheduler.release_warm_start_state()
 
     @property
     def schedule(self):
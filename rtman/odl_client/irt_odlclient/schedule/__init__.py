@@ -9,6 +9,7 @@ import logging
 from odl_client.irt_odlclient.schedule.node_wrapper import SwitchConnectorWrapper, SwitchWrapper
 from odl_client.reserving_odlclient.stream import MultiStream, PartialStream
 from odl_client.irt_odlclient.schedule.node_wrapper import Topology
+from odl_client.irt_odlclient.schedule.shortest_paths import PathCandidates, RoutingCache, shortest_switch_paths
 
 
 #fixme: convert schedule to scheduler, and create a different schedule class held by the scheduler.........
@@ -236,7 +237,7 @@ class Configuration(object):
     Used for combining these two for handovers between classes
     """
 
-    __slots__ = ("_flows", "_tas_entries", "_scheduler", "_cycle_length", "_timeslot_length_nanoseconds")
+    __slots__ = ("_flows", "_tas_entries", "_scheduler", "_schedule", "_cycle_length", "_timeslot_length_nanoseconds")
 
     def __init__(self, scheduler, flows, tas_entries, cycle_length, timeslot_length_nanoseconds):
         """
@@ -247,6 +248,7 @@ class Configuration(object):
         :param timeslot_length_nanoseconds: timeslot length in nanoseconds
         """
         self._scheduler = scheduler
+        self._schedule = scheduler.schedule  # the scheduler replaces its schedule, so this one stays consistent
         self._flows = flows
         self._tas_entries = {}
         self._cycle_length = cycle_length
@@ -269,6 +271,14 @@ class Configuration(object):
     def flows(self):
         return self._flows
 
+    @property
+    def schedule(self):
+        """
+        :return: the schedule this configuration was generated from
+        :rtype: Schedule
+        """
+        return self._schedule
+
     @property
     def timeslot_length_nanoseconds(self):
         return self._timeslot_length_nanoseconds
@@ -295,7 +305,7 @@ class Configuration(object):
                     # find slots where the gate is changed
                     change_slots = {}
                     for o, c in tas_entry.gate_open_intervals:
-                        transmissionpoints = self._scheduler.schedule.transmission_points_by_switch_connector[
+                        transmissionpoints = self._schedule.transmission_points_by_switch_connector[
                             connector_id]
                         for i in range(o, c):
                             for t in transmissionpoints:
@@ -329,12 +339,30 @@ class Scheduler(object):
     TOPOLOGY_CLS = Topology
     SCHEDULE_CLS = Schedule
 
+    # number of processes that search the paths of a batch of new multistreams in parallel, see
+    # _in_path_search_order. 0 searches them one after another.
+    PATH_SEARCH_PROCESSES = 0
+    # smaller batches are searched one after another, as starting the processes takes longer
+    PATH_SEARCH_MIN_BATCH = 32
+    # multistreams whose paths are searched at once; twice PATH_SEARCH_PROCESSES if None. Larger waves need fewer
+    # rounds, but more of their candidates become invalid and are searched again.
+    PATH_SEARCH_WAVE_SIZE = None
+    # see PathCandidates: 0 keeps the paths of the serial search, higher values use more of the parallel results
+    PATH_SEARCH_MAX_EXTRA_COST = 0
+    # keep shortest path trees of source switches (shortest_paths.RoutingCache) until the topology changes, or the
+    # load of one of their links changes by ROUTING_CACHE_LOAD_THRESHOLD multistreams
+    ROUTING_CACHE = False
+    ROUTING_CACHE_LOAD_THRESHOLD = 1
+
     __slots__ = (
         "_odl_client",
         "_topology",
 
         "_schedule",
-        "_configuration"
+        "_configuration",
+
+        "_path_candidates",  # type: PathCandidates  # of the current or last batch, see _in_path_search_order
+        "_routing_cache"  # type: RoutingCache
     )
 
     def __init__(self, odl_client):
@@ -343,23 +371,65 @@ class Scheduler(object):
         :param IRTOdlClient odl_client:
         """
         self._odl_client = odl_client
+        self._topology = None
         self._schedule = self.SCHEDULE_CLS(self)
         self._configuration = Configuration(self, set(), set(), 1, 1)
+        self._path_candidates = None
+        self._routing_cache = None
 
     def init_nodestructure(self):
         """
-        called whenever odl_client._build_nodes is executed, and new switches or connectors were found.
-        Allows the scheduler to react to this event.
+        create the topology wrappers from the odl client's topology model.
         :return:
         """
         self._topology = self.TOPOLOGY_CLS(self._odl_client)
 
+    def update_nodestructure(self, node_ids=None):
+        """
+        called whenever the odl client's topology model has changed, and new switches or connectors were found.
+        Allows the scheduler to react to this event.
+        The wrappers of the changed nodes are updated; all others, including their reservations, are kept.
+        Called with the reservation lock of the odl client held, as the wrappers are modified in place.
+        :param iterable[str] node_ids: changed nodes; all nodes if None
+        :return:
+        """
+        if self._topology is None:
+            self.init_nodestructure()
+        else:
+            self._topology.update(node_ids)
+
+    def warm_start_state(self):
+        """
+        state of the scheduler that is persisted for a warm start of the odl client.
+        Streams themselves are not persisted: after a restart, they are joined again by their talkers and listeners.
+        The state may help to schedule them as before, so that their flows do not change.
+        :return: json serializable state; None if there is nothing to persist
+        :rtype: dict|None
+        """
+        return None
+
+    def restore_warm_start_state(self, state):
+        """
+        called after a warm start, once the topology wrappers have been built from the restored topology model.
+        :param dict state: as returned by warm_start_state before the restart
+        :return:
+        """
+        pass
+
+    def release_warm_start_state(self):
+        """
+        called some time after a warm start. Restored state of streams that have not joined again is no longer
+        needed and should be released.
+        :return:
+        """
+        pass
+
     @property
     def partialstreams(self):
         """
 
-        :return:
-        :rtype: Set[PartialStream]
+        :return: immutable snapshot of the reserved partialstreams
+        :rtype: frozenset[PartialStream]
         """
         return self._odl_client.partialstreams
 
@@ -367,19 +437,100 @@ class Scheduler(object):
     def multistreams(self):
         """
 
-        :return:
-        :rtype: Set[MultiStreamStream]
+        :return: immutable snapshot of the reserved multistreams
+        :rtype: frozenset[MultiStream]
         """
         return self._odl_client.multistreams
 
+    def _switch_search(self, partialstreams, existing_paths):
+        """
+        :param Set[PartialStream] partialstreams: new partialstreams of a multistream
+        :param Iterable[List[NodeWrapper]] existing_paths: existing paths of the multistream
+        :return: source switch, destination switches and existing paths to search, see shortest_switch_paths; None if
+                 the switches can't be found
+        :rtype: (SwitchWrapper, set[SwitchWrapper], Iterable[List[NodeWrapper]])|None
+        """
+        topology = self._topology
+        try:
+            source_switch = topology.get_host(next(iter(partialstreams)).sender.node_id).connector.target.parent
+            destination_switches = {topology.get_host(partialstream.receiver.node_id).connector.target.parent
+                                    for partialstream in partialstreams}
+        except (StopIteration, KeyError, AttributeError):
+            return None  # left to the serial search, which reports the problem
+        return source_switch, destination_switches, existing_paths
+
+    def _in_path_search_order(self, searches):
+        """
+        the new multistreams of a batch, in the order they are to be scheduled. Schedule each of them before taking
+        the next one, as their paths depend on the links loaded by the multistreams before.
+        Without parallel path search (PATH_SEARCH_PROCESSES, PATH_SEARCH_MIN_BATCH), this is the given order.
+        Otherwise, the paths are searched in waves of PATH_SEARCH_WAVE_SIZE multistreams (see PathCandidates): the
+        multistreams of a wave are taken in order while their candidates are valid; the first one always is. The
+        others are deferred to the next wave, ahead of the multistreams that have not been searched yet.
+        path searches of shortest_paths.shortest_switch_paths use the candidates if passed
+        candidates=self._path_candidates.
+        :param list[(MultiStream, Set[PartialStream], Iterable[List[NodeWrapper]])] searches: each multistream, its
+            new partialstreams and its existing paths
+        :rtype: Iterator[(MultiStream, Set[PartialStream], Iterable[List[NodeWrapper]])]
+        """
+        self._path_candidates = None
+        if not self.PATH_SEARCH_PROCESSES or len(searches) < self.PATH_SEARCH_MIN_BATCH:
+            for search in searches:
+                yield search
+            return
+        candidates = self._path_candidates = PathCandidates(self._topology, self.PATH_SEARCH_PROCESSES,
+                                                            self.PATH_SEARCH_MAX_EXTRA_COST)
+        wave_size = self.PATH_SEARCH_WAVE_SIZE or 2 * self.PATH_SEARCH_PROCESSES
+        try:
+            remaining = list(searches)
+            while remaining:
+                wave, remaining = remaining[:wave_size], remaining[wave_size:]
+                switch_searches = [self._switch_search(partialstreams, existing_paths)
+                                   for _, partialstreams, existing_paths in wave]
+                candidates.search([switch_search for switch_search in switch_searches if switch_search is not None])
+                deferred = []
+                for i, (search, switch_search) in enumerate(zip(wave, switch_searches)):
+                    if i == 0 or switch_search is None or candidates.valid(*switch_search):
+                        yield search
+                    else:
+                        deferred.append(search)
+                remaining = deferred + remaining
+        finally:
+            candidates.close()
+
+    def _shortest_switch_paths(self, source_switch, destination_switches, existing_paths=()):
+        """
+        least used paths from a switch to other switches, see shortest_paths.shortest_switch_paths.
+        Uses the paths searched by _in_path_search_order, and the routing cache if enabled (ROUTING_CACHE).
+        :param SwitchWrapper source_switch: switch to start at
+        :param iterable[SwitchWrapper] destination_switches: switches to find paths to
+        :param Iterable[List[NodeWrapper]] existing_paths: host-to-host paths whose links are re-used
+        :rtype: dict[SwitchWrapper, list[SwitchWrapper]]
+        """
+        routing_cache = self._routing_cache
+        if self.ROUTING_CACHE and (routing_cache is None or routing_cache.topology is not self._topology):
+            if routing_cache is not None:
+                routing_cache.close()
+            routing_cache = self._routing_cache = RoutingCache(self._topology, self.ROUTING_CACHE_LOAD_THRESHOLD)
+        return shortest_switch_paths(self._topology, source_switch, destination_switches, existing_paths,
+                                     self._path_candidates, routing_cache)
+
+    @property
+    def routing_cache_statistics(self):
+        """
+        :return: hits and misses of the routing cache; None if it is not enabled (ROUTING_CACHE) or not used yet
+        :rtype: RoutingCacheStatistics|None
+        """
+        return self._routing_cache.statistics if self._routing_cache is not None else None
+
     def partialstreams_of_multistream(self, multistream):
         """
-        registered partialstreams of the given multisteram
-        :param multistream:
-        :return:
-        :rtype: Set[PartialStream]
+        registered partialstreams of the given multisteram, from the index of the ODL client
+        :param MultiStream multistream:
+        :return: immutable set, empty if the multistream is not registered
+        :rtype: frozenset[PartialStream]
         """
-        return set(p for p in self.partialstreams if p.parent==multistream)
+        return self._odl_client.partialstreams_of_multistream(multistream)
 
     def _generate_new_schedule(self):
         """
@@ -0,0 +1,156 @@
+"""
+Integer-indexed graph of a scheduler topology.
+
+The wrappers of a Topology (node_wrapper) are convenient to work with, but each access of their connectors or
+switches copies a set, and each step from a connector to its neighbor is a chain of attribute lookups. A GraphCore
+holds the same graph in flat arrays, so that algorithms like path searches can run on plain ints:
+
+ * every node wrapper and every connector wrapper has an index (NodeWrapper.index, NodeConnectorWrapper.index),
+   which stays the same as long as the wrapper is part of the topology. Indexes of removed wrappers are reused.
+ * the adjacency is stored in compressed sparse row (CSR) form: the edges of node n are the edges
+   offsets[n] .. offsets[n+1]-1; edge e leaves through connector edge_connectors[e] to node edge_targets[e].
+   The edges of a node are ordered by port number (node.connector_order), so of parallel links, the connector with
+   the lowest port number comes first, as in ODLNode.get_neighbor_connector.
+ * per-connector attributes are arrays indexed by connector index.
+
+A GraphCore never changes. Topology.graph builds a new one after the topology has changed.
+"""
+from array import array
+
+from odl_client.base_odlclient.node import connector_order
+
+
+class GraphCore(object):
+    """
+    Immutable CSR adjacency of a topology's nodes and connectors.
+    """
+    __slots__ = ("_version", "_offsets", "_edge_targets", "_edge_connectors", "_switch_flags",
+                 "_connector_nodes", "_connector_targets")
+
+    def __init__(self, version, node_wrappers, connector_wrappers):
+        """
+
+        :param int version: version of the topology the graph is built from, see Topology.version
+        :param list[NodeWrapper|None] node_wrappers: node wrappers by index; None for unused indexes
+        :param list[NodeConnectorWrapper|None] connector_wrappers: connector wrappers by index; None for unused
+                                                                  indexes
+        """
+        self._version = version
+
+        self._connector_nodes = array("i", [-1]) * len(connector_wrappers)
+        self._connector_targets = array("i", [-1]) * len(connector_wrappers)
+        for connector in connector_wrappers:
+            if connector is not None:
+                self._connector_nodes[connector.index] = connector.parent.index
+                if connector.target is not None:
+                    self._connector_targets[connector.index] = connector.target.index
+
+        self._offsets = array("i", [0])
+        self._edge_targets = array("i")
+        self._edge_connectors = array("i")
+        self._switch_flags = bytearray(len(node_wrappers))
+        for node in node_wrappers:
+            if node is not None:
+                self._switch_flags[node.index] = node.is_switch
+                for connector in sorted(node._connectors.values(), key=lambda c: connector_order(c.connector_id)):
+                    target = connector.target
+                    if target is not None:  # local loopback interface doesn't have a target
+                        self._edge_targets.append(target.parent.index)
+                        self._edge_connectors.append(connector.index)
+            self._offsets.append(len(self._edge_targets))
+
+    def __repr__(self):
+        return "GraphCore[version %d, %d nodes, %d edges]" % (self._version, self.node_count, self.edge_count)
+
+    def __getstate__(self):
+        # plain arrays only, e.g. to hand the graph to other processes (see shortest_paths.PathCandidates)
+        return tuple(getattr(self, attribute) for attribute in self.__slots__)
+
+    def __setstate__(self, state):
+        for attribute, value in zip(self.__slots__, state):
+            setattr(self, attribute, value)
+
+    @property
+    def version(self):
+        """
+        :return: version of the topology this graph has been built from
+        :rtype: int
+        """
+        return self._version
+
+    @property
+    def node_count(self):
+        """
+        :return: size of the node index space, including unused indexes
+        :rtype: int
+        """
+        return len(self._offsets) - 1
+
+    @property
+    def connector_count(self):
+        """
+        :return: size of the connector index space, including unused indexes
+        :rtype: int
+        """
+        return len(self._connector_nodes)
+
+    @property
+    def edge_count(self):
+        return len(self._edge_targets)
+
+    @property
+    def offsets(self):
+        """
+        :return: the edges of node n are offsets[n] .. offsets[n+1]-1
+        :rtype: array
+        """
+        return self._offsets
+
+    @property
+    def edge_targets(self):
+        """
+        :return: index of the node each edge leads to
+        :rtype: array
+        """
+        return self._edge_targets
+
+    @property
+    def edge_connectors(self):
+        """
+        :return: index of the connector each edge leaves through
+        :rtype: array
+        """
+        return self._edge_connectors
+
+    @property
+    def switch_flags(self):
+        """
+        :return: 1 for nodes that are switches, 0 for hosts and unused indexes
+        :rtype: bytearray
+        """
+        return self._switch_flags
+
+    @property
+    def connector_nodes(self):
+        """
+        :return: index of the node of each connector; -1 for unused indexes
+        :rtype: array
+        """
+        return self._connector_nodes
+
+    @property
+    def connector_targets(self):
+        """
+        :return: index of the connector each connector is connected to; -1 if it is not connected
+        :rtype: array
+        """
+        return self._connector_targets
+
+    def edges(self, node):
+        """
+        :param int node: node index
+        :return: (connector index, neighbor node index) of all edges of the node
+        :rtype: list[(int, int)]
+        """
+        start, end = self._offsets[node], self._offsets[node + 1]
+        return list(zip(self._edge_connectors[start:end], self._edge_targets[start:end]))
@@ -1,5 +1,6 @@
-from odl_client.base_odlclient.node import ODLNode, Switch, Host
+from odl_client.base_odlclient.node import ODLNode, Switch, Host, NotANeighborException, connector_order
 from odl_client.irt_odlclient.node import CapacityBasedHostConnector
+from odl_client.irt_odlclient.schedule.graph_core import GraphCore
 
 """
 A set of objects that behave like their actual representations in odl_client,
@@ -31,10 +32,12 @@ class Queue(object):
 
 class NodeWrapper(object):
 
-    __slots__ = ("_node", "_connectors", "_topology")
+    __slots__ = ("_node", "_connectors", "_connector_set", "_topology", "_index")
 
     CONNECTORWRAPPER_CLS = None
 
+    is_switch = False
+
     def __init__(self, node, topology):
         """
 
@@ -42,17 +45,52 @@ class NodeWrapper(object):
         """
         self._node = node
         self._topology = topology
+        self._index = None  # assigned by the topology
         self._connectors = {}
         for connector in node.list_connectors():
             self._connectors[connector.connector_id] = self.CONNECTORWRAPPER_CLS(connector, self)
+        self._connector_set = frozenset(self._connectors.values())
+
+    def _update_connectors(self):
+        """
+        add wrappers for new connectors of the node, and remove those of connectors that no longer exist.
+        wrappers of all other connectors are kept.
+        :return: removed and added connector wrappers
+        :rtype: (list[NodeConnectorWrapper], list[NodeConnectorWrapper])
+        """
+        current = {connector.connector_id: connector for connector in self._node.list_connectors()}
+        removed = [wrapper for connector_id, wrapper in self._connectors.items()
+                   if current.get(connector_id) is not wrapper._node_connector]
+        for wrapper in removed:
+            del self._connectors[wrapper.connector_id]
+        added = []
+        for connector_id, connector in current.items():
+            if connector_id not in self._connectors:
+                self._connectors[connector_id] = self.CONNECTORWRAPPER_CLS(connector, self)
+                added.append(self._connectors[connector_id])
+        if removed or added:
+            self._connector_set = frozenset(self._connectors.values())
+        return removed, added
 
     @property
     def node_id(self):
         return self._node.node_id
 
+    @property
+    def index(self):
+        """
+        :return: index of this node in the topology's GraphCore
+        :rtype: int
+        """
+        return self._index
+
     @property
     def connectors(self):
-        return set(self._connectors.values())
+        """
+        :return: wrappers of all connectors of this node; not copied on access
+        :rtype: frozenset[NodeConnectorWrapper]
+        """
+        return self._connector_set
 
     @property
     def topology(self):
@@ -64,21 +102,44 @@ class NodeWrapper(object):
         :param neighbor:
         :return:
         :rtype: NodeConnectorWrapper
+        :raises: NotANeighborException
         """
-        return self._topology.get_node_connector(self._node.get_neighbor_connector(neighbor._node).connector_id)
+        try:
+            connector = self._topology.get_node_connector(
+                self._node.get_neighbor_connector(neighbor._node).connector_id)
+            if connector.target is not None and connector.target.parent is neighbor:
+                return connector
+        except (NotANeighborException, KeyError):
+            pass
+        # the node model has changed since the wrappers were last updated; stay with the wrappers' connections
+        connectors = [connector for connector in self._connectors.values()
+                      if connector.target is not None and connector.target.parent is neighbor]
+        if not connectors:
+            raise NotANeighborException
+        return min(connectors, key=lambda connector: connector_order(connector.connector_id))
 
 class NodeConnectorWrapper(object):
 
-    __slots__ = ("_node_connector", "_parent", "_target")
+    __slots__ = ("_node_connector", "_parent", "_target", "_index")
 
     def __init__(self, node_connector, parent):
         self._parent = parent
         self._node_connector = node_connector  # type: CapacityBasedHostConnector
+        self._target = None
+        self._index = None  # assigned by the topology
 
     @property
     def connector_id(self):
         return self._node_connector.connector_id
 
+    @property
+    def index(self):
+        """
+        :return: index of this connector in the topology's GraphCore
+        :rtype: int
+        """
+        return self._index
+
     @property
     def parent(self):
         """
@@ -102,24 +163,51 @@ class SwitchConnectorWrapper(NodeConnectorWrapper):
 
     QUEUE_CLS = Queue
 
-    __slots__ = ("_queues", "_irt_queues")
+    __slots__ = ("_queues", "_irt_queues", "_queue_set", "_irt_queue_set")
 
     def __init__(self, switch_connector, parent):
         super(SwitchConnectorWrapper, self).__init__(switch_connector, parent)
         self._queues = {queue_id: self.QUEUE_CLS(queue_id, self) for queue_id in switch_connector.queues}
         self._irt_queues = {queue_id: self._queues[queue_id] for queue_id in switch_connector.irt_queues}
+        self._queue_set = frozenset(self._queues.values())
+        self._irt_queue_set = frozenset(self._irt_queues.values())
 
     @property
     def queues(self):
-        return set(self._queues.values())
+        """
+        :rtype: frozenset[Queue]
+        """
+        return self._queue_set
 
     @property
     def irt_queues(self):
-        return set(self._irt_queues.values())
+        """
+        :rtype: frozenset[Queue]
+        """
+        return self._irt_queue_set
 
     def get_queue(self, queue_id):
         return self._queues[queue_id]
 
+    @property
+    def multistream_count(self):
+        """
+        number of multistreams transmitted through this connector, used as routing cost (see shortest_paths).
+        Subclasses that keep track of multistreams (property multistreams) may override this with a cheaper count.
+        :rtype: int
+        """
+        return len(self.multistreams)
+
+    def _load_changed(self, old_load):
+        """
+        tell the topology if the number of multistreams has changed, see Topology.load_changed
+        :param int old_load: multistream_count before a change
+        :return:
+        """
+        new_load = self.multistream_count
+        if new_load != old_load:
+            self.topology.load_changed(self, old_load, new_load)
+
 
 
 class SwitchWrapper(NodeWrapper):
@@ -128,6 +216,8 @@ class SwitchWrapper(NodeWrapper):
 
     __slots__ = ()
 
+    is_switch = True
+
     def __init__(self, switch, topology):
         super(SwitchWrapper, self).__init__(switch, topology)
 
@@ -177,7 +267,14 @@ class Topology(object):
 
     __slots__ = ("_odl_client",
                  "_hosts", "_nodes", "_switches",
-                 "_node_connectors")
+                 "_node_connectors",
+
+                 "_nodes_by_index", "_free_node_indexes",
+                 "_node_connectors_by_index", "_free_node_connector_indexes",
+                 "_version", "_graph",
+                 "_views",  # type: dict(str, frozenset)  # node_connectors, switches, hosts, nodes of this version
+
+                 "_load_listeners")  # type: list(callable)  # see add_load_listener
 
     def __init__(self, odl_client):
         """
@@ -187,27 +284,102 @@ class Topology(object):
         self._odl_client = odl_client
         self._hosts = {}
         self._switches = {}
+        self._nodes = {}
         self._node_connectors = {}
-
-        # add all nodes (and their connectors)
-        for node in self._odl_client._nodes.values():
-            if isinstance(node, Switch):
-                node_wrapper = self.SWITCHWRAPPER_CLS(node, self)
-                self._switches[node.node_id] = node_wrapper
+        self._nodes_by_index = []  # type: list(NodeWrapper)
+        self._free_node_indexes = []
+        self._node_connectors_by_index = []  # type: list(NodeConnectorWrapper)
+        self._free_node_connector_indexes = []
+        self._version = 0
+        self._graph = None
+        self._views = {}
+        self._load_listeners = []
+        self.update()
+
+    @staticmethod
+    def _assign_index(wrapper, wrappers_by_index, free_indexes):
+        if free_indexes:
+            wrapper._index = free_indexes.pop()
+            wrappers_by_index[wrapper._index] = wrapper
+        else:
+            wrapper._index = len(wrappers_by_index)
+            wrappers_by_index.append(wrapper)
+
+    @staticmethod
+    def _release_index(wrapper, wrappers_by_index, free_indexes):
+        if wrapper._index is not None and wrappers_by_index[wrapper._index] is wrapper:
+            wrappers_by_index[wrapper._index] = None
+            free_indexes.append(wrapper._index)
+
+    def update(self, node_ids=None):
+        """
+        apply changes of the odl client's topology model.
+        Only the wrappers of the given nodes are updated; wrappers of connectors that still exist are kept, along
+        with any state of them (e.g. reservations), so the cost depends on the number of changed nodes.
+        :param iterable[str] node_ids: ids of added, removed or changed nodes, including both ends of changed
+                                       links; all nodes if None
+        :return:
+        """
+        nodes = self._odl_client._nodes
+        if node_ids is None:
+            node_ids = set(nodes.keys()) | set(self._nodes.keys())
+
+        reconnect = set()
+        for node_id in node_ids:
+            node = nodes.get(node_id)
+            node_wrapper = self._nodes.get(node_id)
+            if node_wrapper is not None and node_wrapper._node is not node:
+                self._remove_connector_wrappers(node_wrapper.connectors, reconnect)
+                for wrappers in (self._nodes, self._switches, self._hosts):
+                    wrappers.pop(node_id, None)
+                self._release_index(node_wrapper, self._nodes_by_index, self._free_node_indexes)
+                node_wrapper = None
+            if node is None:
+                continue
+
+            if node_wrapper is None:
+                if isinstance(node, Switch):
+                    node_wrapper = self.SWITCHWRAPPER_CLS(node, self)
+                    self._switches[node_id] = node_wrapper
+                else:
+                    node_wrapper = self.HOSTWRAPPER_CLS(node, self)
+                    self._hosts[node_id] = node_wrapper
+                self._nodes[node_id] = node_wrapper
+                self._assign_index(node_wrapper, self._nodes_by_index, self._free_node_indexes)
+                added = node_wrapper.connectors
             else:
-                node_wrapper = self.HOSTWRAPPER_CLS(node, self)
-                self._hosts[node.node_id] = node_wrapper
-            self._node_connectors.update({connector.connector_id: connector for connector in node_wrapper.connectors})
-
-        self._nodes = self._switches.copy()
-        self._nodes.update(self._hosts)
+                removed, added = node_wrapper._update_connectors()
+                self._remove_connector_wrappers(removed, reconnect)
+            for connector in added:
+                self._node_connectors[connector.connector_id] = connector
+                self._assign_index(connector, self._node_connectors_by_index, self._free_node_connector_indexes)
+            reconnect.update(node_wrapper.connectors)
 
         # connect connectors
-        for node_connector_wrapper in set(self._node_connectors.values()):
+        for node_connector_wrapper in reconnect:
+            target = node_connector_wrapper._node_connector.target
             # local loopback doesn't have a target
-            node_connector_wrapper._target = \
-                self._node_connectors[node_connector_wrapper._node_connector.target.connector_id] \
-                if node_connector_wrapper._node_connector.target else None
+            node_connector_wrapper._target = self._node_connectors.get(target.connector_id) if target else None
+
+        self._version += 1
+        self._graph = None  # built again on next access
+        self._views = {}
+
+    def _remove_connector_wrappers(self, connector_wrappers, reconnect):
+        """
+        :param iterable[NodeConnectorWrapper] connector_wrappers: wrappers of connectors that no longer exist
+        :param set[NodeConnectorWrapper] reconnect: wrappers whose target has to be updated; the wrappers that
+                                                    point to the removed ones are added
+        :return:
+        """
+        for connector_wrapper in connector_wrappers:
+            if self._node_connectors.get(connector_wrapper.connector_id) is connector_wrapper:
+                del self._node_connectors[connector_wrapper.connector_id]
+            self._release_index(connector_wrapper, self._node_connectors_by_index, self._free_node_connector_indexes)
+            target = connector_wrapper._target
+            if target is not None and target._target is connector_wrapper:
+                reconnect.add(target)
+            reconnect.discard(connector_wrapper)
 
     def get_node(self, node_id):
         return self._nodes[node_id]
@@ -221,23 +393,97 @@ class Topology(object):
     def get_node_connector(self, connector_id):
         return self._node_connectors[connector_id]
 
+    def get_node_by_index(self, index):
+        """
+        :param int index: see NodeWrapper.index
+        :rtype: NodeWrapper
+        """
+        return self._nodes_by_index[index]
+
+    def get_node_connector_by_index(self, index):
+        """
+        :param int index: see NodeConnectorWrapper.index
+        :rtype: NodeConnectorWrapper
+        """
+        return self._node_connectors_by_index[index]
+
+    @property
+    def version(self):
+        """
+        :return: number of updates of this topology; increases whenever nodes or connectors may have changed
+        :rtype: int
+        """
+        return self._version
+
+    @property
+    def graph(self):
+        """
+        integer-indexed view of this topology, see graph_core. Built on first access after each update.
+        :rtype: GraphCore
+        """
+        graph = self._graph
+        if graph is None:
+            graph = self._graph = GraphCore(self._version, self._nodes_by_index, self._node_connectors_by_index)
+        return graph
+
+    def add_load_listener(self, listener):
+        """
+        :param callable listener: called as listener(connector, old_load, new_load) whenever the number of
+                                  multistreams of a connector has changed, e.g. by shortest_paths.RoutingCache
+        :return:
+        """
+        self._load_listeners.append(listener)
+
+    def remove_load_listener(self, listener):
+        self._load_listeners.remove(listener)
+
+    def load_changed(self, connector, old_load, new_load):
+        """
+        called by connector wrappers whenever the number of multistreams they transmit has changed.
+        :param NodeConnectorWrapper connector:
+        :param int old_load: number of multistreams before the change
+        :param int new_load: number of multistreams after the change
+        :return:
+        """
+        for listener in self._load_listeners:
+            listener(connector, old_load, new_load)
+
+    def _view(self, name, wrappers):
+        """
+        :return: the wrappers as a frozenset, built once per version of this topology
+        :rtype: frozenset
+        """
+        view = self._views.get(name)
+        if view is None:
+            view = self._views[name] = frozenset(wrappers.values())
+        return view
+
     @property
     def node_connectors(self):
-        return set(self._node_connectors.values())
+        """
+        :rtype: frozenset[NodeConnectorWrapper]
+        """
+        return self._view("node_connectors", self._node_connectors)
 
     @property
     def switches(self):
         """
 
         :return:
-        :rtype: Iterable[SwitchConnectorWrapper]
+        :rtype: frozenset[SwitchWrapper]
         """
-        return set(self._switches.values())
+        return self._view("switches", self._switches)
 
     @property
     def hosts(self):
-        return set(self._hosts.values())
+        """
+        :rtype: frozenset[HostWrapper]
+        """
+        return self._view("hosts", self._hosts)
 
     @property
     def nodes(self):
-        return set(self._nodes.values())
\ No newline at end of file
+        """
+        :rtype: frozenset[NodeWrapper]
+        """
+        return self._view("nodes", self._nodes)
\ No newline at end of file
@@ -0,0 +1,508 @@
+"""
+Shortest paths between the switches of a scheduler topology.
+
+The Dijkstra based schedulers route each multistream along a shortest path tree from the sender's edge switch, where
+the cost of a link is the number of multistreams already using it (see shortest_switch_paths). The search runs on the
+topology's GraphCore with a binary heap: entries are never updated in place, a node that has been reached again on a
+shorter path is pushed again, and stale entries are skipped when popped (lazy deletion). This is O(E log V) instead of
+the O(V^2) of selecting the closest node by scanning all unvisited nodes.
+
+For large batches of new multistreams, PathCandidates searches their paths in waves in a process pool: the paths of
+several multistreams are searched at once against the current link costs, and used as long as none of their links
+has been loaded since.
+
+RoutingCache keeps the complete shortest path trees of source switches, so that multistreams of the same sender are
+routed without searching again. It listens to the load changes of the topology's connectors (see
+Topology.add_load_listener): a link that has become more expensive only affects the trees it is part of, and only the
+paths through it.
+"""
+from array import array
+from heapq import heappush, heappop
+from multiprocessing import Pool
+
+
+def shortest_path_tree(graph, source, destinations, edge_cost, reused_edges=()):
+    """
+    Dijkstra's algorithm on the switches of a graph. Hosts are never part of a path.
+    See _search_tree for the parameters.
+
+    :return: predecessor of each node index in the tree, and the connector index of the link from the predecessor;
+             -1 for the source and nodes that have not been reached, and for the nodes of reused_edges
+    :rtype: (array, array)
+    """
+    _, prev_node, prev_connector = _search_tree(graph, source, destinations, edge_cost, reused_edges)
+    return prev_node, prev_connector
+
+
+def _search_tree(graph, source, destinations, edge_cost, reused_edges=()):
+    """
+
+    :param GraphCore graph: graph to search
+    :param int source: node index of the switch to start at
+    :param iterable[int] destinations: node indexes of switches; the search stops once all of them are settled.
+                                       None builds the complete tree.
+    :param callable edge_cost: cost of leaving through a connector, given its index; must be at least 1
+    :param iterable[(int, int)] reused_edges: (node, predecessor) of links of existing paths. These nodes start with
+                                              distance 1 and keep their predecessor, so existing paths are re-used.
+    :return: distance of each node index from the source (inf if it has not been reached), and the tree as returned
+             by shortest_path_tree
+    :rtype: (list, array, array)
+    """
+    offsets, edge_targets, edge_connectors = graph.offsets, graph.edge_targets, graph.edge_connectors
+    switch_flags = graph.switch_flags
+    unreached = float("inf")
+
+    distance = [unreached] * graph.node_count
+    prev_node = array("i", [-1]) * graph.node_count
+    prev_connector = array("i", [-1]) * graph.node_count
+    visited = bytearray(graph.node_count)
+    missing_destinations = set(destinations) if destinations is not None else None
+
+    distance[source] = 0
+    heap = [(0, source)]
+    for node, predecessor in reused_edges:
+        distance[node] = 1
+        prev_node[node] = predecessor
+        heappush(heap, (1, node))
+
+    while heap:
+        distance_u, u = heappop(heap)
+        if visited[u] or distance_u > distance[u]:
+            continue  # stale entry, u has been settled or reached on a shorter path meanwhile
+        visited[u] = 1
+
+        # break once the last destination is settled; its neighbors don't matter
+        if missing_destinations is not None:
+            missing_destinations.discard(u)
+            if not missing_destinations:
+                break
+
+        for edge in range(offsets[u], offsets[u + 1]):
+            v = edge_targets[edge]
+            if visited[v] or not switch_flags[v]:
+                continue
+            distance_v = distance_u + edge_cost(edge_connectors[edge])
+            if distance_v < distance[v]:
+                distance[v] = distance_v
+                prev_node[v] = u
+                prev_connector[v] = edge_connectors[edge]
+                heappush(heap, (distance_v, v))
+
+    return distance, prev_node, prev_connector
+
+
+def _trace_paths(prev_node, prev_connector, destinations):
+    """
+    :return: for each destination, the node indexes of the path to it and the connector indexes of its links
+    :rtype: dict[int, (list[int], list[int])]
+    """
+    paths = {}
+    for destination in destinations:
+        u = destination
+        nodes, connectors = [u], []
+        while prev_node[u] != -1:
+            if prev_connector[u] != -1:
+                connectors.append(prev_connector[u])
+            u = prev_node[u]
+            nodes.append(u)
+        nodes.reverse()
+        paths[destination] = (nodes, connectors)
+    return paths
+
+
+def _reused_edges(existing_paths):
+    # the first and last node of a path are hosts; every other node follows its predecessor.
+    return tuple((b.index, a.index) for path in existing_paths for a, b in zip(path[1:-2], path[2:-1]))
+
+
+def _connector_cost(topology):
+    """
+    :return: cost of leaving through a connector, given its index
+    :rtype: callable
+    """
+    get_node_connector_by_index = topology.get_node_connector_by_index
+    return lambda connector: get_node_connector_by_index(connector).multistream_count + 1
+
+
+def shortest_switch_paths(topology, source_switch, destination_switches, existing_paths=(), candidates=None,
+                          routing_cache=None):
+    """
+    least used paths from a switch to other switches. A link costs the number of multistreams on it, plus one.
+
+    :param Topology topology: topology to search
+    :param SwitchWrapper source_switch: switch to start at
+    :param iterable[SwitchWrapper] destination_switches: switches to find paths to
+    :param Iterable[List[NodeWrapper]] existing_paths: host-to-host paths whose links are re-used
+    :param PathCandidates candidates: precomputed paths; used if they are still shortest paths
+    :param RoutingCache routing_cache: cache of shortest path trees of the topology; not used if there are
+                                       existing paths
+    :return: path of switches from source_switch to each destination switch, both included
+    :rtype: dict[SwitchWrapper, list[SwitchWrapper]]
+    """
+    destination_switches = set(destination_switches)
+    reused_edges = _reused_edges(existing_paths)
+    if candidates is not None:
+        paths = candidates.paths(source_switch, destination_switches, reused_edges)
+        if paths is not None:
+            return paths
+
+    destinations = [switch.index for switch in destination_switches]
+    if routing_cache is not None and not reused_edges:
+        paths = routing_cache.paths(source_switch, destinations)
+    else:
+        paths = _trace_paths(*shortest_path_tree(topology.graph, source_switch.index, destinations,
+                                                 _connector_cost(topology), reused_edges),
+                             destinations=destinations)
+    get_node_by_index = topology.get_node_by_index
+    return {get_node_by_index(destination): [get_node_by_index(node) for node in nodes]
+            for destination, (nodes, _) in paths.items()}
+
+
+# graph of the worker processes of PathCandidates
+_worker_graph = None
+
+
+def _init_worker(graph):
+    global _worker_graph
+    _worker_graph = graph
+
+
+def _search_worker(task):
+    costs, searches = task
+    results = []
+    for source, destinations, reused_edges in searches:
+        prev_node, prev_connector = shortest_path_tree(_worker_graph, source, destinations, costs.__getitem__,
+                                                       reused_edges)
+        results.append(_trace_paths(prev_node, prev_connector, destinations))
+    return results
+
+
+class PathCandidates(object):
+    """
+    shortest switch paths of new multistreams, searched in waves in a process pool.
+
+    The scheduler schedules the multistreams of a batch one after another, and each of them loads the links of its
+    paths. A wave (search) searches the paths of several multistreams in parallel, against the current link costs.
+    While a schedule is generated, multistreams are only added, so link costs only increase: a candidate whose links
+    all still have the cost of its wave is still a shortest path (valid). The scheduler then schedules the
+    multistreams of the wave in order, as long as their candidates are valid, and defers the others to the next wave,
+    which searches them again against the new costs (see Scheduler._in_path_search_order).
+    max_extra_cost trades the balance of the link loads for more candidates being valid.
+
+    The graph is sent to the worker processes once; each wave only sends the link costs.
+    """
+    __slots__ = ("_topology", "_processes", "_max_extra_cost", "_pool", "_version", "_costs", "_results",
+                 "_waves", "_searches", "_hits", "_misses")
+
+    def __init__(self, topology, processes, max_extra_cost=0):
+        """
+
+        :param Topology topology: topology to search
+        :param int processes: number of worker processes
+        :param int max_extra_cost: a candidate is still valid if its links have become this much more expensive in
+                                   total. 0 only uses candidates that are still shortest paths.
+        """
+        self._topology = topology
+        self._processes = processes
+        self._max_extra_cost = max_extra_cost
+        graph = topology.graph
+        self._version = graph.version
+        self._pool = Pool(processes, _init_worker, (graph,))
+        self._costs = None
+        self._results = {}
+        self._waves = 0
+        self._searches = 0
+        self._hits = 0
+        self._misses = 0
+
+    def __repr__(self):
+        return "PathCandidates[%d waves, %d searches, %d hits, %d misses]" % (self._waves, self._searches,
+                                                                            self._hits, self._misses)
+
+    def close(self):
+        """
+        stop the worker processes.
+        :return:
+        """
+        self._pool.terminate()
+
+    @property
+    def waves(self):
+        """
+        :return: number of waves searched
+        :rtype: int
+        """
+        return self._waves
+
+    @property
+    def searches(self):
+        """
+        :return: number of searches of all waves, including searches of deferred multistreams
+        :rtype: int
+        """
+        return self._searches
+
+    @property
+    def hits(self):
+        """
+        :return: number of candidates that have been used
+        :rtype: int
+        """
+        return self._hits
+
+    @property
+    def misses(self):
+        """
+        :return: number of paths requested without a valid candidate
+        :rtype: int
+        """
+        return self._misses
+
+    @staticmethod
+    def _key(source_switch, destination_switches, reused_edges):
+        return source_switch.index, tuple(sorted(switch.index for switch in destination_switches)), reused_edges
+
+    def search(self, searches):
+        """
+        search a wave of paths against the current link costs. Candidates of earlier waves are discarded.
+        :param iterable[(SwitchWrapper, iterable[SwitchWrapper], Iterable[List[NodeWrapper]])] searches:
+            source switch, destination switches and existing paths of each search, see shortest_switch_paths
+        :return:
+        """
+        topology = self._topology
+        graph = topology.graph
+        if graph.version != self._version:
+            raise ValueError("the topology has changed since the worker processes have been started")
+        cost = _connector_cost(topology)
+        costs = array("i", [1]) * graph.connector_count  # links from hosts are never part of a path
+        for index, node in enumerate(graph.connector_nodes):
+            if node != -1 and graph.switch_flags[node]:
+                costs[index] = cost(index)
+
+        keys = [self._key(source_switch, destination_switches, _reused_edges(existing_paths))
+                for source_switch, destination_switches, existing_paths in searches]
+        chunks = [keys[i::self._processes] for i in range(self._processes)]
+        results = self._pool.map(_search_worker, [(costs, chunk) for chunk in chunks if chunk])
+        self._results = {}
+        for chunk, chunk_results in zip(chunks, results):
+            self._results.update(zip(chunk, chunk_results))
+        self._costs = costs
+        self._waves += 1
+        self._searches += len(keys)
+
+    def _valid_result(self, key):
+        """
+        :return: the candidate of a search, if it is still valid
+        :rtype: dict[int, (list[int], list[int])]|None
+        """
+        result = self._results.get(key)
+        if result is None or self._topology.version != self._version:
+            return None
+        cost = _connector_cost(self._topology)
+        for _, connectors in result.values():
+            if sum(cost(connector) - self._costs[connector] for connector in connectors) > self._max_extra_cost:
+                return None
+        return result
+
+    def valid(self, source_switch, destination_switches, existing_paths=()):
+        """
+        :param SwitchWrapper source_switch:
+        :param iterable[SwitchWrapper] destination_switches:
+        :param Iterable[List[NodeWrapper]] existing_paths:
+        :return: whether the current wave has a candidate for this search whose links have not become too expensive
+        :rtype: bool
+        """
+        return self._valid_result(self._key(source_switch, destination_switches,
+                                            _reused_edges(existing_paths))) is not None
+
+    def paths(self, source_switch, destination_switches, reused_edges):
+        """
+        take the candidate of a search. Each candidate is returned at most once.
+        :param SwitchWrapper source_switch:
+        :param iterable[SwitchWrapper] destination_switches:
+        :param tuple reused_edges: see shortest_path_tree
+        :return: see shortest_switch_paths; None if there is no candidate, or its links have become too expensive
+        :rtype: dict[SwitchWrapper, list[SwitchWrapper]]|None
+        """
+        key = self._key(source_switch, destination_switches, reused_edges)
+        result = self._valid_result(key)
+        self._results.pop(key, None)
+        if result is None:
+            self._misses += 1
+            return None
+        self._hits += 1
+        get_node_by_index = self._topology.get_node_by_index
+        return {get_node_by_index(destination): [get_node_by_index(node) for node in nodes]
+                for destination, (nodes, _) in result.items()}
+
+
+class RoutingCacheStatistics(object):
+    """
+    Counters of a RoutingCache.
+    """
+    __slots__ = ("hits", "misses", "invalidations")
+
+    def __init__(self, hits=0, misses=0, invalidations=0):
+        self.hits = hits
+        self.misses = misses
+        self.invalidations = invalidations
+
+    def __repr__(self):
+        return "RoutingCacheStatistics[%d hits, %d misses, %d invalidations]" % (self.hits, self.misses,
+                                                                                 self.invalidations)
+
+    @property
+    def json(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations
+        }
+
+
+class _CachedTree(object):
+    """
+    shortest path tree of a RoutingCache
+    """
+    __slots__ = ("distance", "prev_node", "prev_connector",
+                 "loads",  # type: dict(int, int)  # load of each link of the tree when it was built, by connector
+                 "outdated")  # type: set(int)  # nodes whose link from their predecessor has become more expensive
+
+    def __init__(self, distance, prev_node, prev_connector, loads):
+        self.distance = distance
+        self.prev_node = prev_node
+        self.prev_connector = prev_connector
+        self.loads = loads
+        self.outdated = set()
+
+
+class RoutingCache(object):
+    """
+    Complete shortest path trees of source switches, for the current topology version.
+
+    The cache listens to the load changes of the topology's connectors, and only drops what a change affects:
+     * if a link of a tree has become more expensive, the paths through it are no longer used. The paths to the other
+       nodes of the tree are still the ones a new search would find, since only their alternatives have become more
+       expensive. A link that isn't part of a tree doesn't affect it at all.
+     * if a link has become cheaper, the trees in which it now leads to its target on a path that is at most as long
+       as the cached one are dropped.
+    With a load threshold of 1, cached paths are always the paths a new search would find. Higher thresholds only
+    react once the load of a link has changed by that many multistreams since a tree has been built, and route with
+    slightly outdated loads.
+    A tree is built completely, without stopping at the destinations of the search that builds it, so it is more
+    expensive than a single search; the cache pays off if several multistreams of a sender are routed in between
+    changes of its tree.
+    """
+    __slots__ = ("_topology", "_load_threshold", "_trees", "_trees_by_connector", "_version", "_statistics")
+
+    def __init__(self, topology, load_threshold=1):
+        """
+
+        :param Topology topology: topology to route in
+        :param int load_threshold: number of multistreams by which the load of a link has to change to affect the
+                                   cached trees
+        """
+        self._topology = topology
+        self._load_threshold = load_threshold
+        self._trees = {}  # type: dict(int, _CachedTree)  # by node index of the source switch
+        self._trees_by_connector = {}  # type: dict(int, set(int))  # source switches of the trees a link is part of
+        self._version = topology.version
+        self._statistics = RoutingCacheStatistics()
+        topology.add_load_listener(self._load_changed)
+
+    def __repr__(self):
+        return "RoutingCache[%d trees]" % len(self._trees)
+
+    def close(self):
+        """
+        stop listening to the topology's load changes
+        :return:
+        """
+        self._topology.remove_load_listener(self._load_changed)
+        self._trees = {}
+        self._trees_by_connector = {}
+
+    @property
+    def topology(self):
+        return self._topology
+
+    @property
+    def statistics(self):
+        """
+        :return: copy of the current counters
+        :rtype: RoutingCacheStatistics
+        """
+        s = self._statistics
+        return RoutingCacheStatistics(hits=s.hits, misses=s.misses, invalidations=s.invalidations)
+
+    def paths(self, source_switch, destinations):
+        """
+        :param SwitchWrapper source_switch:
+        :param list[int] destinations: node indexes of switches
+        :return: shortest paths to the destinations, see _trace_paths
+        :rtype: dict[int, (list[int], list[int])]
+        """
+        topology = self._topology
+        if topology.version != self._version:
+            if self._trees:
+                self._statistics.invalidations += len(self._trees)
+            self._trees = {}
+            self._trees_by_connector = {}
+            self._version = topology.version
+
+        source = source_switch.index
+        tree = self._trees.get(source)
+        if tree is not None:
+            paths = _trace_paths(tree.prev_node, tree.prev_connector, destinations)
+            outdated = tree.outdated
+            if not outdated or not any(node in outdated for nodes, _ in paths.values() for node in nodes):
+                self._statistics.hits += 1
+                return paths
+            self._drop(source)
+
+        self._statistics.misses += 1
+        get_node_connector_by_index = topology.get_node_connector_by_index
+        distance, prev_node, prev_connector = _search_tree(topology.graph, source, None, _connector_cost(topology))
+        loads = {connector: get_node_connector_by_index(connector).multistream_count
+                 for connector in prev_connector if connector != -1}
+        self._trees[source] = _CachedTree(distance, prev_node, prev_connector, loads)
+        for connector in loads:
+            self._trees_by_connector.setdefault(connector, set()).add(source)
+        return _trace_paths(prev_node, prev_connector, destinations)
+
+    def _drop(self, source):
+        tree = self._trees.pop(source)
+        for connector in tree.loads:
+            sources = self._trees_by_connector[connector]
+            sources.discard(source)
+            if not sources:
+                del self._trees_by_connector[connector]
+        self._statistics.invalidations += 1
+
+    def _load_changed(self, connector, old_load, new_load):
+        """
+        load listener of the topology, see Topology.add_load_listener
+        """
+        graph = self._topology.graph
+        if not self._trees or graph.version != self._version:
+            return  # the trees are dropped with the next search anyway
+        index = connector.index
+        target = graph.connector_targets[index]
+        if target == -1:
+            return
+        u, v = graph.connector_nodes[index], graph.connector_nodes[target]
+        if not graph.switch_flags[v]:
+            return  # links to hosts are not part of any path
+
+        if new_load > old_load:
+            for source in self._trees_by_connector.get(index, ()):
+                tree = self._trees[source]
+                if new_load - tree.loads[index] >= self._load_threshold:
+                    tree.outdated.add(v)
+        else:
+            # cost new_load + 1, less what is tolerated by the threshold. Ties count as well: a new search may reach v
+            # through the cheaper link first.
+            new_cost = new_load + 1 + (self._load_threshold - 1)
+            for source in [source for source, tree in self._trees.items()
+                           if tree.distance[u] + new_cost <= tree.distance[v]]:
+                self._drop(source)
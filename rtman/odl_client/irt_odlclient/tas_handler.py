@@ -1,5 +1,7 @@
 import logging
 
+from misc.worker_pool import gather
+
 #  from odl_client.irt_odlclient.odlclient import IRTOdlClient
 
 
@@ -131,12 +133,14 @@ class NETCONF_TASHandler(TASHandler):
         self._netconf_nodes[node_id].umount_on_odl()
 
     def _on_build_nodes(self):
-        for node_id in self._netconf_nodes.keys():
+        for node_id in list(self._netconf_nodes.keys()):
             if node_id not in self._odl_client._switches:
                 self._netconf_umount(node_id)
-        for node_id in self._odl_client._switches.keys():
-            if node_id not in self._netconf_nodes:
-                self._netconf_mount(node_id)
+        # switches are mounted in parallel, one request per pooled connection
+        gather(
+            self._odl_client._request_workers.submit(self._netconf_mount, node_id)
+            for node_id in list(self._odl_client._switches.keys()) if node_id not in self._netconf_nodes
+        ).result()
 
     @property
     def odl_client(self):
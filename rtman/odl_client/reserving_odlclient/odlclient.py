@@ -72,12 +72,21 @@ class ReservingODLClient(ODLClient):
      - _before_deploy_flows can be used to modify the flowset outside of the reservations (e.g., add static rules, etc)
 
     The client's reserving functions are locked so that only one thread at a time may be running them.
+
+    The reserved partialstreams are also indexed by their multistream. partialstreams, multistreams and
+    partialstreams_of_multistream return immutable snapshots, which are only rebuilt after the reservations have
+    changed, so that schedulers can read them as often as they like. set_partialstreams rebuilds them right away;
+    after add_partialstream or remove_partialstream, they are rebuilt on the next access.
     """
-    __slots__ = ("_partial_streams", "_reservation_lock")
+    __slots__ = ("_partial_streams", "_partialstreams_by_multistream", "_partialstreams_snapshot",
+                 "_multistreams_snapshot", "_reservation_lock")
 
     def __init__(self, *args, **kwargs):
         super(ReservingODLClient, self).__init__(*args, **kwargs)
         self._partial_streams = set()
+        self._partialstreams_by_multistream = {}  # type: dict[MultiStream, frozenset[PartialStream]]
+        self._partialstreams_snapshot = frozenset()
+        self._multistreams_snapshot = frozenset()
         self._reservation_lock = RLock()
 
     def _on_partialstream_add(self, stream):
@@ -130,6 +139,7 @@ class ReservingODLClient(ODLClient):
             assert stream not in self._partial_streams
             self._on_partialstream_add(stream)
             self._partial_streams.add(stream)
+            self._index_partialstream(stream)
 
     def remove_partialstream(self, stream):
         """
@@ -142,6 +152,7 @@ class ReservingODLClient(ODLClient):
             assert stream in self._partial_streams
             self._on_partialstream_remove(stream)
             self._partial_streams.remove(stream)
+            self._unindex_partialstream(stream)
 
     def set_partialstreams(self, partialstreams):
         """
@@ -158,7 +169,41 @@ class ReservingODLClient(ODLClient):
             for stream in old_partialstreams:
                 self._on_partialstream_remove(stream)
 
-            self._partial_streams = partialstreams
+            self._partial_streams = set(partialstreams)
+            for stream in old_partialstreams:
+                self._unindex_partialstream(stream)
+            for stream in new_partialstreams:
+                self._index_partialstream(stream)
+            self._partialstreams_snapshot = frozenset(self._partial_streams)
+            self._multistreams_snapshot = frozenset(self._partialstreams_by_multistream)
+
+    def _index_partialstream(self, stream):
+        """
+        add a newly reserved partialstream to the multistream index, and invalidate the snapshots.
+        :param PartialStream stream:
+        :return:
+        """
+        siblings = self._partialstreams_by_multistream.get(stream.parent)
+        if siblings is None:
+            self._partialstreams_by_multistream[stream.parent] = frozenset((stream,))
+            self._multistreams_snapshot = None
+        else:
+            self._partialstreams_by_multistream[stream.parent] = siblings.union((stream,))
+        self._partialstreams_snapshot = None
+
+    def _unindex_partialstream(self, stream):
+        """
+        remove a no longer reserved partialstream from the multistream index, and invalidate the snapshots.
+        :param PartialStream stream:
+        :return:
+        """
+        siblings = self._partialstreams_by_multistream[stream.parent].difference((stream,))
+        if siblings:
+            self._partialstreams_by_multistream[stream.parent] = siblings
+        else:
+            del self._partialstreams_by_multistream[stream.parent]
+            self._multistreams_snapshot = None
+        self._partialstreams_snapshot = None
 
     def update_and_deploy_schedule(self, flow_priority=1000):
         """
@@ -218,28 +263,50 @@ class ReservingODLClient(ODLClient):
     def flows(self):
         """
 
-        :return: all flows this ODLClient has deployed to ODL
-        :rtype: set[FlowTableEntry]
+        :return: all flows this ODLClient has deployed to ODL. Immutable snapshot, never blocks on a deployment.
+        :rtype: frozenset[FlowTableEntry]
         """
-        return set(self._flows)
+        return self._flows
 
     @property
     def partialstreams(self):
         """
 
-        :return: set of currently reserved partial streams
-        :rtype: set[PartialStream]
+        :return: set of currently reserved partial streams. Immutable snapshot, not copied unless the reservations
+                 have changed since the last call.
+        :rtype: frozenset[PartialStream]
         """
-        return set(self._partial_streams)
+        snapshot = self._partialstreams_snapshot
+        if snapshot is None:
+            with self._reservation_lock:  # so that no newer reservation can be overwritten with an outdated snapshot
+                snapshot = self._partialstreams_snapshot
+                if snapshot is None:
+                    snapshot = self._partialstreams_snapshot = frozenset(self._partial_streams)
+        return snapshot
 
     @property
     def multistreams(self):
         """
 
         :return: set of currently reserved multicast streams (i.e., set of parents of self.partialstreams)
-        :rtype: set[MultiStream]
+        :rtype: frozenset[MultiStream]
+        """
+        snapshot = self._multistreams_snapshot
+        if snapshot is None:
+            with self._reservation_lock:
+                snapshot = self._multistreams_snapshot
+                if snapshot is None:
+                    snapshot = self._multistreams_snapshot = frozenset(self._partialstreams_by_multistream)
+        return snapshot
+
+    def partialstreams_of_multistream(self, multistream):
+        """
+
+        :param MultiStream multistream:
+        :return: currently reserved partial streams of the given multistream, empty if it is not reserved
+        :rtype: frozenset[PartialStream]
         """
-        return set(s.parent for s in self._partial_streams)
+        return self._partialstreams_by_multistream.get(multistream, frozenset())
 
     def _on_topology_change(self):
         super(ReservingODLClient, self)._on_topology_change()
@@ -0,0 +1,478 @@
+"""
+Network state of the ODL emulator.
+
+EmulatedNetwork holds what OpenDaylight would know about a mininet network: switches with their ports, hosts,
+links, the flows configured on each switch, and the NETCONF nodes mounted in topology-netconf.
+It renders this state in the JSON format of ODL's RESTconf interface (Bierman02), as read by ODLClient.
+Like ODL, the operational inventory lists all flow tables of a switch and includes port, table and flow
+statistics, so that payload sizes are realistic.
+
+Networks are described like the topology section of mininet/topology.json:
+  hosts: dict of host names -to- mac addresses
+  switches: list of switch names; the datapath id is the number in the name (e.g., s13 -> openflow:13)
+  links: pairs of host/switch names
+Ports are numbered per switch in order of the links, like mininet does.
+"""
+import json
+import re
+import time
+from threading import RLock
+
+# json paths of the data change notifications
+TOPOLOGY_PATH = "/network-topology:network-topology/topology[topology-id='flow:1']"
+INVENTORY_PATH = "/opendaylight-inventory:nodes"
+
+# OpenFlow switches report 254 flow tables, all of which are part of ODL's operational inventory
+NUM_FLOW_TABLES = 254
+
+
+class EmulatorError(Exception):
+    """
+    raised when a request can not be applied to the emulated network.
+    translated to a RESTconf error by the server.
+    """
+    def __init__(self, status_code, error_tag, message):
+        super(EmulatorError, self).__init__(message)
+        self.status_code = status_code
+        self.error_tag = error_tag
+        self.message = message
+
+    @property
+    def json(self):
+        return {"errors": {"error": [{
+            "error-type": "application",
+            "error-tag": self.error_tag,
+            "error-message": self.message
+        }]}}
+
+
+def load_mininet_topology(config_file):
+    """
+    read the topology section of a mininet configuration, e.g. mininet/topology.json
+    :param str config_file: path of the configuration file
+    :return: topology description
+    :rtype: dict
+    """
+    with open(config_file, "r") as f:
+        return json.loads(f.read())["topology"]
+
+
+def _host_mac(index):
+    return "02:00:%02x:%02x:%02x:%02x" % ((index >> 24) & 0xff, (index >> 16) & 0xff, (index >> 8) & 0xff, index & 0xff)
+
+
+def ring_topology(num_switches, num_hosts):
+    """
+    generate a topology description: switches in a ring, hosts distributed evenly over the switches.
+    :param int num_switches:
+    :param int num_hosts:
+    :rtype: dict
+    """
+    switches = ["s%d" % (i + 1) for i in range(num_switches)]
+    links = [[switches[i], switches[i + 1]] for i in range(num_switches - 1)]
+    if num_switches > 2:
+        links.append([switches[-1], switches[0]])
+    hosts = {}
+    for i in range(num_hosts):
+        name = "h%d" % (i + 1)
+        hosts[name] = _host_mac(i + 1)
+        links.append([name, switches[i % num_switches]])
+    return {"hosts": hosts, "switches": switches, "links": links}
+
+
+def grid_topology(rows, columns, num_hosts):
+    """
+    generate a topology description: switches in a rows x columns grid, hosts distributed evenly over the switches.
+    :param int rows:
+    :param int columns:
+    :param int num_hosts:
+    :rtype: dict
+    """
+    def name(r, c):
+        return "s%d" % (r * columns + c + 1)
+
+    switches = [name(r, c) for r in range(rows) for c in range(columns)]
+    links = []
+    for r in range(rows):
+        for c in range(columns):
+            if c + 1 < columns:
+                links.append([name(r, c), name(r, c + 1)])
+            if r + 1 < rows:
+                links.append([name(r, c), name(r + 1, c)])
+    hosts = {}
+    for i in range(num_hosts):
+        host = "h%d" % (i + 1)
+        hosts[host] = _host_mac(i + 1)
+        links.append([host, switches[i % len(switches)]])
+    return {"hosts": hosts, "switches": switches, "links": links}
+
+
+def _node_connector_json(connector_id, port_no, name, uptime):
+    return {
+        "id": connector_id,
+        "flow-node-inventory:port-number": port_no,
+        "flow-node-inventory:name": name,
+        "flow-node-inventory:hardware-address": "02:ff:%02x:%02x:%02x:%02x" % (
+            (port_no >> 24) & 0xff, (port_no >> 16) & 0xff, (port_no >> 8) & 0xff, port_no & 0xff),
+        "flow-node-inventory:current-speed": 10000000,
+        "flow-node-inventory:maximum-speed": 0,
+        "flow-node-inventory:configuration": "",
+        "flow-node-inventory:advertised-features": "",
+        "flow-node-inventory:supported": "",
+        "flow-node-inventory:peer-features": "",
+        "flow-node-inventory:current-feature": "ten-gb-fd copper",
+        "flow-node-inventory:state": {"link-down": False, "blocked": False, "live": False},
+        "opendaylight-port-statistics:flow-capable-node-connector-statistics": {
+            "packets": {"transmitted": uptime * 3, "received": uptime * 2},
+            "bytes": {"transmitted": uptime * 300, "received": uptime * 200},
+            "receive-drops": 0, "transmit-drops": 0, "receive-errors": 0, "transmit-errors": 0,
+            "receive-frame-error": 0, "receive-over-run-error": 0, "receive-crc-error": 0, "collision-count": 0,
+            "duration": {"second": uptime, "nanosecond": 0}
+        },
+        "opendaylight-queue-statistics:flow-capable-node-connector-queue-statistics": {}
+    }
+
+
+def _table_json(table_id, flows, uptime):
+    table = {
+        "id": table_id,
+        "opendaylight-flow-table-statistics:flow-table-statistics": {
+            "active-flows": len(flows), "packets-looked-up": uptime, "packets-matched": uptime if flows else 0
+        }
+    }
+    if flows:
+        table["flow"] = [
+            dict(flow, **{"opendaylight-flow-statistics:flow-statistics": {
+                "packet-count": uptime, "byte-count": uptime * 100, "duration": {"second": uptime, "nanosecond": 0}
+            }}) for flow in flows.values()
+        ]
+    return table
+
+
+class EmulatedNetwork(object):
+    """
+    State of the emulated controller. Thread safe.
+    """
+    __slots__ = ("_lock", "_switches", "_hosts", "_links", "_flows", "_netconf_nodes", "_netconf_data",
+                 "_listeners")
+
+    def __init__(self, topology):
+        """
+
+        :param dict topology: topology description, see module documentation
+        """
+        self._lock = RLock()
+        self._switches = {}  # node_id -> {"name": str, "ip": str, "ports": {port_no: interface name}}
+        self._hosts = {}  # node_id -> {"mac": str, "ip": str, "attachment": tp-id}
+        self._links = {}  # link-id (= source tp) -> (source node, source tp, dest node, dest tp)
+        self._flows = {}  # node_id -> {table_id -> {flow_id -> flow}}
+        self._netconf_nodes = {}  # node_id -> netconf node configuration
+        self._netconf_data = {}  # node_id -> ietf-interfaces:interfaces data of the mount point
+        self._listeners = []
+
+        node_ids = {}
+        for i, switch in enumerate(topology["switches"]):
+            digits = re.sub(r"\D", "", switch)
+            node_id = "openflow:%s" % (int(digits) if digits else i + 1)
+            node_ids[switch] = node_id
+            self._switches[node_id] = {"name": switch, "ip": "10.1.%d.%d" % ((i + 1) >> 8, (i + 1) & 0xff),
+                                       "ports": {}}
+            self._flows[node_id] = {0: {}}
+        for i, host in enumerate(sorted(topology["hosts"])):
+            mac = topology["hosts"][host]
+            node_ids[host] = "host:%s" % mac
+            self._hosts[node_ids[host]] = {"name": host, "mac": mac,
+                                           "ip": "10.0.%d.%d" % ((i + 1) >> 8, (i + 1) & 0xff), "attachment": None}
+
+        for a, b in topology["links"]:
+            self._add_link(self._endpoint(node_ids[a]), self._endpoint(node_ids[b]))
+
+    def _endpoint(self, node_id):
+        """
+        allocate an endpoint for a new link
+        :return: node_id, tp-id
+        """
+        if node_id in self._hosts:
+            return node_id, node_id
+        ports = self._switches[node_id]["ports"]
+        port_no = max(ports) + 1 if ports else 1
+        ports[port_no] = "%s-eth%d" % (self._switches[node_id]["name"], port_no)
+        return node_id, "%s:%d" % (node_id, port_no)
+
+    def _add_link(self, a, b):
+        for (source_node, source_tp), (dest_node, dest_tp) in ((a, b), (b, a)):
+            self._links[source_tp] = (source_node, source_tp, dest_node, dest_tp)
+            if source_node in self._hosts:
+                self._hosts[source_node]["attachment"] = dest_tp
+
+    def add_listener(self, callback):
+        """
+        register a function that is called on each change of the topology.
+        :param callback: callback(path, operation), operation is one of "created", "updated", "deleted"
+        :return:
+        """
+        with self._lock:
+            self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        with self._lock:
+            if callback in self._listeners:
+                self._listeners.remove(callback)
+
+    def _notify(self, path, operation):
+        for callback in list(self._listeners):
+            callback(path, operation)
+
+    # -- topology changes
+
+    def remove_link(self, source_tp):
+        """
+        remove a link in both directions, e.g. to emulate a broken cable.
+        :param str source_tp: tp-id of one end of the link
+        :return:
+        """
+        with self._lock:
+            try:
+                _, _, _, dest_tp = self._links.pop(source_tp)
+            except KeyError:
+                raise EmulatorError(404, "data-missing", "no link at %s" % source_tp)
+            self._links.pop(dest_tp, None)
+        for tp in (source_tp, dest_tp):
+            self._notify("%s/link[link-id='%s']" % (TOPOLOGY_PATH, tp), "deleted")
+
+    def add_link(self, node_a, node_b):
+        """
+        connect two nodes with a new link. Switches get a new port.
+        :param str node_a: node-id
+        :param str node_b: node-id
+        :return: tp-ids of both ends
+        :rtype: (str, str)
+        """
+        with self._lock:
+            for node in (node_a, node_b):
+                if node not in self._switches and node not in self._hosts:
+                    raise EmulatorError(404, "data-missing", "unknown node %s" % node)
+            a = self._endpoint(node_a)
+            b = self._endpoint(node_b)
+            self._add_link(a, b)
+        for node in (node_a, node_b):
+            if node in self._switches:
+                self._notify("%s/node[node-id='%s']" % (TOPOLOGY_PATH, node), "updated")
+        for tp in (a[1], b[1]):
+            self._notify("%s/link[link-id='%s']" % (TOPOLOGY_PATH, tp), "created")
+        return a[1], b[1]
+
+    # -- RESTconf representation
+
+    def inventory_node_json(self, node_id):
+        with self._lock:
+            try:
+                switch = self._switches[node_id]
+            except KeyError:
+                raise EmulatorError(404, "data-missing", "unknown node %s" % node_id)
+            uptime = int(time.time()) % 100000  # counters of the statistics
+            return {
+                "id": node_id,
+                "flow-node-inventory:ip-address": switch["ip"],
+                "flow-node-inventory:manufacturer": "RTman ODL emulator",
+                "flow-node-inventory:hardware": "emulated switch",
+                "flow-node-inventory:software": "2.9.2",
+                "flow-node-inventory:serial-number": "None",
+                "flow-node-inventory:description": switch["name"],
+                "flow-node-inventory:switch-features": {
+                    "max_tables": NUM_FLOW_TABLES,
+                    "max_buffers": 256,
+                    "capabilities": ["flow-node-inventory:flow-feature-capability-flow-stats",
+                                     "flow-node-inventory:flow-feature-capability-table-stats",
+                                     "flow-node-inventory:flow-feature-capability-port-stats",
+                                     "flow-node-inventory:flow-feature-capability-queue-stats"]
+                },
+                "node-connector": [
+                    _node_connector_json("%s:%d" % (node_id, port_no), port_no, name, uptime)
+                    for port_no, name in sorted(switch["ports"].items())
+                ] + [_node_connector_json("%s:LOCAL" % node_id, 4294967294, switch["name"], uptime)],
+                "flow-node-inventory:table": [
+                    _table_json(table_id, self._flows[node_id].get(table_id, {}), uptime)
+                    for table_id in range(NUM_FLOW_TABLES)
+                ]
+            }
+
+    def inventory_json(self):
+        """
+        :return: operational/opendaylight-inventory:nodes
+        :rtype: dict
+        """
+        with self._lock:
+            return {"nodes": {"node": [self.inventory_node_json(node_id) for node_id in sorted(self._switches)]}}
+
+    def topology_node_json(self, node_id):
+        with self._lock:
+            if node_id in self._switches:
+                return {
+                    "node-id": node_id,
+                    "opendaylight-topology-inventory:inventory-node-ref":
+                        "/opendaylight-inventory:nodes/opendaylight-inventory:node[opendaylight-inventory:id='%s']"
+                        % node_id,
+                    "termination-point": [{"tp-id": "%s:%d" % (node_id, port_no)}
+                                          for port_no in sorted(self._switches[node_id]["ports"])]
+                }
+            try:
+                host = self._hosts[node_id]
+            except KeyError:
+                raise EmulatorError(404, "data-missing", "unknown node %s" % node_id)
+            return {
+                "node-id": node_id,
+                "host-tracker-service:id": node_id,
+                "host-tracker-service:addresses": [
+                    {"id": 0, "mac": host["mac"], "ip": host["ip"], "first-seen": 0, "last-seen": 0}
+                ],
+                "host-tracker-service:attachment-points": [
+                    {"tp-id": host["attachment"], "active": True, "corresponding-tp": node_id}
+                ] if host["attachment"] else [],
+                "termination-point": [{"tp-id": node_id}]
+            }
+
+    def topology_link_json(self, link_id):
+        with self._lock:
+            try:
+                source_node, source_tp, dest_node, dest_tp = self._links[link_id]
+            except KeyError:
+                raise EmulatorError(404, "data-missing", "unknown link %s" % link_id)
+            return {
+                "link-id": link_id,
+                "source": {"source-node": source_node, "source-tp": source_tp},
+                "destination": {"dest-node": dest_node, "dest-tp": dest_tp}
+            }
+
+    def topology_json(self):
+        """
+        :return: operational/network-topology:network-topology/topology/flow:1
+        :rtype: dict
+        """
+        with self._lock:
+            nodes = [self.topology_node_json(node_id) for node_id in sorted(self._switches)] + \
+                    [self.topology_node_json(node_id) for node_id in sorted(self._hosts)]
+            links = [self.topology_link_json(link_id) for link_id in sorted(self._links)]
+            return {"topology": [{"topology-id": "flow:1", "node": nodes, "link": links}]}
+
+    # -- flows
+
+    def _table(self, node_id, table_id, create=False):
+        try:
+            tables = self._flows[node_id]
+        except KeyError:
+            raise EmulatorError(404, "data-missing", "unknown node %s" % node_id)
+        if table_id not in tables:
+            if not create:
+                raise EmulatorError(404, "data-missing", "no table %d on %s" % (table_id, node_id))
+            tables[table_id] = {}
+        return tables[table_id]
+
+    def get_flow(self, node_id, table_id, flow_id):
+        with self._lock:
+            try:
+                return self._table(node_id, table_id)[flow_id]
+            except KeyError:
+                raise EmulatorError(404, "data-missing", "no flow %s in table %d of %s" % (flow_id, table_id, node_id))
+
+    def create_flow(self, node_id, table_id, flow):
+        """
+        add a flow; fails if a flow with the same id exists (POST semantics)
+        """
+        with self._lock:
+            table = self._table(node_id, table_id, create=True)
+            if flow["id"] in table:
+                raise EmulatorError(409, "data-exists", "flow %s already exists" % flow["id"])
+            table[flow["id"]] = flow
+
+    def put_flow(self, node_id, table_id, flow):
+        """
+        add or replace a flow (PUT semantics)
+        :return: whether the flow has been created
+        :rtype: bool
+        """
+        with self._lock:
+            table = self._table(node_id, table_id, create=True)
+            created = flow["id"] not in table
+            table[flow["id"]] = flow
+            return created
+
+    def delete_flow(self, node_id, table_id, flow_id):
+        with self._lock:
+            try:
+                del self._table(node_id, table_id)[flow_id]
+            except KeyError:
+                raise EmulatorError(404, "data-missing", "no flow %s in table %d of %s" % (flow_id, table_id, node_id))
+
+    def patch_flows(self, node_id, table_id, edits):
+        """
+        apply several changes to a flow table at once (yang-patch semantics): either all edits are applied, or none.
+        :param str node_id:
+        :param int table_id:
+        :param list[(str, str, dict)] edits: operation ("create", "replace", "merge", "delete" or "remove"),
+                                             flow id, flow (None for deletions)
+        :return:
+        """
+        with self._lock:
+            table = self._table(node_id, table_id, create=True)
+            result = dict(table)
+            for operation, flow_id, flow in edits:
+                if operation in ("delete", "remove"):
+                    if flow_id not in result and operation == "delete":
+                        raise EmulatorError(409, "data-missing", "no flow %s in table %d of %s" % (flow_id, table_id, node_id))
+                    result.pop(flow_id, None)
+                elif operation in ("create", "replace", "merge"):
+                    if flow is None or flow.get("id") != flow_id:
+                        raise EmulatorError(400, "invalid-value", "edit of flow %s has no matching value" % flow_id)
+                    if operation == "create" and flow_id in result:
+                        raise EmulatorError(409, "data-exists", "flow %s already exists" % flow_id)
+                    result[flow_id] = flow
+                else:
+                    raise EmulatorError(400, "operation-not-supported", "unknown yang-patch operation %s" % operation)
+            table.clear()
+            table.update(result)
+
+    def flow_count(self):
+        """
+        :return: number of flows on all switches
+        :rtype: int
+        """
+        with self._lock:
+            return sum(len(table) for tables in self._flows.values() for table in tables.values())
+
+    # -- NETCONF mounts
+
+    def mount_netconf_node(self, node_id, config):
+        with self._lock:
+            self._netconf_nodes[node_id] = config
+            self._netconf_data.setdefault(node_id, {"interfaces": {"interface": []}})
+
+    def unmount_netconf_node(self, node_id):
+        with self._lock:
+            if self._netconf_nodes.pop(node_id, None) is None:
+                raise EmulatorError(404, "data-missing", "netconf node %s is not mounted" % node_id)
+
+    def netconf_node(self, node_id):
+        with self._lock:
+            try:
+                return {"node": [self._netconf_nodes[node_id]]}
+            except KeyError:
+                raise EmulatorError(404, "data-missing", "netconf node %s is not mounted" % node_id)
+
+    def netconf_nodes_json(self):
+        with self._lock:
+            return {"topology": [{"topology-id": "topology-netconf",
+                                  "node": [dict(config, **{"netconf-node-topology:connection-status": "connected"})
+                                           for config in self._netconf_nodes.values()]}]}
+
+    def get_netconf_interfaces(self, node_id):
+        with self._lock:
+            if node_id not in self._netconf_nodes:
+                raise EmulatorError(404, "data-missing", "netconf node %s is not mounted" % node_id)
+            return self._netconf_data[node_id]
+
+    def put_netconf_interfaces(self, node_id, data):
+        with self._lock:
+            if node_id not in self._netconf_nodes:
+                raise EmulatorError(404, "data-missing", "netconf node %s is not mounted" % node_id)
+            self._netconf_data[node_id] = data
@@ -0,0 +1,505 @@
+"""
+RESTconf server of the ODL emulator.
+
+ODLEmulator serves an EmulatedNetwork via the RESTconf endpoints that RTman uses:
+  - operational inventory and flow:1 topology
+  - flow table entries in the config datastore: POST to a table, PUT/GET/DELETE of a flow, yang-patch of a table
+  - sal-remote:create-data-change-event-subscription, streams/stream and the websocket stream itself
+  - NETCONF nodes in topology-netconf and their yang-ext:mount/ietf-interfaces:interfaces
+GET requests may select subtrees with the RESTCONF fields query parameter, e.g. ?fields=node(id;node-connector(id)).
+
+Each request is delayed by a configurable latency, to emulate a controller on a slow management network.
+Requests are served concurrently, one thread per connection, so that connection pooling and parallel deployment in
+the client have the same effect as with a real controller.
+"""
+import base64
+import json
+import logging
+import random
+import re
+import time
+from threading import Lock, Thread
+
+try:  # python 2/3 compatibility
+    from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+    from SocketServer import ThreadingMixIn
+    from urllib import unquote
+    from urlparse import parse_qs
+except ImportError:
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+    from socketserver import ThreadingMixIn
+    from urllib.parse import unquote, parse_qs
+
+from odl_emulator.network import EmulatorError
+from odl_emulator.websocket_stream import NotificationStream, accept_key
+
+YANG_PATCH_CONTENT_TYPE = "application/yang.patch+json"
+
+_NODE = r"config/opendaylight-inventory:nodes/node/([^/]+)"
+_TABLE = _NODE + r"/flow-node-inventory:table/(\d+)"
+_NETCONF_NODE = r"config/network-topology:network-topology/topology/topology-netconf/node/([^/]+)"
+
+_ROUTES = []
+
+
+def _route(pattern, *methods):
+    """
+    register a handler for requests to /restconf/<pattern>
+    """
+    regex = re.compile("^" + pattern + "$")
+
+    def decorator(fn):
+        _ROUTES.append((regex, tuple(m.upper() for m in methods), fn))
+        return fn
+    return decorator
+
+
+def _flows_from_body(body, *keys):
+    for key in keys:
+        if key in body:
+            flows = body[key]
+            return flows if isinstance(flows, list) else [flows]
+    raise EmulatorError(400, "malformed-message", "expected one of %s" % ", ".join(keys))
+
+
+def parse_fields(expression):
+    """
+    parse a RESTCONF fields expression, e.g. "id;node-connector(id;state/live)"
+    :param str expression:
+    :return: selected names, each with the selection of its children; None selects the complete subtree
+    :rtype: dict[str, dict|None]
+    """
+    selection, rest = _parse_field_list(expression)
+    if rest:
+        raise EmulatorError(400, "malformed-message", "unexpected %s in fields" % rest)
+    return selection
+
+
+def _parse_field_list(expression):
+    selection = {}
+    while True:
+        match = re.match(r"^([\w:.-]+(?:/[\w:.-]+)*)", expression)
+        if not match:
+            raise EmulatorError(400, "malformed-message", "expected a field name at %s" % (expression or "end"))
+        path = match.group(1).split("/")
+        expression = expression[match.end():]
+        children = None
+        if expression.startswith("("):
+            children, expression = _parse_field_list(expression[1:])
+            if not expression.startswith(")"):
+                raise EmulatorError(400, "malformed-message", "missing ) in fields")
+            expression = expression[1:]
+        for name in reversed(path[1:]):
+            children = {name: children}
+        _merge_selection(selection, path[0], children)
+        if not expression.startswith(";"):
+            return selection, expression
+        expression = expression[1:]
+
+
+def _merge_selection(selection, name, children):
+    if name in selection and selection[name] is not None and children is not None:
+        for child_name, grandchildren in children.items():
+            _merge_selection(selection[name], child_name, grandchildren)
+    else:
+        selection[name] = None if name in selection else children
+
+
+def select_fields(data, selection):
+    """
+    :param dict|list data: json data, or a list of it
+    :param dict selection: see parse_fields
+    :return: the selected parts of data. Names match with or without module prefix.
+    """
+    if isinstance(data, list):
+        return [select_fields(entry, selection) for entry in data]
+    if not isinstance(data, dict):
+        return data
+    local_names = {name.split(":")[-1]: children for name, children in selection.items()}
+    result = {}
+    for key, value in data.items():
+        if key in selection:
+            children = selection[key]
+        elif key.split(":")[-1] in local_names:
+            children = local_names[key.split(":")[-1]]
+        else:
+            continue
+        result[key] = value if children is None else select_fields(value, children)
+    return result
+
+
+class ODLEmulator(object):
+    """
+    A local stand-in for the RESTconf interface of OpenDaylight.
+    """
+    __slots__ = ("_network", "_server", "_thread", "_latency", "_jitter", "_mount_delay", "_credentials",
+                 "_fields", "_streams", "_mounts_ready", "_lock", "_request_counts")
+
+    def __init__(self, network, hostname="127.0.0.1", port=8181, latency=0.0, jitter=0.0, mount_delay=0.0,
+                 username="admin", password="admin", fields=True):
+        """
+
+        :param EmulatedNetwork network: network state that is served
+        :param str hostname: address to listen on
+        :param int port: port to listen on; 0 picks a free port
+        :param float latency: delay of each request in seconds
+        :param float jitter: additional random delay of each request, up to jitter seconds
+        :param float mount_delay: time in seconds until a mounted NETCONF node is available
+        :param str username: username for basic authentication; None disables authentication
+        :param str password: password for basic authentication
+        :param bool fields: support the fields query parameter; otherwise, requests using it fail like on older
+                            controllers
+        """
+        self._network = network
+        self._latency = latency
+        self._jitter = jitter
+        self._mount_delay = mount_delay
+        self._fields = fields
+        self._credentials = None if username is None else "%s:%s" % (username, password)
+        self._streams = {}
+        self._mounts_ready = {}
+        self._lock = Lock()
+        self._request_counts = {}
+        self._server = _ThreadingHTTPServer((hostname, port), _RESTconfHandler)
+        self._server.emulator = self
+        self._thread = None
+
+    @property
+    def network(self):
+        """
+        :rtype: EmulatedNetwork
+        """
+        return self._network
+
+    @property
+    def hostname(self):
+        return self._server.server_address[0]
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    @property
+    def request_counts(self):
+        """
+        :return: number of requests served, by method
+        :rtype: dict[str, int]
+        """
+        with self._lock:
+            return dict(self._request_counts)
+
+    def start(self):
+        """
+        serve requests in a background thread.
+        :return:
+        """
+        self._thread = Thread(target=self._server.serve_forever, name="ODLEmulator")
+        self._thread.daemon = True
+        self._thread.start()
+        logging.info("ODL emulator listening on %s:%d" % (self.hostname, self.port))
+
+    def serve_forever(self):
+        """
+        serve requests in the calling thread.
+        :return:
+        """
+        logging.info("ODL emulator listening on %s:%d" % (self.hostname, self.port))
+        self._server.serve_forever()
+
+    def stop(self):
+        with self._lock:
+            streams = list(self._streams.values())
+        for stream in streams:
+            stream.close()
+        self._server.shutdown()
+        self._server.server_close()
+
+    # -- helpers for the request handler
+
+    def _count_request(self, method):
+        with self._lock:
+            self._request_counts[method] = self._request_counts.get(method, 0) + 1
+
+    def _delay(self):
+        delay = self._latency + (random.uniform(0, self._jitter) if self._jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _authorized(self, header):
+        if self._credentials is None:
+            return True
+        if not header or not header.startswith("Basic "):
+            return False
+        try:
+            return base64.b64decode(header[6:].strip()).decode("utf-8") == self._credentials
+        except (TypeError, ValueError):
+            return False
+
+    def _get_stream(self, name):
+        with self._lock:
+            return self._streams.get(name)
+
+    def _create_stream(self, path, datastore, scope, json_output):
+        name = "data-change-event-subscription%s/datastore=%s/scope=%s%s" % (
+            path, datastore, scope, "/JSON" if json_output else "")
+        with self._lock:
+            if name in self._streams:
+                return name
+            stream = NotificationStream(name, path, json_output)
+            self._streams[name] = stream
+
+        def on_change(change_path, operation):
+            if change_path.startswith(path):
+                stream.publish(_notification(change_path, operation, json_output))
+        self._network.add_listener(on_change)
+        return name
+
+    def _mount(self, node_id, config):
+        self._network.mount_netconf_node(node_id, config)
+        with self._lock:
+            self._mounts_ready[node_id] = time.time() + self._mount_delay
+
+    def _check_mount_ready(self, node_id):
+        with self._lock:
+            ready_at = self._mounts_ready.get(node_id)
+        if ready_at is None or time.time() < ready_at:
+            raise EmulatorError(404, "data-missing", "mount point of %s is not available" % node_id)
+
+    # -- routes
+
+    @_route(r"operational/opendaylight-inventory:nodes", "GET")
+    def _get_inventory(self, method, body):
+        return 200, self._network.inventory_json()
+
+    @_route(r"(?:operational|config)/opendaylight-inventory:nodes/node/([^/]+)", "GET")
+    def _get_inventory_node(self, method, body, node_id):
+        return 200, {"node": [self._network.inventory_node_json(node_id)]}
+
+    @_route(r"operational/network-topology:network-topology/topology/flow:1", "GET")
+    def _get_topology(self, method, body):
+        return 200, self._network.topology_json()
+
+    @_route(r"operational/network-topology:network-topology/topology/flow:1/node/([^/]+)", "GET")
+    def _get_topology_node(self, method, body, node_id):
+        return 200, {"node": [self._network.topology_node_json(node_id)]}
+
+    @_route(r"operational/network-topology:network-topology/topology/flow:1/link/([^/]+)", "GET")
+    def _get_topology_link(self, method, body, link_id):
+        return 200, {"link": [self._network.topology_link_json(link_id)]}
+
+    @_route(r"operational/network-topology:network-topology/topology/topology-netconf", "GET")
+    def _get_netconf_topology(self, method, body):
+        return 200, self._network.netconf_nodes_json()
+
+    @_route(_TABLE, "POST", "PATCH")
+    def _table(self, method, body, node_id, table_id):
+        table_id = int(table_id)
+        if method == "POST":
+            for flow in _flows_from_body(body, "flow", "flow-node-inventory:flow"):
+                self._network.create_flow(node_id, table_id, flow)
+            return 204, None
+
+        patch = body.get("ietf-restconf:yang-patch", body.get("yang-patch"))
+        if patch is None:
+            raise EmulatorError(400, "malformed-message", "expected a yang-patch")
+        edits = []
+        for edit in patch.get("edit", []):
+            match = re.match(r"^/flow(?:-node-inventory:flow)?/([^/]+)$", edit.get("target", ""))
+            if not match:
+                raise EmulatorError(400, "invalid-value", "unsupported target %s" % edit.get("target"))
+            flow = None
+            if "value" in edit:
+                flow = _flows_from_body(edit["value"], "flow-node-inventory:flow", "flow")[0]
+            edits.append((edit.get("operation"), unquote(match.group(1)), flow))
+        self._network.patch_flows(node_id, table_id, edits)
+        return 200, {"ietf-yang-patch:yang-patch-status": {"patch-id": patch.get("patch-id"), "ok": [None]}}
+
+    @_route(r"(?:config|operational)" + _TABLE[len("config"):] + r"/flow/([^/]+)", "GET", "PUT", "DELETE")
+    def _flow(self, method, body, node_id, table_id, flow_id):
+        table_id = int(table_id)
+        if method == "GET":
+            return 200, {"flow-node-inventory:flow": [self._network.get_flow(node_id, table_id, flow_id)]}
+        if method == "DELETE":
+            self._network.delete_flow(node_id, table_id, flow_id)
+            return 200, None
+        flows = _flows_from_body(body, "flow-node-inventory:flow", "flow")
+        if len(flows) != 1 or flows[0].get("id") != flow_id:
+            raise EmulatorError(400, "invalid-value", "flow id in body does not match %s" % flow_id)
+        created = self._network.put_flow(node_id, table_id, flows[0])
+        return 201 if created else 200, None
+
+    @_route(r"operations/sal-remote:create-data-change-event-subscription", "POST")
+    def _subscribe(self, method, body):
+        request = body.get("input", {})
+        name = self._create_stream(
+            path=request.get("path", "/"),
+            datastore=request.get("sal-remote-augment:datastore", "CONFIGURATION"),
+            scope=request.get("sal-remote-augment:scope", "BASE"),
+            json_output=request.get("sal-remote-augment:notification-output-type") == "JSON"
+        )
+        return 200, {"output": {"stream-name": name}}
+
+    @_route(r"streams/stream/(.+)", "GET")
+    def _get_stream_location(self, method, body, name):
+        if self._get_stream(name) is None:
+            raise EmulatorError(404, "data-missing", "unknown stream %s" % name)
+        return 200, {"location": "ws://%s:%d/%s" % (self.hostname, self.port, name)}
+
+    @_route(_NETCONF_NODE, "GET", "PUT", "DELETE")
+    def _netconf_node(self, method, body, node_id):
+        if method == "GET":
+            return 200, self._network.netconf_node(node_id)
+        if method == "DELETE":
+            self._network.unmount_netconf_node(node_id)
+            return 200, None
+        config = body.get("node", body.get("network-topology:node"))
+        if isinstance(config, list):
+            config = config[0]
+        if not config or config.get("node-id") != node_id:
+            raise EmulatorError(400, "invalid-value", "node-id in body does not match %s" % node_id)
+        self._mount(node_id, config)
+        return 200, None
+
+    @_route(_NETCONF_NODE + r"/yang-ext:mount/ietf-interfaces:interfaces", "GET", "PUT")
+    def _netconf_interfaces(self, method, body, node_id):
+        self._check_mount_ready(node_id)
+        if method == "GET":
+            return 200, self._network.get_netconf_interfaces(node_id)
+        self._network.put_netconf_interfaces(node_id, body)
+        return 200, None
+
+
+def _notification(path, operation, json_output):
+    """
+    format a data change event like ODL's sal-remote streams.
+    Paths are given with module prefixes, as in the json encoding.
+    """
+    event_time = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime())
+    if json_output:
+        return json.dumps({"notification": {
+            "eventTime": event_time,
+            "data-changed-notification": {"data-change-event": [{"path": path, "operation": operation}]}
+        }})
+    path = path.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+    return ('<notification xmlns="urn:ietf:params:xml:ns:netconf:notification:1.0">'
+            '<eventTime>%s</eventTime>'
+            '<data-changed-notification xmlns="urn:opendaylight:params:xml:ns:yang:controller:md:sal:remote">'
+            '<data-change-event><path>%s</path><operation>%s</operation></data-change-event>'
+            '</data-changed-notification></notification>') % (event_time, path, operation)
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _RESTconfHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # send each response at once: otherwise, delayed ACKs add ~40ms to each request on a keep-alive connection
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        logging.debug("ODL emulator: " + format % args)
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_PUT(self):
+        self._handle("PUT")
+
+    def do_DELETE(self):
+        self._handle("DELETE")
+
+    def do_PATCH(self):
+        self._handle("PATCH")
+
+    def _send(self, status_code, data=None):
+        payload = b"" if data is None else json.dumps(data).encode("utf-8")
+        self.send_response(status_code)
+        if payload:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        if payload:
+            self.wfile.write(payload)
+
+    def _handle(self, method):
+        emulator = self.server.emulator  # type: ODLEmulator
+        length = int(self.headers.get("Content-Length") or 0)
+        raw_body = self.rfile.read(length) if length else b""
+
+        if not emulator._authorized(self.headers.get("Authorization")):
+            self.send_response(401)
+            self.send_header("WWW-Authenticate", 'Basic realm="opendaylight"')
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        path, _, query = self.path.partition("?")  # keys are matched still quoted, as they may contain "/"
+        if method == "GET" and self.headers.get("Upgrade", "").lower() == "websocket":
+            self._serve_websocket(emulator, unquote(path[1:]))
+            return
+
+        emulator._count_request(method)
+        emulator._delay()
+        if not path.startswith("/restconf/"):
+            self._send(404, EmulatorError(404, "data-missing", "unknown path %s" % path).json)
+            return
+        path = path[len("/restconf/"):].rstrip("/")
+
+        try:
+            body = json.loads(raw_body.decode("utf-8")) if raw_body else {}
+        except ValueError:
+            self._send(400, EmulatorError(400, "malformed-message", "body is not valid json").json)
+            return
+
+        try:
+            fields = parse_qs(query).get("fields")
+            if fields and not emulator._fields:
+                raise EmulatorError(400, "malformed-message", "unknown query parameter fields")
+            selection = parse_fields(fields[0]) if fields else None
+        except EmulatorError as e:
+            self._send(e.status_code, e.json)
+            return
+
+        for regex, methods, fn in _ROUTES:
+            match = regex.match(path)
+            if match is None:
+                continue
+            if method not in methods:
+                self._send(405, EmulatorError(405, "operation-not-supported",
+                                              "%s is not supported on %s" % (method, path)).json)
+                return
+            if method == "PATCH" and \
+                    self.headers.get("Content-Type", "").split(";")[0].strip() != YANG_PATCH_CONTENT_TYPE:
+                self._send(415, EmulatorError(415, "operation-not-supported",
+                                              "PATCH requires %s" % YANG_PATCH_CONTENT_TYPE).json)
+                return
+            try:
+                status_code, data = fn(emulator, method, body, *(unquote(g) for g in match.groups()))
+                if selection is not None and method == "GET" and data:
+                    data = {key: select_fields(value, selection) for key, value in data.items()}
+            except EmulatorError as e:
+                status_code, data = e.status_code, e.json
+            self._send(status_code, data)
+            return
+        self._send(404, EmulatorError(404, "data-missing", "unknown path %s" % path).json)
+
+    def _serve_websocket(self, emulator, name):
+        stream = emulator._get_stream(name)
+        key = self.headers.get("Sec-WebSocket-Key")
+        if stream is None or not key:
+            self._send(404, EmulatorError(404, "data-missing", "unknown stream %s" % name).json)
+            return
+        self.send_response(101)
+        self.send_header("Upgrade", "websocket")
+        self.send_header("Connection", "Upgrade")
+        self.send_header("Sec-WebSocket-Accept", accept_key(key))
+        self.end_headers()
+        self.wfile.flush()
+        stream.serve(self.connection)
+        self.close_connection = True
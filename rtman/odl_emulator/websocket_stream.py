@@ -0,0 +1,124 @@
+"""
+Server side of the websocket streams of ODL's sal-remote notifications.
+
+Only what the ODL clients need is implemented: the opening handshake, and unfragmented text frames from server to
+client. Frames sent by the client (e.g., close or ping) are not interpreted; a stream ends when sending fails.
+"""
+import base64
+import hashlib
+import logging
+import struct
+from threading import Lock
+
+try:  # python 2/3 compatibility
+    from queue import Queue, Empty
+except ImportError:
+    from Queue import Queue, Empty
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+OPCODE_TEXT = 0x1
+
+
+def accept_key(key):
+    """
+    :param str key: Sec-WebSocket-Key header of the client's handshake
+    :return: Sec-WebSocket-Accept header of the server's answer
+    :rtype: str
+    """
+    digest = hashlib.sha1((key + WEBSOCKET_GUID).encode("ascii")).digest()
+    return base64.b64encode(digest).decode("ascii")
+
+
+def encode_frame(text):
+    """
+    :param str text: message
+    :return: unmasked, unfragmented websocket text frame
+    :rtype: bytes
+    """
+    payload = text.encode("utf-8")
+    length = len(payload)
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | OPCODE_TEXT, length)
+    elif length < 1 << 16:
+        header = struct.pack("!BBH", 0x80 | OPCODE_TEXT, 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | OPCODE_TEXT, 127, length)
+    return header + payload
+
+
+class NotificationStream(object):
+    """
+    A data change event stream, e.g. created by sal-remote:create-data-change-event-subscription.
+    Messages published to the stream are sent to all connected websocket clients.
+    """
+    __slots__ = ("_name", "_path", "_json_output", "_clients", "_lock", "_closed")
+
+    def __init__(self, name, path, json_output=False):
+        """
+
+        :param str name: stream name
+        :param str path: path of the subscription, e.g. /network-topology:network-topology
+        :param bool json_output: send notifications as json instead of xml
+        """
+        self._name = name
+        self._path = path
+        self._json_output = json_output
+        self._clients = []
+        self._lock = Lock()
+        self._closed = False
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def path(self):
+        return self._path
+
+    @property
+    def json_output(self):
+        return self._json_output
+
+    def publish(self, message):
+        """
+        send a message to all connected clients
+        :param str message:
+        :return:
+        """
+        with self._lock:
+            for queue in self._clients:
+                queue.put(message)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            for queue in self._clients:
+                queue.put(None)
+
+    def serve(self, connection):
+        """
+        send the messages of this stream to a websocket client, until the client disconnects or the stream is closed.
+        The handshake must have been completed before.
+        :param socket.socket connection: connection to the client
+        :return:
+        """
+        queue = Queue()
+        with self._lock:
+            if self._closed:
+                return
+            self._clients.append(queue)
+        try:
+            while True:
+                try:
+                    message = queue.get(timeout=1.0)
+                except Empty:
+                    continue
+                if message is None:
+                    return
+                connection.sendall(encode_frame(message))
+        except (IOError, OSError):
+            logging.debug("websocket client of stream %s disconnected" % self._name)
+        finally:
+            with self._lock:
+                self._clients.remove(queue)
@@ -40,7 +40,7 @@ class RTman(UNIServer):
         self._odl_client = odl_client  # type: IRTOdlClient
         self._interactive_lock = Lock()
 
-        self._odl_client._build_nodes()
+        self._odl_client.bootstrap(start_listener=False)  # the listener is started by start()
 
         self._web = RTmanWeb(self, web_address, web_port)
         self._qcc_stream_manager = QccStreamManager(odl_client)
@@ -15,6 +15,7 @@ except ImportError:
 from threading import Thread
 
 from odl_client.base_odlclient.node import ODLNode, Switch
+from odl_client.base_odlclient.topology_snapshot import TopologySnapshot
 
 from jinja2 import Environment, PackageLoader, select_autoescape
 
@@ -142,6 +143,7 @@ class RTmanWeb(object):
             (r'^$', "GET", self._index),
             (r'^/switch$', "GET", self._switches),
             (r'^/switch/(?P<switch>[a-zA-Z0-9:;_]*)/flows$', "GET", self._switch_flows),
+            (r'^/switch/(?P<switch>[a-zA-Z0-9:;_]*)/flows/refresh$', "POST", self._refresh_switch_flows),
             (r'^/graph$', "GET", self._graph),
             (r'^/graph/topology.json$', "GET", self._graph_topology_json),
             (r'^/schedule$', "GET", self._visualize_schedule)
@@ -210,10 +212,13 @@ class RTmanWeb(object):
 
 
     def _switch_flows(self, switch):
+        """
+        the flow table of a switch as it has been fetched last; see _refresh_switch_flows
+        """
         flows = []
         try:
-            switch_obj = self._rtman.odl_client.get_node(switch)
-            for flow in switch_obj._flows:
+            switch_obj = self._rtman.odl_client.topology.get_node(switch)
+            for flow in switch_obj.flows:
                 flowentry = {"others": {}}
                 for k, v in flow._odl_inventory().items():
                     if k == "id":
@@ -242,6 +247,15 @@ class RTmanWeb(object):
             flows=flows
         ), None, None
 
+    def _refresh_switch_flows(self, switch):
+        """
+        fetch the flow table of a switch from the controller, and show it again
+        """
+        if switch not in self._rtman.odl_client.switches:
+            return "Switch does not exist", 404, None
+        self._rtman.odl_client.refresh_flows([switch])
+        return "", 303, {"Location": "/switch/%s/flows" % switch}
+
     def _graph(self):
         """
         the graph document is just the web-based program that displays the topology.
@@ -275,9 +289,10 @@ class RTmanWeb(object):
         # for nodes, we simply need to know their ids (to reference them in links, and for display) and
         # whether or not they are hosts (if not a host: it's a switch!)
         # and while we are iterating all hosts, we can use their neighbor lists to get all the links as well.
+        topology = self._rtman.odl_client.topology  # type: TopologySnapshot
         links = set()
         nodes = []
-        for node in self._rtman.odl_client.nodes.values():  # type: ODLNode
+        for node in topology.nodes.values():  # type: ODLNode
             nodes.append({
                 "id": node.node_id,
                 "is_host": not isinstance(node, Switch)
@@ -325,6 +340,7 @@ class RTmanWeb(object):
             streams[multistream.name] = links_stream
 
         return json.dumps({
+            "topology_version": topology.version,
             "links": links_topology,
             "nodes": nodes,
             "streams": streams
@@ -12,7 +12,7 @@ class RemovablePartialstreamsTransmissionPoint(TransmissionPoint):
         if new_partialstreams:
             return self.__class__(
                 switch_connector=self._switch_connector,
-                partialstreams=new_partialstreams,
+                partial_streams=new_partialstreams,
                 transmission_times=self._transmission_times
             )
         else:
@@ -20,12 +20,16 @@ class RemovablePartialstreamsTransmissionPoint(TransmissionPoint):
 
 class SlottedTransmissionSwitchConnectorWrapper(SwitchConnectorWrapper):
 
-    __slots__ = ("_irt_queue", "_transmission_slots")
+    __slots__ = ("_irt_queue", "_transmission_slots",
+                 "_partialstream_counts",  # type: dict(PartialStream, int)  # number of slots transmitting each
+                 "_multistream_counts")  # type: dict(MultiStream, int)  # sum of the counts of their partialstreams
 
     def __init__(self, switch_connector, parent):
         super(SlottedTransmissionSwitchConnectorWrapper, self).__init__(switch_connector, parent)
         self._irt_queue = next(iter(self._irt_queues.values()))
         self._transmission_slots = [None for _ in range(self.cycle_length)]
+        self._partialstream_counts = {}
+        self._multistream_counts = {}
 
     @property
     def irt_queue(self):
@@ -42,22 +46,28 @@ class SlottedTransmissionSwitchConnectorWrapper(SwitchConnectorWrapper):
 
     @property
     def partialstreams(self):
-        return set.union(set(), *(tp.partialstreams for tp in self._transmission_slots if tp is not None))
+        return set(self._partialstream_counts)
 
     @property
     def multistreams(self):
-        return set(p.parent for p in self.partialstreams)
+        return set(self._multistream_counts)
+
+    @property
+    def multistream_count(self):
+        return len(self._multistream_counts)
 
     @property
     def transmission_points(self):
         return set(self._transmission_slots)
 
     def remove_partialstreams(self, partialstreams):
+        if partialstreams.isdisjoint(self._partialstream_counts):
+            return  # none of them is transmitted here, no need to check all slots
         for i in range(len(self._transmission_slots)):
             tp = self._transmission_slots[i]
             if tp:
                 if partialstreams.intersection(tp.partialstreams):
-                    self._transmission_slots[i] = tp.get_tp_without_partialstreams(partialstreams)
+                    self._set_transmission_slot(i, tp.get_tp_without_partialstreams(partialstreams))
 
     def get_first_transmissionslot(self, minimum_possible):
         """
@@ -70,10 +80,36 @@ class SlottedTransmissionSwitchConnectorWrapper(SwitchConnectorWrapper):
         return minimum_possible
 
     def update_transmission(self, transmission_slot, transmission_point):
-        self._transmission_slots[transmission_slot] = transmission_point
+        self._set_transmission_slot(transmission_slot, transmission_point)
 
     def clear_transmission_slot(self, transmission_slot):
-        self._transmission_slots[transmission_slot] = None
+        self._set_transmission_slot(transmission_slot, None)
+
+    def _set_transmission_slot(self, transmission_slot, transmission_point):
+        """
+        replace the transmission point of a slot, and update the counts of partialstreams and multistreams.
+        :param int transmission_slot:
+        :param TransmissionPoint|None transmission_point: None to clear the slot
+        :return:
+        """
+        old_load = len(self._multistream_counts)
+        old_transmission_point = self._transmission_slots[transmission_slot]
+        if old_transmission_point is not None:
+            self._count_partialstreams(old_transmission_point.partialstreams, -1)
+        if transmission_point is not None:
+            self._count_partialstreams(transmission_point.partialstreams, 1)
+        self._transmission_slots[transmission_slot] = transmission_point
+        self._load_changed(old_load)
+
+    def _count_partialstreams(self, partialstreams, delta):
+        for partialstream in partialstreams:
+            for counts, key in ((self._partialstream_counts, partialstream),
+                                (self._multistream_counts, partialstream.parent)):
+                count = counts.get(key, 0) + delta
+                if count:
+                    counts[key] = count
+                else:
+                    del counts[key]
 
 
 
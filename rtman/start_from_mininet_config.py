@@ -61,9 +61,9 @@ class MacFix(IRTOdlClient):
     def __init__(self, mac_addresses, *args, **kwargs):
         super(MacFix, self).__init__(*args, **kwargs)
         self._macfix__mac_addresses = set(mac_addresses)
-        self._build_nodes()
+        self.bootstrap(start_listener=False)
 
-    def _build_nodes(self):
+    def _after_topology_update(self, topology_change_detected, snapshot):
         """
         this is where the MacFix magic happens.
 
@@ -71,9 +71,9 @@ class MacFix(IRTOdlClient):
         outside addresses to actual addresses: there will be one item in each list that is not in the other.
         We simply associate these two.
         """
-        res = super(MacFix, self)._build_nodes()
+        super(MacFix, self)._after_topology_update(topology_change_detected, snapshot)
 
-        observed_addresses = set(inner for outer in [host.mac_addresses for host in self._hosts.values()] for inner in outer)
+        observed_addresses = set(self._hosts_by_mac)
         unsatisfied = self._macfix__mac_addresses.difference(observed_addresses)
         unexpected = observed_addresses.difference(self._macfix__mac_addresses)
         if len(unsatisfied) > 1:
@@ -84,8 +84,6 @@ class MacFix(IRTOdlClient):
         else:
             self._macfix__result = {}
 
-        return res
-
     def convert_mac_address(self, outside_address):
         """
         get MAC address of a host based on its outside address.
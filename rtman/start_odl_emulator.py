@@ -0,0 +1,50 @@
+"""
+Start a local stand-in for the OpenDaylight RESTconf interface.
+
+RTman and the benchmarks can connect to it instead of a real controller, e.g.:
+    python start_odl_emulator.py --config ../mininet/topology.json --latency 0.01
+    python start_odl_emulator.py --ring 100 --hosts 200
+"""
+import argparse
+import logging
+
+from odl_emulator.network import EmulatedNetwork, load_mininet_topology, ring_topology, grid_topology
+from odl_emulator.server import ODLEmulator
+
+
+def build_network(args):
+    if args.ring:
+        return EmulatedNetwork(ring_topology(args.ring, args.hosts))
+    if args.grid:
+        rows, columns = (int(x) for x in args.grid.lower().split("x"))
+        return EmulatedNetwork(grid_topology(rows, columns, args.hosts))
+    return EmulatedNetwork(load_mininet_topology(args.config))
+
+
+def argument_parser(description=__doc__):
+    parser = argparse.ArgumentParser(description=description, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--config", default="../mininet/topology.json",
+                        help="mininet configuration to take the topology from (default: %(default)s)")
+    parser.add_argument("--ring", type=int, metavar="SWITCHES", help="generate a ring of SWITCHES switches instead")
+    parser.add_argument("--grid", metavar="ROWSxCOLUMNS", help="generate a grid of switches instead, e.g. 10x10")
+    parser.add_argument("--hosts", type=int, default=2, help="number of hosts of a generated topology (default: 2)")
+    parser.add_argument("--hostname", default="127.0.0.1", help="address to listen on (default: %(default)s)")
+    parser.add_argument("--port", type=int, default=8181, help="port to listen on (default: %(default)s)")
+    parser.add_argument("--latency", type=float, default=0.0, help="delay of each request in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="additional random delay of each request")
+    parser.add_argument("--mount-delay", type=float, default=0.0,
+                        help="seconds until a mounted NETCONF node is available")
+    parser.add_argument("--no-fields", dest="fields", action="store_false",
+                        help="reject the RESTCONF fields query parameter, like older controllers")
+    return parser
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    args = argument_parser().parse_args()
+    emulator = ODLEmulator(build_network(args), hostname=args.hostname, port=args.port, latency=args.latency,
+                           jitter=args.jitter, mount_delay=args.mount_delay, fields=args.fields)
+    try:
+        emulator.serve_forever()
+    except KeyboardInterrupt:
+        pass